@@ -1,12 +1,17 @@
 # backend/api/routes.py
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Optional
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Dict, List, Optional
 
 # --- IMPORTAR DESDE dependencies.py ---
-from dependencies import get_training_manager_instance # Correcto
+from dependencies import (get_training_manager_instance, get_websocket_manager_instance, get_metrics_store_instance,
+                          get_run_scheduler_instance)
 
 # Importar CLASE TrainingManager y Schemas
 from core.training_manager import TrainingManager # Correcto
+from api.websocket_manager import WebSocketManager
+from core.metrics_store import DEFAULT_DOWNSAMPLE, MetricsStore
+from core.run_scheduler import RunScheduler
 from .schemas import TrainingParams, TrainingStatus # Correcto
 
 router = APIRouter(prefix="/api", tags=["Training Control"])
@@ -79,4 +84,60 @@ async def get_hardware_info(
     manager: TrainingManager = Depends(get_training_manager_instance)
 ) -> Dict:
     try: return manager.get_hardware_info()
-    except Exception as e: raise HTTPException(status_code=500, detail=f"Error obteniendo info hardware: {e}")
\ No newline at end of file
+    except Exception as e: raise HTTPException(status_code=500, detail=f"Error obteniendo info hardware: {e}")
+
+# --- Ruta /websocket/stats ---
+# Contadores de las colas de salida de WebSocket (enviados, descartados, coalescidos, clientes rezagados)
+@router.get("/websocket/stats", response_model=Dict)
+async def get_websocket_stats(
+    ws_manager: WebSocketManager = Depends(get_websocket_manager_instance)
+) -> Dict:
+    return ws_manager.get_stats()
+
+# --- Rutas /runs (planificador de runs concurrentes) ---
+# Cada run se entrena en su propio proceso; el estado y las métricas llegan por /ws/training
+# como mensajes 'run_status', 'run_metric' y 'run_log'.
+@router.get("/runs", response_model=List[Dict])
+async def list_runs(
+    scheduler: RunScheduler = Depends(get_run_scheduler_instance)
+) -> List[Dict]:
+    return scheduler.list()
+
+@router.post("/runs", status_code=202, response_model=Dict)
+async def submit_run(
+    params: TrainingParams,
+    scheduler: RunScheduler = Depends(get_run_scheduler_instance)
+) -> Dict:
+    try: return scheduler.submit(params).to_dict()
+    except ValueError as e: raise HTTPException(status_code=400, detail=str(e)) # Ej: más CPUs que el presupuesto
+    except Exception as e: raise HTTPException(status_code=500, detail=f"Error interno: {e}")
+
+@router.get("/runs/{run_id}", response_model=Dict)
+async def get_run(
+    run_id: str,
+    scheduler: RunScheduler = Depends(get_run_scheduler_instance)
+) -> Dict:
+    try: return scheduler.get(run_id).to_dict()
+    except KeyError: raise HTTPException(status_code=404, detail=f"Run no encontrado: {run_id}")
+
+@router.post("/runs/{run_id}/stop", response_model=Dict)
+async def stop_run(
+    run_id: str,
+    scheduler: RunScheduler = Depends(get_run_scheduler_instance)
+) -> Dict:
+    try: return scheduler.stop(run_id).to_dict()
+    except KeyError: raise HTTPException(status_code=404, detail=f"Run no encontrado: {run_id}")
+
+# --- Ruta /runs/{run_id}/metrics ---
+# Histórico de métricas de un run (rango de timesteps opcional), cada serie reducida con LTTB
+@router.get("/runs/{run_id}/metrics", response_model=Dict)
+async def get_run_metrics(
+    run_id: str,
+    from_: Optional[int] = Query(None, alias="from", description="Timestep inicial (incluido)."),
+    to: Optional[int] = Query(None, description="Timestep final (incluido)."),
+    downsample: int = Query(DEFAULT_DOWNSAMPLE, ge=0, le=100_000, description="Puntos máximos por serie (0 = todos)."),
+    store: MetricsStore = Depends(get_metrics_store_instance)
+) -> Dict:
+    try: # Lectura (memmap) y LTTB fuera del bucle de eventos
+        return await asyncio.to_thread(store.read, run_id, from_, to, downsample)
+    except KeyError: raise HTTPException(status_code=404, detail=f"Run no encontrado: {run_id}")
@@ -1,6 +1,11 @@
 # backend/api/schemas.py
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any # Añadir Dict y Any
+from typing import Optional, Dict, Any, Literal # Añadir Dict y Any
+
+# Implementaciones de VecEnv seleccionables para el entrenamiento (ver TrainingManager.build_vec_env)
+VecEnvKind = Literal["batched", "dummy", "subproc", "shared_memory"]
+# Reparto de núcleos entre learner y workers (ver core/cpu_placement.py)
+PlacementMode = Literal["none", "auto"]
 
 class TrainingParams(BaseModel):
     """Parámetros para iniciar un nuevo entrenamiento."""
@@ -14,6 +19,19 @@ class TrainingParams(BaseModel):
     # policy_kwargs permite pasar argumentos al constructor de la política (ej: arquitectura de red)
     # Usamos Dict[str, Any] para flexibilidad, pero se podría definir un schema más estricto si se quisiera.
     policy_kwargs: Optional[Dict[str, Any]] = Field(None, description="Argumentos adicionales para la política (ej: {'net_arch': ...}).")
+    # Implementación del entorno vectorizado: 'batched' (NumPy en un proceso), 'dummy' (secuencial),
+    # 'subproc' (un proceso por entorno) o 'shared_memory' (subprocesos con memoria compartida).
+    vec_env_cls: VecEnvKind = Field("batched", description="Tipo de VecEnv a usar para el entrenamiento.")
+    # 'auto': fija cada worker a un núcleo físico propio y ajusta los hilos de torch del learner.
+    cpu_placement: PlacementMode = Field("none", description="Reparto de CPUs entre learner y workers.")
+    # Evaluación asíncrona (core/evaluation_service.py): episodios por evaluación y procesos que los juegan.
+    eval_episodes: int = Field(50, ge=1, description="Episodios deterministas por evaluación.")
+    eval_workers: int = Field(2, ge=1, description="Procesos del pool de evaluación.")
+    # Retención de logs/checkpoints (core/checkpoint_writer.py): los N últimos, el mejor y unos pocos antiguos.
+    checkpoint_keep_last: int = Field(5, ge=1, description="Checkpoints recientes que se conservan siempre.")
+    # Exportación ONNX de cada nuevo best_model (core/onnx_model.py); requiere el paquete 'onnx' (y 'onnxruntime' para int8).
+    onnx_export: bool = Field(True, description="Exportar cada nuevo mejor modelo a ONNX (si 'onnx' está instalado).")
+    onnx_quantize: bool = Field(False, description="Generar también la versión ONNX cuantizada a int8.")
     # --- FIN MEJORAS ---
 
     # Ejemplo de otros hiperparámetros que podrías añadir aquí:
@@ -35,4 +53,5 @@ class TrainingStatus(BaseModel):
     status: str = Field(..., description="Estado actual (ej: Detenido, Entrenando, Error).")
     current_step: int = Field(0, description="Paso actual del entrenamiento.")
     total_steps: int = Field(0, description="Número total de pasos objetivo para el entrenamiento actual.")
-    message: Optional[str] = Field(None, description="Mensajes adicionales o de error.")
\ No newline at end of file
+    message: Optional[str] = Field(None, description="Mensajes adicionales o de error.")
+    run_id: Optional[str] = Field(None, description="Id del run actual o del último (histórico en /api/runs/{run_id}/metrics).")
@@ -1,27 +1,146 @@
 # backend/api/websocket_manager.py
 import asyncio
+import collections
 import json
 import logging
-from typing import List, Dict, Set
+from typing import Any, Deque, Dict, List, Optional, Set
 from fastapi import WebSocket
 
 logger = logging.getLogger(__name__)
 
+OUTBOX_MAXSIZE = 256 # Mensajes pendientes por conexión de entrenamiento
+# Tipos de mensaje en los que solo importa el último: si hay uno sin enviar se sustituye (coalescing)
+COALESCED_MESSAGE_TYPES = frozenset({"training_status"})
+BATCH_MESSAGE_TYPE = "batch" # Frame con varios mensajes: {"type": "batch", "data": [mensaje, ...]}
+
+
+def _batch_frame(messages: List[str]) -> str:
+    """Un mensaje tal cual, o varios en un frame 'batch' (se concatenan sin volver a serializar)."""
+    if len(messages) == 1:
+        return messages[0]
+    return f'{{"type":"{BATCH_MESSAGE_TYPE}","data":[{",".join(messages)}]}}'
+
+
+def _message_type(message: str) -> Optional[str]:
+    """Tipo ('type') de un mensaje JSON, o None si no se puede leer."""
+    try:
+        return json.loads(message).get("type")
+    except (ValueError, AttributeError):
+        return None
+
+
+class ConnectionOutbox:
+    """
+    Cola de salida acotada de una conexión, vaciada por su propia tarea escritora.
+
+    - Los mensajes de tipos en COALESCED_MESSAGE_TYPES sustituyen al pendiente del mismo tipo.
+    - El resto se encolan; si la cola está llena se descarta el más antiguo (drop-oldest).
+    Encolar nunca espera al envío, así un cliente lento no frena a los demás. Cada vez que la
+    tarea escritora se despierta envía todo lo pendiente en un único frame (ver _batch_frame).
+    """
+
+    def __init__(self, websocket: WebSocket, maxsize: int = OUTBOX_MAXSIZE):
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self._pending: Deque[List[Any]] = collections.deque() # [tipo, mensaje]
+        self._by_type: Dict[str, List[Any]] = {} # Entrada pendiente por tipo (solo tipos coalescibles)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        # Contadores
+        self.sent = 0
+        self.frames = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_backlog = 0
+
+    @property
+    def backlog(self) -> int:
+        return len(self._pending)
+
+    @property
+    def lagging(self) -> bool:
+        """True si el cliente acumula al menos media cola sin enviar."""
+        return self.backlog >= self.maxsize // 2
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._writer())
+
+    def stop(self) -> None:
+        self.closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def put(self, message: str, message_type: Optional[str] = None) -> None:
+        if self.closed:
+            return
+        if message_type in COALESCED_MESSAGE_TYPES:
+            entry = self._by_type.get(message_type)
+            if entry is not None: # Aún no enviado: basta con reemplazar su contenido
+                entry[1] = message
+                self.coalesced += 1
+                return
+        if len(self._pending) >= self.maxsize:
+            oldest = self._pending.popleft()
+            self._forget(oldest)
+            self.dropped += 1
+        entry = [message_type, message]
+        self._pending.append(entry)
+        if message_type in COALESCED_MESSAGE_TYPES:
+            self._by_type[message_type] = entry
+        self.max_backlog = max(self.max_backlog, len(self._pending))
+        self._wakeup.set()
+
+    def _forget(self, entry: List[Any]) -> None:
+        if self._by_type.get(entry[0]) is entry:
+            del self._by_type[entry[0]]
+
+    async def _writer(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._pending:
+                    messages = [entry[1] for entry in self._pending]
+                    self._pending.clear()
+                    self._by_type.clear()
+                    await self.websocket.send_text(_batch_frame(messages))
+                    self.sent += len(messages)
+                    self.frames += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e: # Desconexión u otro error de envío
+            logger.warning(f"Error enviando a cliente training, cerrando su cola: {e}")
+            self.closed = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"client": str(self.websocket.client), "sent": self.sent, "frames": self.frames, "dropped": self.dropped,
+                "coalesced": self.coalesced, "backlog": self.backlog, "max_backlog": self.max_backlog,
+                "lagging": self.lagging}
+
+
 class WebSocketManager:
-    def __init__(self):
+    def __init__(self, outbox_maxsize: int = OUTBOX_MAXSIZE):
         # Mantener conjuntos separados para diferentes tipos de conexiones
         self.watch_connections: Set[WebSocket] = set()
         self.training_connections: Set[WebSocket] = set()
+        # Cola de salida + tarea escritora por cada conexión de entrenamiento
+        self.outbox_maxsize = outbox_maxsize
+        self._training_outboxes: Dict[WebSocket, ConnectionOutbox] = {}
+        self._closed_totals = {"sent": 0, "frames": 0, "dropped": 0, "coalesced": 0} # Contadores de conexiones ya cerradas
         logger.info("WebSocketManager inicializado.")
 
-    async def connect(self, websocket: WebSocket, connection_type: str):
-        """Registra una nueva conexión."""
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, connection_type: str, subprotocol: Optional[str] = None):
+        """Registra una nueva conexión (aceptando el subprotocolo negociado, si lo hay)."""
+        await websocket.accept(subprotocol=subprotocol)
         if connection_type == "watch":
             self.watch_connections.add(websocket)
             logger.info(f"Cliente Watch conectado. Total: {len(self.watch_connections)}")
         elif connection_type == "training":
             self.training_connections.add(websocket)
+            outbox = ConnectionOutbox(websocket, self.outbox_maxsize)
+            outbox.start()
+            self._training_outboxes[websocket] = outbox
             logger.info(f"Cliente Training conectado. Total: {len(self.training_connections)}")
         else:
             logger.warning(f"Tipo de conexión desconocido: {connection_type}")
@@ -33,22 +152,45 @@ class WebSocketManager:
             logger.info(f"Cliente Watch desconectado. Total: {len(self.watch_connections)}")
         elif connection_type == "training":
             self.training_connections.discard(websocket)
+            self._close_outbox(websocket)
             logger.info(f"Cliente Training desconectado. Total: {len(self.training_connections)}")
 
+    def _close_outbox(self, websocket: WebSocket) -> None:
+        outbox = self._training_outboxes.pop(websocket, None)
+        if outbox is not None:
+            outbox.stop()
+            for key in self._closed_totals:
+                self._closed_totals[key] += getattr(outbox, key)
+
+    def publish_to_training(self, message: str) -> None:
+        """
+        Encola un mensaje para todos los clientes de entrenamiento sin esperar a ningún envío
+        (cada conexión lo envía desde su propia tarea). Debe llamarse desde el bucle de eventos.
+        """
+        self.publish_batch_to_training([message])
+
+    def publish_batch_to_training(self, messages: List[str]) -> None:
+        """Como publish_to_training, para varios mensajes: cada cliente los recibe en un solo frame."""
+        if not messages:
+            return
+        typed = [(message, _message_type(message)) for message in messages]
+        for websocket, outbox in list(self._training_outboxes.items()):
+            if outbox.closed: # Su escritor falló al enviar: limpiar la conexión
+                self.training_connections.discard(websocket)
+                self._close_outbox(websocket)
+                continue
+            for message, message_type in typed:
+                outbox.put(message, message_type)
+
+    def send_to_training_connection(self, websocket: WebSocket, message: str) -> None:
+        """Encola un mensaje solo para una conexión de entrenamiento (ej. el estado inicial)."""
+        outbox = self._training_outboxes.get(websocket)
+        if outbox is not None:
+            outbox.put(message, _message_type(message))
+
     async def broadcast_to_training(self, message: str):
-        """Envía un mensaje a todos los clientes de entrenamiento conectados."""
-        # Crear una copia para evitar problemas si el conjunto cambia durante la iteración
-        disconnected_clients = set()
-        for connection in self.training_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e: # Capturar desconexiones u otros errores
-                 logger.warning(f"Error enviando a cliente training, desconectando: {e}")
-                 disconnected_clients.add(connection)
-
-        # Limpiar clientes desconectados
-        for client in disconnected_clients:
-             self.training_connections.discard(client)
+        """Envía un mensaje a todos los clientes de entrenamiento conectados (ver publish_to_training)."""
+        self.publish_to_training(message)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Envía un mensaje a un cliente específico."""
@@ -58,9 +200,23 @@ class WebSocketManager:
             logger.warning(f"Error enviando mensaje personal, desconectando: {e}")
             self.disconnect(websocket, "unknown") # Desconectar si falla el envío
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de envío: totales, conexiones rezagadas y detalle por conexión de entrenamiento."""
+        outboxes = list(self._training_outboxes.values())
+        totals = {key: value + sum(getattr(outbox, key) for outbox in outboxes)
+                  for key, value in self._closed_totals.items()}
+        return {
+            "watch_connections": len(self.watch_connections),
+            "training_connections": len(self.training_connections),
+            "lagging_connections": sum(outbox.lagging for outbox in outboxes),
+            "outbox_maxsize": self.outbox_maxsize,
+            **totals,
+            "connections": [outbox.stats() for outbox in outboxes],
+        }
+
 # Instancia Singleton del gestor
 websocket_manager_instance = WebSocketManager()
 
 # Función para inyección de dependencias
 async def get_websocket_manager() -> WebSocketManager:
-    return websocket_manager_instance
\ No newline at end of file
+    return websocket_manager_instance
@@ -0,0 +1,5 @@
+# backend/benchmarks/__init__.py
+# Benchmarks de rendimiento. Ejecutar desde la carpeta backend, ej:
+#   python -m benchmarks run --output bench.json       (suite completa con metadatos)
+#   python -m benchmarks compare base.json nuevo.json  (ratios entre dos ejecuciones)
+#   python -m benchmarks.bench_env_step                (un benchmark suelto)
@@ -0,0 +1,126 @@
+# backend/benchmarks/__main__.py
+"""
+Suite de benchmarks: ejecuta env_step, vec_env y training y guarda un único JSON con
+metadatos (commit, Python, CPUs, backend del kernel) para comparar entre commits.
+
+Uso (desde backend/):
+    python -m benchmarks run --output bench_antes.json
+    python -m benchmarks run --quick --output bench_despues.json
+    python -m benchmarks compare bench_antes.json bench_despues.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import psutil
+
+# Tamaños de cada benchmark: (completo, --quick)
+_SIZES = {
+    "env_step_steps": (20000, 2000),
+    "vec_env_steps": (1000, 100),
+    "training_timesteps": (16384, 2048),
+}
+# Clave que identifica cada fila de resultados (para emparejarlas en compare)
+_RESULT_KEYS = ("snake_length", "vec_env", "n_envs", "num_cpu")
+# Métricas comparables (mayor es mejor)
+_METRICS = ("steps_per_sec", "fps", "rollout_fps")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata():
+    from core import snake_kernel
+    return {
+        "git_commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_physical": psutil.cpu_count(logical=False),
+        "cpu_logical": psutil.cpu_count(logical=True),
+        "kernel_backend": snake_kernel.BACKEND,
+    }
+
+
+def run_suite(board_size: int, quick: bool, vec_env_kinds, training_num_cpu: int):
+    from benchmarks import bench_env_step, bench_training, bench_vec_env
+    size = {key: value[1] if quick else value[0] for key, value in _SIZES.items()}
+    workers = bench_vec_env.default_workers()
+    return {
+        "metadata": _metadata(),
+        "benchmarks": {
+            "env_step": bench_env_step.run([1, 50, 200], size["env_step_steps"], board_size),
+            "vec_env": bench_vec_env.run(vec_env_kinds, workers, size["vec_env_steps"], board_size),
+            "training": [bench_training.run(training_num_cpu, kind, size["training_timesteps"], board_size)
+                         for kind in vec_env_kinds],
+        },
+    }
+
+
+def _row_key(row: dict):
+    return tuple((key, row[key]) for key in _RESULT_KEYS if key in row)
+
+
+def compare(baseline: dict, candidate: dict):
+    """Filas emparejadas por benchmark con el ratio candidato/base de cada métrica."""
+    rows = []
+    for name, base_results in baseline["benchmarks"].items():
+        candidate_results = {_row_key(row): row for row in candidate["benchmarks"].get(name, [])}
+        for base_row in base_results:
+            cand_row = candidate_results.get(_row_key(base_row))
+            if cand_row is None:
+                continue
+            for metric in _METRICS:
+                if base_row.get(metric) and cand_row.get(metric) is not None:
+                    rows.append({"benchmark": name, "config": dict(_row_key(base_row)), "metric": metric,
+                                 "baseline": base_row[metric], "candidate": cand_row[metric],
+                                 "ratio": round(cand_row[metric] / base_row[metric], 3)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Ejecuta la suite completa.")
+    run_parser.add_argument("--output", "-o", default=None, help="Fichero JSON de salida (por defecto stdout).")
+    run_parser.add_argument("--quick", action="store_true", help="Tamaños reducidos (prueba rápida).")
+    run_parser.add_argument("--board-size", type=int, default=20)
+    run_parser.add_argument("--vec-env", nargs="+", default=["batched", "subproc"])
+    run_parser.add_argument("--training-num-cpu", type=int, default=4)
+    compare_parser = sub.add_parser("compare", help="Compara dos resultados JSON (ratio candidato/base).")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == "run":
+        result = run_suite(args.board_size, args.quick, args.vec_env, args.training_num_cpu)
+        text = json.dumps(result, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+            print(f"Resultados guardados en {args.output}", file=sys.stderr)
+        else:
+            print(text)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        print(json.dumps({"baseline": baseline["metadata"], "candidate": candidate["metadata"],
+                          "comparison": compare(baseline, candidate)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
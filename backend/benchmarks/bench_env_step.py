@@ -0,0 +1,92 @@
+# backend/benchmarks/bench_env_step.py
+"""
+Microbenchmark de SnakeEnv.step: pasos por segundo con la serpiente fijada a varias longitudes.
+
+La serpiente recorre un ciclo hamiltoniano de las filas 0..N-2 del tablero y la comida se
+deja en la última fila, así nunca come ni muere y la longitud se mantiene constante.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_env_step --lengths 1 50 200 --steps 20000
+"""
+import argparse
+import json
+import logging
+import time
+
+from core import snake_kernel
+from core.snake_env import SnakeEnv
+
+_DELTA_TO_ACTION = {(-1, 0): 0, (0, 1): 1, (1, 0): 2, (0, -1): 3}
+
+
+def _cycle(board_size: int):
+    """Ciclo hamiltoniano (lista de celdas y acciones) sobre las filas 0..board_size-2."""
+    rows, cols = board_size - 1, board_size
+    assert cols % 2 == 0, "El ciclo necesita un número par de columnas"
+    cells = [(0, x) for x in range(cols)] # Fila 0 de izquierda a derecha
+    for x in range(cols - 1, -1, -1): # Serpentear hacia abajo/arriba por columnas (filas 1..rows-1)
+        ys = range(1, rows) if (cols - 1 - x) % 2 == 0 else range(rows - 1, 0, -1)
+        cells.extend((y, x) for y in ys)
+    actions = []
+    for i, (y, x) in enumerate(cells):
+        ny, nx = cells[(i + 1) % len(cells)]
+        actions.append(_DELTA_TO_ACTION[(ny - y, nx - x)])
+    return cells, actions
+
+
+def _prepare(env: SnakeEnv, length: int, cells) -> int:
+    """
+    Coloca la serpiente de longitud dada sobre el ciclo (cabeza en cells[length-1]) y
+    devuelve la posición de la cabeza en el ciclo.
+    """
+    env.reset(seed=0)
+    body = [cells[i] for i in range(length - 1, -1, -1)]
+    env._pop_tail() # Vaciar la serpiente inicial y construir el cuerpo desde la cola
+    for point in reversed(body):
+        env._push_head(point)
+    env.food_pos = (env.board_size - 1, 0) # Fuera del ciclo: nunca se come
+    env.max_steps_without_food = float("inf")
+    if length > 1:
+        (hy, hx), (ny, nx) = body[0], body[1]
+        env.direction = _DELTA_TO_ACTION[(hy - ny, hx - nx)]
+    return length - 1
+
+
+def run(lengths, steps: int, board_size: int):
+    cells, actions = _cycle(board_size)
+    # Calentamiento (compilación/carga de caché de Numba) fuera de las mediciones
+    warmup_env = SnakeEnv(board_size=board_size)
+    warmup_env.reset(seed=0)
+    for _ in range(100):
+        if any(warmup_env.step(int(warmup_env.action_masks().argmax()))[2:4]):
+            warmup_env.reset()
+    results = []
+    for length in lengths:
+        assert length < len(cells), f"Longitud {length} no cabe en el ciclo ({len(cells)} celdas)"
+        env = SnakeEnv(board_size=board_size)
+        pos = _prepare(env, length, cells)
+        start = time.perf_counter()
+        for _ in range(steps):
+            _, _, terminated, truncated, _ = env.step(actions[pos])
+            assert not (terminated or truncated)
+            pos = (pos + 1) % len(cells)
+        elapsed = time.perf_counter() - start
+        assert len(env.snake) == length
+        results.append({"snake_length": length, "steps_per_sec": round(steps / elapsed, 1)})
+        env.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--board-size", type=int, default=SnakeEnv.DEFAULT_BOARD_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps({"benchmark": "env_step", "kernel_backend": snake_kernel.BACKEND,
+                      "results": run(args.lengths, args.steps, args.board_size)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
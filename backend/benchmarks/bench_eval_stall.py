@@ -0,0 +1,106 @@
+# backend/benchmarks/bench_eval_stall.py
+"""
+Parón del aprendizaje durante la evaluación: duración de cada rollout (desde el fin del
+anterior) y FPS de un entrenamiento MaskablePPO (hiperparámetros de TrainingManager) con
+  - 'none':  sin evaluación (referencia);
+  - 'sync':  EvalCallback de SB3, episodios en serie sobre un SnakeEnv dentro de learn();
+  - 'async': AsyncEvalCallback (core/evaluation_service.py), episodios en un pool de procesos.
+Un rollout que coincide con una evaluación síncrona dura mucho más que la mediana: se informa
+la mediana, el p95 y el máximo de las duraciones, y el cociente máximo/mediana.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_eval_stall --mode none sync async --timesteps 65536 --eval-episodes 50
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+from stable_baselines3.common.callbacks import BaseCallback, EvalCallback
+from stable_baselines3.common.monitor import Monitor
+
+from api.schemas import TrainingParams
+from core.evaluation_service import AsyncEvalCallback
+from core.snake_env import SnakeEnv
+from core.training_manager import TrainingManager
+
+
+class RolloutTimer(BaseCallback):
+    """Marca de tiempo al final de cada rollout."""
+
+    def __init__(self):
+        super().__init__()
+        self.marks = []
+
+    def _on_training_start(self) -> None:
+        self.marks = [time.perf_counter()]
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        self.marks.append(time.perf_counter())
+
+
+def run(mode: str, timesteps: int, n_envs: int, board_size: int, eval_episodes: int, eval_workers: int, evals: int):
+    params = TrainingParams(total_timesteps=timesteps, num_cpu=n_envs, learning_rate=3e-4, board_size=board_size)
+    vec_env = TrainingManager.build_vec_env("batched", n_envs, board_size, seed=0)
+    eval_freq = max(timesteps // evals // n_envs, 1)
+    timer = RolloutTimer()
+    callbacks = [timer]
+    eval_env = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if mode == "sync":
+            eval_env = Monitor(SnakeEnv(board_size=board_size, info_mode="slim"))
+            callbacks.append(EvalCallback(eval_env, best_model_save_path=tmp, log_path=tmp, eval_freq=eval_freq,
+                                          n_eval_episodes=eval_episodes, deterministic=True, verbose=0))
+        elif mode == "async":
+            callbacks.append(AsyncEvalCallback(board_size, eval_freq=eval_freq, best_model_save_path=tmp, log_path=tmp,
+                                               n_eval_episodes=eval_episodes, n_workers=eval_workers))
+        try:
+            model = MaskablePPO("MlpPolicy", vec_env, verbose=0, seed=0, device="cpu",
+                                **TrainingManager.ppo_hyperparameters(params))
+            start = time.perf_counter()
+            model.learn(total_timesteps=timesteps, callback=callbacks)
+            elapsed = time.perf_counter() - start
+        finally:
+            vec_env.close()
+            if eval_env is not None:
+                eval_env.close()
+        best_saved = os.path.exists(os.path.join(tmp, "best_model.zip"))
+    durations = np.diff(timer.marks) * 1000
+    median = float(np.median(durations))
+    result = {"mode": mode, "fps": round(model.num_timesteps / elapsed, 1), "rollouts": len(durations),
+              "rollout_ms": {"median": round(median, 1), "p95": round(float(np.percentile(durations, 95)), 1),
+                             "max": round(float(durations.max()), 1)},
+              "max_over_median": round(float(durations.max()) / median, 2)}
+    if mode != "none":
+        result["best_model_saved"] = best_saved
+    if mode == "async":
+        result["eval_stats"] = callbacks[1].stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", nargs="+", default=["none", "sync", "async"], choices=["none", "sync", "async"])
+    parser.add_argument("--timesteps", type=int, default=65536)
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--board-size", type=int, default=10)
+    parser.add_argument("--eval-episodes", type=int, default=50)
+    parser.add_argument("--eval-workers", type=int, default=2)
+    parser.add_argument("--evals", type=int, default=4, help="Evaluaciones durante el entrenamiento.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    results = [run(mode, args.timesteps, args.envs, args.board_size, args.eval_episodes, args.eval_workers, args.evals)
+               for mode in args.mode]
+    print(json.dumps({"benchmark": "eval_stall", "timesteps": args.timesteps, "envs": args.envs,
+                      "eval_episodes": args.eval_episodes, "eval_workers": args.eval_workers, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
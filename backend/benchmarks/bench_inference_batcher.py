@@ -0,0 +1,71 @@
+# backend/benchmarks/bench_inference_batcher.py
+"""
+N visores concurrentes pidiendo acciones: predict secuencial por visor (bucle de eventos)
+frente a InferenceBatcher (una pasada por lote en un hilo). Mide decisiones/s y pasadas forward.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_inference_batcher --viewers 1 10 100 --steps 200
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+from stable_baselines3 import PPO
+
+from core.inference_batcher import InferenceBatcher
+from core.snake_env import SnakeEnv
+
+
+def _model():
+    env = SnakeEnv(board_size=SnakeEnv.DEFAULT_BOARD_SIZE)
+    return PPO("MlpPolicy", env, device="cpu", policy_kwargs={"net_arch": dict(pi=[128, 128], vf=[128, 128])})
+
+
+async def _sequential(model, viewers: int, steps: int, obs: np.ndarray):
+    async def viewer():
+        for _ in range(steps):
+            model.predict(obs, deterministic=True)
+            await asyncio.sleep(0)
+    await asyncio.gather(*(viewer() for _ in range(viewers)))
+    return viewers * steps # Una pasada forward por decisión
+
+
+async def _batched(model, viewers: int, steps: int, obs: np.ndarray):
+    batcher = InferenceBatcher()
+    async def viewer():
+        with batcher.session():
+            for _ in range(steps):
+                await batcher.predict(model, obs)
+    await asyncio.gather(*(viewer() for _ in range(viewers)))
+    batcher.close()
+    return batcher.stats()["batches"]
+
+
+def run(viewers_list, steps: int):
+    model = _model()
+    obs = model.observation_space.sample()
+    results = []
+    for viewers in viewers_list:
+        for mode, fn in (("sequential", _sequential), ("batched", _batched)):
+            start = time.perf_counter()
+            forward_passes = asyncio.run(fn(model, viewers, steps, obs))
+            elapsed = time.perf_counter() - start
+            results.append({"mode": mode, "viewers": viewers, "forward_passes": forward_passes,
+                            "decisions_per_sec": round(viewers * steps / elapsed, 1)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--steps", type=int, default=200, help="Decisiones por visor.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps({"benchmark": "inference_batcher", "results": run(args.viewers, args.steps)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
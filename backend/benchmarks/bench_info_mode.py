@@ -0,0 +1,58 @@
+# backend/benchmarks/bench_info_mode.py
+"""
+Efecto de `SnakeEnv(info_mode=...)` en el throughput de SubprocVecEnv: con 'full' cada paso
+serializa por el pipe un dict con el estado completo; con 'slim'/'none' casi nada.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_info_mode --workers 4 8 --steps 2000
+"""
+import argparse
+import functools
+import json
+import logging
+import time
+
+import numpy as np
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+from core.snake_env import SnakeEnv
+
+
+def _steps_per_sec(vec_env, steps: int) -> float:
+    vec_env.reset()
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 4, size=(steps, vec_env.num_envs))
+    start = time.perf_counter()
+    for t in range(steps):
+        vec_env.step(actions[t])
+    return steps * vec_env.num_envs / (time.perf_counter() - start)
+
+
+def run(workers, steps: int, board_size: int):
+    results = []
+    for n in workers:
+        row = {"workers": n}
+        for mode in SnakeEnv.INFO_MODES:
+            env_fn = functools.partial(SnakeEnv, board_size=board_size, info_mode=mode)
+            vec_env = make_vec_env(env_fn, n_envs=n, vec_env_cls=SubprocVecEnv, seed=0)
+            try:
+                row[f"{mode}_steps_per_sec"] = round(_steps_per_sec(vec_env, steps), 1)
+            finally:
+                vec_env.close()
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--steps", type=int, default=2000, help="Pasos del VecEnv por configuración.")
+    parser.add_argument("--board-size", type=int, default=SnakeEnv.DEFAULT_BOARD_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps({"benchmark": "info_mode", "results": run(args.workers, args.steps, args.board_size)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
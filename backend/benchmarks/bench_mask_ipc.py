@@ -0,0 +1,63 @@
+# backend/benchmarks/bench_mask_ipc.py
+"""
+Compara el coste por paso de SubprocVecEnv + env_method("action_masks") (dos round-trips IPC
+por paso, lo que hace MaskablePPO) frente a MaskedSubprocVecEnv (un único round-trip).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_mask_ipc --workers 4 8 16 --steps 2000
+"""
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+from sb3_contrib.common.maskable.utils import get_action_masks
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+from core.masked_subproc_vec_env import MaskedSubprocVecEnv
+from core.snake_env import SnakeEnv
+
+
+def _masked_rollout_sps(vec_env, steps: int) -> float:
+    """Pasos de entorno por segundo con el mismo patrón de llamadas que MaskablePPO.collect_rollouts."""
+    vec_env.reset()
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        masks = get_action_masks(vec_env)
+        # Acción aleatoria entre las válidas (o cualquiera si no hay ninguna)
+        scores = rng.random(masks.shape) + masks
+        vec_env.step(scores.argmax(axis=1))
+    return steps * vec_env.num_envs / (time.perf_counter() - start)
+
+
+def run(workers, steps: int, board_size: int):
+    results = []
+    env_fn = lambda: SnakeEnv(board_size=board_size)
+    for n in workers:
+        row = {"workers": n}
+        for name, cls in (("subproc", SubprocVecEnv), ("masked_subproc", MaskedSubprocVecEnv)):
+            vec_env = make_vec_env(env_fn, n_envs=n, vec_env_cls=cls, seed=0)
+            try:
+                row[f"{name}_steps_per_sec"] = round(_masked_rollout_sps(vec_env, steps), 1)
+            finally:
+                vec_env.close()
+        row["speedup"] = round(row["masked_subproc_steps_per_sec"] / row["subproc_steps_per_sec"], 3)
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--steps", type=int, default=2000, help="Pasos del VecEnv por configuración.")
+    parser.add_argument("--board-size", type=int, default=SnakeEnv.DEFAULT_BOARD_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps({"benchmark": "mask_ipc", "results": run(args.workers, args.steps, args.board_size)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
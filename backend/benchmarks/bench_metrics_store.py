@@ -0,0 +1,67 @@
+# backend/benchmarks/bench_metrics_store.py
+"""
+Histórico de métricas (MetricsStore): coste de escritura por rollout y coste/tamaño de las
+consultas de rango con LTTB frente a devolver todos los puntos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_metrics_store --rows 2000000 --downsample 1000
+"""
+import argparse
+import json
+import logging
+import math
+import shutil
+import tempfile
+import time
+
+from core.metrics_store import MetricsStore
+
+
+def _timed_read(store, run_id, **kwargs):
+    start = time.perf_counter()
+    result = store.read(run_id, **kwargs)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    payload = json.dumps(result)
+    return {"query": kwargs, "points_in_range": result["points_in_range"],
+            "points_returned": sum(len(s["x"]) for s in result["series"].values()),
+            "read_ms": round(elapsed_ms, 2), "json_kb": round(len(payload) / 1024, 1)}
+
+
+def run(rows: int, downsample: int, steps_per_rollout: int):
+    root = tempfile.mkdtemp(prefix="bench_metrics_store_")
+    try:
+        store = MetricsStore(root)
+        run_id = store.new_run_id()
+        writer = store.create_run(run_id)
+        start = time.perf_counter()
+        for i in range(rows):
+            writer.append((i + 1) * steps_per_rollout, math.sin(i / 5000.0) * 100 + (i % 7), 50.0 + i % 13,
+                          1.0 / (1 + i), math.tanh(i / 1e5))
+        writer.close()
+        append_us = (time.perf_counter() - start) / rows * 1e6
+
+        last = rows * steps_per_rollout
+        reads = [
+            _timed_read(store, run_id, downsample=downsample),
+            _timed_read(store, run_id, t_from=last // 2, t_to=last // 2 + last // 10, downsample=downsample),
+            _timed_read(store, run_id, t_from=last - 100_000 * steps_per_rollout, downsample=0),
+        ]
+        if rows <= 2_000_000: # Sin reducir todo el run (referencia: reproducir todos los puntos)
+            reads.append(_timed_read(store, run_id, downsample=0))
+        return {"rows": rows, "append_us": round(append_us, 3), "reads": reads}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Filas (rollouts) del run.")
+    parser.add_argument("--downsample", type=int, default=1000)
+    parser.add_argument("--steps-per-rollout", type=int, default=2048)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps({"benchmark": "metrics_store", **run(args.rows, args.downsample, args.steps_per_rollout)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
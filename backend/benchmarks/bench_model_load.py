@@ -0,0 +1,103 @@
+# backend/benchmarks/bench_model_load.py
+"""
+Carga de modelos para inferencia: `MaskablePPO.load` del zip de SB3 frente a
+`load_mmap_policy` de la exportación mapeable (core/mmap_model.py).
+
+Crea un modelo sin entrenar con la arquitectura indicada, lo guarda como zip y lo exporta.
+Cada variante se mide en un proceso nuevo (con torch y sb3 ya importados): tiempo de la
+primera carga, mediana de `--repeats` cargas más, y cuánto crecen la RSS y la USS (memoria
+privada, la que no se comparte con otros procesos) con la primera carga. Comprueba también
+que ambas variantes eligen las mismas acciones.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_model_load
+    python -m benchmarks.bench_model_load --net-arch 1024 1024 1024 --repeats 20
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import psutil
+
+OBS_SEED = 0
+
+
+def _memory_mb():
+    info = psutil.Process().memory_full_info()
+    return info.rss / 2**20, info.uss / 2**20
+
+
+def _trial(variant: str, zip_path: str, sidecar: str, repeats: int):
+    import gc
+    from sb3_contrib import MaskablePPO
+    from core.mmap_model import load_mmap_policy
+
+    load = (lambda: load_mmap_policy(sidecar)) if variant == "mmap" else (lambda: MaskablePPO.load(zip_path, device="cpu"))
+    gc.collect()
+    rss_before, uss_before = _memory_mb()
+    start = time.perf_counter()
+    model = load()
+    first_ms = (time.perf_counter() - start) * 1000
+    rss_after, uss_after = _memory_mb()
+    obs = np.random.default_rng(OBS_SEED).random((512, 18), dtype=np.float32)
+    actions = model.predict(obs, deterministic=True)[0]
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"variant": variant, "first_load_ms": round(first_ms, 2), "median_load_ms": round(float(np.median(times)), 2),
+            "rss_delta_mb": round(rss_after - rss_before, 2), "uss_delta_mb": round(uss_after - uss_before, 2),
+            "actions": actions.tolist()}
+
+
+def _warm_up():
+    """Importaciones perezosas y kernels de torch con una política diminuta: no cuentan en la medida."""
+    from gymnasium import spaces
+    from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+    from core.snake_env import SnakeEnv
+    import core.mmap_model # noqa: F401 - se importa aquí para que su carga no cuente en el primer load medido
+
+    policy = MaskableActorCriticPolicy(SnakeEnv.build_observation_space(), spaces.Discrete(4), lambda _: 0.0, net_arch=[8])
+    policy.predict(np.zeros((1, SnakeEnv.OBS_DIM), dtype=np.float32), deterministic=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--net-arch", type=int, nargs="+", default=[128, 128], help="Capas de pi y vf.")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    from sb3_contrib import MaskablePPO
+    from core.batched_snake_env import BatchedSnakeEnv
+    from core.mmap_model import export_mmap_model, read_sidecar
+
+    context = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = BatchedSnakeEnv(num_envs=1, board_size=10)
+        model = MaskablePPO("MlpPolicy", env, device="cpu", seed=0,
+                            policy_kwargs=dict(net_arch=dict(pi=args.net_arch, vf=args.net_arch)))
+        zip_path = os.path.join(tmp, "model.zip")
+        model.save(zip_path)
+        env.close()
+        sidecar = export_mmap_model(zip_path, board_size=10)
+        results = []
+        for variant in ("zip", "mmap"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_warm_up) as pool:
+                results.append(pool.submit(_trial, variant, zip_path, sidecar, args.repeats).result())
+        sizes = {"zip_bytes": os.path.getsize(zip_path), "weights_bytes": read_sidecar(sidecar)["weights_bytes"]}
+    agree = float(np.mean(np.array(results[0].pop("actions")) == np.array(results[1].pop("actions"))))
+    print(json.dumps({"benchmark": "model_load", "net_arch": args.net_arch, **sizes, "action_agreement": agree,
+                      "speedup_median": round(results[0]["median_load_ms"] / results[1]["median_load_ms"], 2),
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
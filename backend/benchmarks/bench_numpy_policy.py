@@ -0,0 +1,171 @@
+# backend/benchmarks/bench_numpy_policy.py
+"""
+Runtime NumPy de la política (core/numpy_policy.py) frente a torch, para el modo "Ver IA".
+
+1. Paridad: entrena brevemente un MaskablePPO, lo exporta (core/mmap_model.py) y compara las
+   acciones de `NumpyPolicy.predict(deterministic=True)` con `MaskablePPO.predict(deterministic=True)`
+   en observaciones aleatorias y en observaciones reales del entorno, con y sin máscaras, además
+   de la diferencia máxima de log-probabilidades. Sale con código 1 si alguna acción difiere
+   (salvo empates: logits a menos de 1e-5, que el redondeo puede decidir en cualquier sentido).
+2. Latencia de `predict` por tamaño de lote (mediana, en proceso) de ambos runtimes.
+3. Arranque en frío: en un proceso nuevo, `import main` y la primera carga del modelo desde el
+   ModelRegistry con WATCH_RUNTIME=numpy y con WATCH_RUNTIME=torch (tiempos, RSS y si torch
+   acabó importado).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_numpy_policy
+    python -m benchmarks.bench_numpy_policy --train-steps 0 --samples 20000 --batch-sizes 1 64 1024
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BOARD_SIZE = 10
+TIE_TOLERANCE = 1e-5
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLD_START_SCRIPT = """
+import json, os, sys, time
+import psutil
+start = time.perf_counter()
+import main, dependencies
+imported = time.perf_counter()
+dependencies.model_registry_singleton.get(sys.argv[1])
+loaded = time.perf_counter()
+print(json.dumps({"import_main_ms": round((imported - start) * 1000, 1), "first_load_ms": round((loaded - imported) * 1000, 1),
+                  "rss_mb": round(psutil.Process().memory_info().rss / 2**20, 1), "torch_imported": "torch" in sys.modules,
+                  "model_class": type(dependencies.model_registry_singleton.peek(sys.argv[1])).__name__}))
+"""
+
+
+def _env_observations(model, steps: int, seed: int):
+    """Observaciones y máscaras visitadas por el propio modelo en el entorno real."""
+    from core.snake_env import SnakeEnv
+
+    env = SnakeEnv(board_size=BOARD_SIZE)
+    obs, _ = env.reset(seed=seed)
+    observations, masks = [], []
+    for _ in range(steps):
+        mask = env.action_masks()
+        observations.append(obs)
+        masks.append(mask)
+        action, _ = model.predict(obs, deterministic=True, action_masks=mask)
+        obs, _, terminated, truncated, _ = env.step(int(action))
+        if terminated or truncated:
+            obs, _ = env.reset()
+    env.close()
+    return np.asarray(observations, dtype=np.float32), np.asarray(masks, dtype=bool)
+
+
+def _log_probs(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=1, keepdims=True))
+
+
+def check_parity(model, policy, samples: int, seed: int):
+    import torch
+
+    rng = np.random.default_rng(seed)
+    space = model.observation_space
+    random_obs = rng.uniform(space.low, space.high, size=(samples, space.shape[0])).astype(np.float32)
+    random_masks = rng.random((samples, policy.n_actions)) > 0.3
+    random_masks[np.arange(samples), rng.integers(0, policy.n_actions, samples)] = True # Al menos una válida
+    env_obs, env_masks = _env_observations(model, samples, seed)
+    cases = {"random": (random_obs, None), "random_masked": (random_obs, random_masks),
+             "env": (env_obs, None), "env_masked": (env_obs, env_masks)}
+    report = {}
+    for name, (obs, masks) in cases.items():
+        expected, _ = model.predict(obs, deterministic=True, action_masks=masks)
+        actions, _ = policy.predict(obs, deterministic=True, action_masks=masks)
+        with torch.no_grad():
+            reference = model.policy.get_distribution(torch.as_tensor(obs), action_masks=masks).distribution.logits.numpy()
+        # Con un empate (diferencia de logits en el orden del redondeo float32) cualquiera de las dos vale
+        rows = np.arange(len(obs))
+        differ = expected != actions
+        ties = differ & (reference[rows, expected] - reference[rows, actions] <= TIE_TOLERANCE)
+        report[name] = {"samples": len(obs), "mismatches": int((differ & ~ties).sum()), "ties": int(ties.sum()),
+                        "max_log_prob_diff": float(np.abs(_log_probs(policy.logits(obs, masks)) - reference).max())}
+    single, _ = policy.predict(env_obs[0], deterministic=True)
+    report["single_obs_shape_matches"] = np.shape(single) == np.shape(model.predict(env_obs[0], deterministic=True)[0])
+    return report
+
+
+def measure_latency(runtimes, batch_sizes, repeats: int, seed: int):
+    rng = np.random.default_rng(seed)
+    results = []
+    for batch in batch_sizes:
+        obs = rng.random((batch, 18), dtype=np.float32)
+        row = {"batch": batch}
+        for name, predict in runtimes.items():
+            predict(obs) # Calentamiento
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                predict(obs)
+                times.append((time.perf_counter() - start) * 1e6)
+            row[f"{name}_us"] = round(float(np.median(times)), 1)
+        row["speedup"] = round(row["torch_us"] / row["numpy_us"], 2)
+        results.append(row)
+    return results
+
+
+def measure_cold_start(model_path: str, workdir: str):
+    results = {}
+    for runtime in ("numpy", "torch"):
+        env = {**os.environ, "WATCH_RUNTIME": runtime, "PYTHONPATH": BACKEND_DIR}
+        output = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, model_path], cwd=workdir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        results[runtime] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train-steps", type=int, default=4096, help="Pasos de entrenamiento antes de exportar (0 = sin entrenar).")
+    parser.add_argument("--samples", type=int, default=5000, help="Observaciones por caso de paridad.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    from sb3_contrib import MaskablePPO
+    from core.batched_snake_env import BatchedSnakeEnv
+    from core.mmap_model import export_mmap_model, load_mmap_policy
+    from core.numpy_policy import NumpyPolicy
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path = os.path.join(workdir, "best_model.zip")
+        env = BatchedSnakeEnv(num_envs=4, board_size=BOARD_SIZE, seed=args.seed)
+        model = MaskablePPO("MlpPolicy", env, n_steps=256, device="cpu", seed=args.seed,
+                            policy_kwargs={"net_arch": dict(pi=[128, 128], vf=[128, 128])})
+        if args.train_steps:
+            model.learn(args.train_steps)
+        model.save(model_path)
+        env.close()
+        sidecar = export_mmap_model(model_path, board_size=BOARD_SIZE)
+        policy = NumpyPolicy.from_sidecar(sidecar)
+        torch_policy = load_mmap_policy(sidecar)
+
+        parity = check_parity(model, policy, args.samples, args.seed)
+        latency = measure_latency({"numpy": lambda obs: policy.predict(obs, deterministic=True),
+                                   "torch": lambda obs: torch_policy.predict(obs, deterministic=True)},
+                                  args.batch_sizes, args.repeats, args.seed)
+        cold_start = measure_cold_start(model_path, workdir)
+
+    passed = parity["single_obs_shape_matches"] and all(
+        case["mismatches"] == 0 for case in parity.values() if isinstance(case, dict))
+    print(json.dumps({"benchmark": "numpy_policy", "train_steps": args.train_steps, "parity_ok": passed,
+                      "parity": parity, "latency": latency, "cold_start": cold_start}, indent=2))
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
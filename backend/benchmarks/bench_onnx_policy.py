@@ -0,0 +1,98 @@
+# backend/benchmarks/bench_onnx_policy.py
+"""
+Runtimes de inferencia del modo "Ver IA" frente a la política de torch: torch (load_mmap_policy),
+NumPy (core/numpy_policy.py), ONNX float32 y ONNX int8 (core/onnx_model.py, con onnxruntime).
+
+Entrena brevemente un MaskablePPO, lo exporta y mide para cada runtime:
+  - acuerdo de acciones deterministas con `MaskablePPO.predict(deterministic=True)` (% de
+    observaciones con la misma acción), en observaciones aleatorias y en las del entorno real
+    con sus máscaras: la deriva de precisión de la cuantización;
+  - latencia de `predict` por tamaño de lote (p50 y p99). Los lotes grandes corresponden a la
+    inferencia agrupada del InferenceBatcher y a evaluaciones masivas.
+Sin onnx/onnxruntime instalados solo se miden torch y NumPy.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_onnx_policy
+    python -m benchmarks.bench_onnx_policy --net-arch 256 256 --batch-sizes 1 64 1024 --repeats 500
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_numpy_policy import BOARD_SIZE, _env_observations
+
+
+def _agreement(reference_model, runtime, obs: np.ndarray, masks) -> float:
+    expected, _ = reference_model.predict(obs, deterministic=True, action_masks=masks)
+    actions, _ = runtime.predict(obs, deterministic=True, action_masks=masks)
+    return round(float(np.mean(expected == actions)) * 100, 3)
+
+
+def _latency(runtime, obs: np.ndarray, repeats: int):
+    runtime.predict(obs, deterministic=True) # Calentamiento
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        runtime.predict(obs, deterministic=True)
+        times.append((time.perf_counter() - start) * 1e6)
+    return {"p50_us": round(float(np.percentile(times, 50)), 1), "p99_us": round(float(np.percentile(times, 99)), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--net-arch", type=int, nargs="+", default=[128, 128], help="Capas de pi y vf.")
+    parser.add_argument("--train-steps", type=int, default=4096, help="Pasos de entrenamiento antes de exportar (0 = sin entrenar).")
+    parser.add_argument("--samples", type=int, default=5000, help="Observaciones por caso de acuerdo.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 1024])
+    parser.add_argument("--repeats", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    from sb3_contrib import MaskablePPO
+    from core.batched_snake_env import BatchedSnakeEnv
+    from core.mmap_model import export_mmap_model, load_mmap_policy
+    from core.numpy_policy import NumpyPolicy
+    from core.onnx_model import ONNX_AVAILABLE, ONNXRUNTIME_AVAILABLE, OnnxPolicy, export_onnx_model
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path = os.path.join(workdir, "best_model.zip")
+        env = BatchedSnakeEnv(num_envs=4, board_size=BOARD_SIZE, seed=args.seed)
+        model = MaskablePPO("MlpPolicy", env, n_steps=256, device="cpu", seed=args.seed,
+                            policy_kwargs={"net_arch": dict(pi=args.net_arch, vf=args.net_arch)})
+        if args.train_steps:
+            model.learn(args.train_steps)
+        model.save(model_path)
+        env.close()
+        sidecar = export_mmap_model(model_path, board_size=BOARD_SIZE)
+        runtimes = {"torch": load_mmap_policy(sidecar), "numpy": NumpyPolicy.from_sidecar(sidecar)}
+        sizes = {}
+        if ONNX_AVAILABLE and ONNXRUNTIME_AVAILABLE:
+            for path in export_onnx_model(model_path, quantize=True):
+                sizes[os.path.basename(path)] = os.path.getsize(path)
+            runtimes["onnx"] = OnnxPolicy.load(model_path)
+            runtimes["onnx_int8"] = OnnxPolicy.load(model_path, quantized=True)
+
+        rng = np.random.default_rng(args.seed)
+        space = model.observation_space
+        random_obs = rng.uniform(space.low, space.high, size=(args.samples, space.shape[0])).astype(np.float32)
+        env_obs, env_masks = _env_observations(model, args.samples, args.seed)
+        agreement = {name: {"random_pct": _agreement(model, runtime, random_obs, None),
+                            "env_masked_pct": _agreement(model, runtime, env_obs, env_masks)}
+                     for name, runtime in runtimes.items()}
+        latency = []
+        for batch in args.batch_sizes:
+            obs = rng.random((batch, space.shape[0]), dtype=np.float32)
+            latency.append({"batch": batch, **{name: _latency(runtime, obs, args.repeats) for name, runtime in runtimes.items()}})
+
+    print(json.dumps({"benchmark": "onnx_policy", "net_arch": args.net_arch, "train_steps": args.train_steps,
+                      "onnx_sizes_bytes": sizes, "action_agreement_vs_torch": agreement, "latency": latency}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
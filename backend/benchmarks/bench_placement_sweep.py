@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_placement_sweep.py
+"""
+Barrido de reparto de CPUs: FPS de entrenamiento (MaskablePPO, hiperparámetros de
+TrainingManager) para cada combinación de VecEnv, número de entornos, hilos de torch y
+reparto ('none' o 'auto', ver core/cpu_placement.py). Cada prueba corre en un proceso nuevo
+(la afinidad y los hilos de torch son globales del proceso). Devuelve la combinación más rápida.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_placement_sweep --vec-env subproc shared_memory batched --timesteps 16384
+    python -m benchmarks.bench_placement_sweep --envs 4 8 --threads 0 1 2 --placement none auto
+(`--threads 0` = los del plan 'auto' o, sin reparto, el valor por defecto de torch.)
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import get_args
+
+from api.schemas import PlacementMode, TrainingParams, VecEnvKind
+from core.cpu_placement import cpu_topology, pin_process, plan_placement
+
+
+def _trial(kind: str, n_envs: int, torch_threads: int, placement: str, timesteps: int, board_size: int):
+    import torch
+    from sb3_contrib import MaskablePPO
+    from core.training_manager import TrainingManager
+
+    logging.basicConfig(level=logging.WARNING)
+    plan = plan_placement(kind, n_envs) if placement == "auto" else None
+    threads = torch_threads or (plan.torch_threads if plan else torch.get_num_threads())
+    torch.set_num_threads(threads)
+    if plan:
+        pin_process(plan.learner_cpus)
+    params = TrainingParams(total_timesteps=timesteps, num_cpu=n_envs, learning_rate=3e-4,
+                            board_size=board_size, vec_env_cls=kind, cpu_placement=placement)
+    vec_env = TrainingManager.build_vec_env(kind, n_envs, board_size, seed=0,
+                                            worker_cpus=plan.worker_cpus if plan else None)
+    try:
+        model = MaskablePPO("MlpPolicy", vec_env, verbose=0, seed=0, device="cpu",
+                            **TrainingManager.ppo_hyperparameters(params))
+        model.learn(total_timesteps=model.n_steps * n_envs) # Calentamiento: un rollout y una actualización
+        warm_steps = model.num_timesteps
+        start = time.perf_counter()
+        model.learn(total_timesteps=timesteps, reset_num_timesteps=False)
+        elapsed = time.perf_counter() - start
+    finally:
+        vec_env.close()
+    return {"vec_env": kind, "n_envs": n_envs, "torch_threads": threads, "placement": placement,
+            "plan": plan.to_dict() if plan else None,
+            "fps": round((model.num_timesteps - warm_steps) / elapsed, 1)}
+
+
+def run(kinds, envs, threads, placements, timesteps: int, board_size: int):
+    context = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    results = []
+    for kind in kinds:
+        for n_envs in envs:
+            for torch_threads in threads:
+                for placement in placements:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        result = pool.submit(_trial, kind, n_envs, torch_threads, placement, timesteps, board_size).result()
+                    results.append(result)
+                    print(json.dumps(result), flush=True)
+    return sorted(results, key=lambda r: r["fps"], reverse=True)
+
+
+def main():
+    cores = cpu_topology()
+    physical = len(cores)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vec-env", nargs="+", default=["subproc", "shared_memory", "batched"], choices=get_args(VecEnvKind))
+    parser.add_argument("--envs", type=int, nargs="+", default=sorted({max(physical // 2, 1), max(physical - 1, 1), physical}))
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({0, 1, physical}))
+    parser.add_argument("--placement", nargs="+", default=list(get_args(PlacementMode)), choices=get_args(PlacementMode))
+    parser.add_argument("--timesteps", type=int, default=16384)
+    parser.add_argument("--board-size", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    results = run(args.vec_env, args.envs, args.threads, args.placement, args.timesteps, args.board_size)
+    print(json.dumps({"benchmark": "placement_sweep", "physical_cores": physical,
+                      "logical_cpus": sum(len(core) for core in cores), "best": results[0], "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_server_responsiveness.py
+"""
+Latencia de la API mientras entrena la sesión de la UI: lanza /api/train/start, mide GET
+/api/status durante `--duration` segundos de entrenamiento y calcula los pasos/s del
+entrenamiento a partir del histórico de métricas del run.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_server_responsiveness --duration 20 --num-cpu 4
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+
+def _wait_status(client, statuses, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get("/api/status").json()
+        if status["status"] in statuses:
+            return status
+        time.sleep(0.2)
+    raise TimeoutError(f"El entrenamiento no llegó a {statuses} en {timeout}s")
+
+
+def run(duration: float, interval: float, num_cpu: int, vec_env_cls: str, board_size: int):
+    os.environ.setdefault("TRAINING_METRICS_WINDOW", "1.0")
+    from fastapi.testclient import TestClient
+    import main
+
+    params = {"total_timesteps": 100_000_000, "num_cpu": num_cpu, "learning_rate": 3e-4,
+              "vec_env_cls": vec_env_cls, "board_size": board_size}
+    with TestClient(main.app) as client:
+        idle = [_timed_get(client) for _ in range(50)]
+        assert client.post("/api/train/start", json=params).status_code == 202
+        run_id = _wait_status(client, ("Entrenando",), 120)["run_id"]
+        time.sleep(2.0) # Dejar que arranque el bucle de aprendizaje
+        latencies, end = [], time.monotonic() + duration
+        start_step, start_time = _last_timestep(client, run_id), time.monotonic()
+        while time.monotonic() < end:
+            latencies.append(_timed_get(client))
+            time.sleep(interval)
+        steps = _last_timestep(client, run_id) - start_step
+        elapsed = time.monotonic() - start_time
+        client.post("/api/train/stop")
+        _wait_status(client, ("Detenido", "Completado", "Error"), 120)
+    busy = np.array(latencies)
+    return {"idle_p50_ms": round(float(np.percentile(idle, 50)), 2),
+            "p50_ms": round(float(np.percentile(busy, 50)), 2), "p99_ms": round(float(np.percentile(busy, 99)), 2),
+            "max_ms": round(float(busy.max()), 2), "requests": len(latencies),
+            "training_steps_per_s": round(steps / elapsed, 1)}
+
+
+def _timed_get(client) -> float:
+    start = time.perf_counter()
+    client.get("/api/status")
+    return (time.perf_counter() - start) * 1000.0
+
+
+def _last_timestep(client, run_id: str) -> int:
+    series = client.get(f"/api/runs/{run_id}/metrics", params={"downsample": 0}).json().get("series", {})
+    return max((s["x"][-1] for s in series.values() if s["x"]), default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos de medición con el entrenamiento en marcha.")
+    parser.add_argument("--interval", type=float, default=0.02, help="Segundos entre peticiones.")
+    parser.add_argument("--num-cpu", type=int, default=4)
+    parser.add_argument("--vec-env", default="batched")
+    parser.add_argument("--board-size", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO) # El servidor configura logging DEBUG al importarse
+    print(json.dumps({"benchmark": "server_responsiveness",
+                      **run(args.duration, args.interval, args.num_cpu, args.vec_env, args.board_size)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
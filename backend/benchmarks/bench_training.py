@@ -0,0 +1,80 @@
+# backend/benchmarks/bench_training.py
+"""
+FPS de entrenamiento de extremo a extremo: MaskablePPO con los hiperparámetros por defecto de
+TrainingManager (ppo_hyperparameters + build_vec_env), separando recolección (rollout) y
+actualización de la política.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_training --num-cpu 4 --vec-env batched --timesteps 16384
+"""
+import argparse
+import json
+import logging
+import time
+from typing import get_args
+
+from sb3_contrib import MaskablePPO
+from stable_baselines3.common.callbacks import BaseCallback
+
+from api.schemas import TrainingParams, VecEnvKind
+from core.snake_env import SnakeEnv
+from core.training_manager import TrainingManager
+
+
+class _PhaseTimer(BaseCallback):
+    """Acumula el tiempo de pared pasado recolectando rollouts y actualizando la política."""
+
+    def __init__(self):
+        super().__init__()
+        self.rollout_seconds = 0.0
+        self.rollouts = 0
+        self._rollout_start = 0.0
+
+    def _on_rollout_start(self) -> None:
+        self._rollout_start = time.perf_counter()
+
+    def _on_rollout_end(self) -> None:
+        self.rollout_seconds += time.perf_counter() - self._rollout_start
+        self.rollouts += 1
+
+    def _on_step(self) -> bool:
+        return True
+
+
+def run(num_cpu: int, vec_env_kind: str, timesteps: int, board_size: int, learning_rate: float = 0.0003):
+    params = TrainingParams(total_timesteps=timesteps, num_cpu=num_cpu, learning_rate=learning_rate,
+                            board_size=board_size, vec_env_cls=vec_env_kind)
+    vec_env = TrainingManager.build_vec_env(vec_env_kind, num_cpu, board_size, seed=0)
+    try:
+        model = MaskablePPO("MlpPolicy", vec_env, verbose=0, seed=0, device="auto",
+                            **TrainingManager.ppo_hyperparameters(params))
+        timer = _PhaseTimer()
+        start = time.perf_counter()
+        model.learn(total_timesteps=timesteps, callback=timer)
+        total_seconds = time.perf_counter() - start
+    finally:
+        vec_env.close()
+    return {
+        "vec_env": vec_env_kind, "num_cpu": num_cpu, "n_steps": model.n_steps,
+        "timesteps": model.num_timesteps, "device": str(model.device),
+        "fps": round(model.num_timesteps / total_seconds, 1),
+        "rollout_fps": round(model.num_timesteps / timer.rollout_seconds, 1) if timer.rollout_seconds else None,
+        "rollout_seconds": round(timer.rollout_seconds, 3),
+        "update_seconds": round(total_seconds - timer.rollout_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-cpu", type=int, nargs="+", default=[4])
+    parser.add_argument("--vec-env", nargs="+", default=["batched"], choices=get_args(VecEnvKind))
+    parser.add_argument("--timesteps", type=int, default=16384)
+    parser.add_argument("--board-size", type=int, default=SnakeEnv.DEFAULT_BOARD_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    results = [run(n, kind, args.timesteps, args.board_size) for kind in args.vec_env for n in args.num_cpu]
+    print(json.dumps({"benchmark": "training", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_training_updates.py
+"""
+Latencia extremo a extremo de las métricas de entrenamiento: desde
+WebSocketUpdateCallback._on_rollout_end (hilo de entrenamiento) hasta que el cliente de
+/ws/training_updates recibe el mensaje. Usa la app real (main.app) con el TestClient de
+Starlette y la cola de actualizaciones del TrainingManager singleton.
+
+Un hilo productor llama a `_on_step` (con `--episodes` episodios terminados) y a
+`_on_rollout_end` en ráfagas de `--burst` rollouts cada `--interval` segundos; el cliente anota
+la hora de llegada de cada timestep (desempaquetando los frames 'batch' si el servidor agrupa
+mensajes). También se mide el tiempo de `_on_rollout_end` en el hilo de entrenamiento.
+Por defecto TRAINING_METRICS_WINDOW=0 (un mensaje por rollout); con ventana solo llega el
+último timestep de cada una y `delivered` cuenta los mensajes de métricas recibidos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_training_updates --rollouts 500 --interval 0.005 --burst 1
+    python -m benchmarks.bench_training_updates --rollouts 500 --interval 0.02 --burst 10
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+
+
+def _producer(callback, rollouts: int, interval: float, burst: int, episodes: int, sent_at: dict, callback_s: list):
+    callback.locals = {"infos": [{"episode": {"r": float(i), "l": 10 + i, "t": 0.0}} for i in range(episodes)]}
+    for timestep in range(1, rollouts + 1):
+        callback.num_timesteps = timestep
+        callback._on_step()
+        sent_at[timestep] = start = time.perf_counter()
+        callback._on_rollout_end()
+        callback_s.append(time.perf_counter() - start)
+        if timestep % burst == 0:
+            time.sleep(interval)
+
+
+def _messages(frame: dict):
+    return frame["data"] if frame.get("type") == "batch" else [frame]
+
+
+def run(rollouts: int, interval: float, burst: int, episodes: int, timeout: float):
+    from starlette.testclient import TestClient
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_training_updates_")) # training_manager usa rutas relativas (logs/...)
+    import main
+    import dependencies
+    from callbacks.websocket_callback import WebSocketUpdateCallback
+
+    training_manager = dependencies.training_manager_singleton
+    callback = WebSocketUpdateCallback(training_manager._update_queue)
+    callback.model = types.SimpleNamespace(logger=types.SimpleNamespace(name_to_value={"train/value_loss": 0.5, "train/explained_variance": 0.1}))
+
+    sent_at, received_at, frames, callback_s = {}, {}, 0, []
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/training_updates") as ws:
+            ws.receive_json() # Estado inicial
+            producer = threading.Thread(target=_producer, args=(callback, rollouts, interval, burst, episodes, sent_at, callback_s), daemon=True)
+            start = time.perf_counter()
+            producer.start()
+            while rollouts not in received_at and time.perf_counter() - start < timeout: # El último timestep llega siempre
+                frame = ws.receive_json()
+                now = time.perf_counter()
+                frames += 1
+                for message in _messages(frame):
+                    if message["type"] == "training_metric":
+                        received_at[message["data"]["timestep"]] = now
+            producer.join()
+    latencies = np.array([received_at[t] - sent_at[t] for t in received_at]) * 1000.0
+    return {"rollouts": rollouts, "interval_s": interval, "burst": burst,
+            "metrics_window_s": float(os.environ["TRAINING_METRICS_WINDOW"]),
+            "delivered": len(received_at), "frames": frames,
+            "on_rollout_end_us": round(float(np.mean(callback_s)) * 1e6, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            "max_ms": round(float(latencies.max()), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rollouts", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.005, help="Segundos entre ráfagas.")
+    parser.add_argument("--burst", type=int, default=1, help="Rollouts seguidos por ráfaga.")
+    parser.add_argument("--episodes", type=int, default=4, help="Episodios terminados por rollout.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    os.environ.setdefault("TRAINING_METRICS_WINDOW", "0")
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    print(json.dumps({"benchmark": "training_updates",
+                      **run(args.rollouts, args.interval, args.burst, args.episodes, args.timeout)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
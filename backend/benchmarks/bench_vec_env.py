@@ -0,0 +1,72 @@
+# backend/benchmarks/bench_vec_env.py
+"""
+Throughput de los VecEnv de entrenamiento (los mismos que crea TrainingManager.build_vec_env)
+con 1..N entornos, usando el patrón de llamadas de MaskablePPO (máscaras + step).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_vec_env --kinds dummy subproc --workers 1 2 4 8 --steps 1000
+"""
+import argparse
+import json
+import logging
+import time
+from typing import get_args
+
+import numpy as np
+import psutil
+from sb3_contrib.common.maskable.utils import get_action_masks
+
+from api.schemas import VecEnvKind
+from core.snake_env import SnakeEnv
+from core.training_manager import TrainingManager
+
+VEC_ENV_KINDS = get_args(VecEnvKind)
+
+
+def default_workers():
+    """1, 2, 4... hasta el número de CPUs físicas (siempre incluye ese número)."""
+    max_workers = psutil.cpu_count(logical=False) or 1
+    workers, n = [], 1
+    while n < max_workers:
+        workers.append(n)
+        n *= 2
+    return workers + [max_workers]
+
+
+def _steps_per_sec(vec_env, steps: int) -> float:
+    vec_env.reset()
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        masks = get_action_masks(vec_env)
+        vec_env.step((rng.random(masks.shape) + masks).argmax(axis=1)) # Acción válida aleatoria
+    return steps * vec_env.num_envs / (time.perf_counter() - start)
+
+
+def run(kinds, workers, steps: int, board_size: int):
+    results = []
+    for kind in kinds:
+        for n in workers:
+            vec_env = TrainingManager.build_vec_env(kind, n, board_size, seed=0)
+            try:
+                sps = _steps_per_sec(vec_env, steps)
+            finally:
+                vec_env.close()
+            results.append({"vec_env": kind, "n_envs": n, "steps_per_sec": round(sps, 1)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", nargs="+", default=["dummy", "subproc"], choices=VEC_ENV_KINDS)
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Por defecto 1, 2, 4... hasta las CPUs físicas.")
+    parser.add_argument("--steps", type=int, default=1000, help="Pasos del VecEnv por configuración.")
+    parser.add_argument("--board-size", type=int, default=SnakeEnv.DEFAULT_BOARD_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    workers = args.workers or default_workers()
+    print(json.dumps({"benchmark": "vec_env", "results": run(args.kinds, workers, args.steps, args.board_size)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
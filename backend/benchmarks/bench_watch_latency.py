@@ -0,0 +1,98 @@
+# backend/benchmarks/bench_watch_latency.py
+"""
+Sonda de latencia: p50/p99 de GET /api/status mientras N clientes de /ws/watch están viendo
+a la IA. Usa la app real (main.app) en proceso con el TestClient de Starlette, así las
+peticiones REST comparten el bucle de eventos con las sesiones de visualización.
+
+Se ejecuta en un directorio temporal con un best_model.zip recién creado (política sin
+entrenar, misma arquitectura que el entrenamiento).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_watch_latency --watchers 0 50 --requests 300
+    WATCH_EXECUTOR=process python -m benchmarks.bench_watch_latency --watchers 50
+    WATCH_MODE=private python -m benchmarks.bench_watch_latency --watchers 1 10 50
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def _percentiles(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {"p50_ms": round(float(np.percentile(samples, 50)), 2),
+            "p99_ms": round(float(np.percentile(samples, 99)), 2),
+            "max_ms": round(float(samples.max()), 2)}
+
+
+def _probe(client, requests: int, interval: float):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get("/api/status")
+        samples.append((time.perf_counter() - start) * 1000.0)
+        assert response.status_code == 200
+        time.sleep(interval)
+    return samples
+
+
+def run(watchers_list, requests: int, interval: float, warmup: float):
+    from stable_baselines3 import PPO
+    from starlette.testclient import TestClient
+
+    workdir = tempfile.mkdtemp(prefix="bench_watch_")
+    os.chdir(workdir) # main/training_manager usan rutas relativas (logs/...)
+    os.makedirs(os.path.join("logs", "best_model"), exist_ok=True)
+    from core.snake_env import SnakeEnv
+    PPO("MlpPolicy", SnakeEnv(board_size=20), device="cpu",
+        policy_kwargs={"net_arch": dict(pi=[128, 128], vf=[128, 128])}).save(os.path.join("logs", "best_model", "best_model.zip"))
+    import main
+    import dependencies
+
+    def inference_requests():
+        return dependencies.inference_batcher_singleton.stats()["requests"]
+
+    results = []
+    with TestClient(main.app) as client:
+        for watchers in watchers_list:
+            sockets = []
+            start, requests_before = time.perf_counter(), inference_requests()
+            for _ in range(watchers):
+                ws = client.websocket_connect("/ws/watch").__enter__()
+                ws.send_text("start")
+                sockets.append(ws)
+            time.sleep(warmup)
+            samples = _probe(client, requests, interval)
+            # Decisiones de la política por segundo con los visores conectados (coste de simulación del servidor)
+            inference_rate = (inference_requests() - requests_before) / (time.perf_counter() - start)
+            for ws in sockets: # Comprobar que los visores estaban recibiendo frames
+                assert ws.receive_json()["type"] == "game_state_update"
+            for ws in sockets:
+                ws.send_text("stop")
+                ws.__exit__(None, None, None)
+            results.append({"watchers": watchers, "requests": requests, **_percentiles(samples),
+                            "inference_per_sec": round(inference_rate, 1)})
+    return {"watch_executor": os.environ.get("WATCH_EXECUTOR", "thread"),
+            "watch_mode": os.environ.get("WATCH_MODE", "shared"), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--watchers", type=int, nargs="+", default=[0, 50])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--interval", type=float, default=0.01, help="Pausa entre peticiones (s).")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Espera tras conectar a los visores (s).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, force=True)
+    sys.path.insert(0, os.getcwd()) # Permite importar main tras cambiar de directorio
+    result = run(args.watchers, args.requests, args.interval, args.warmup)
+    print(json.dumps({"benchmark": "watch_latency", **result}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
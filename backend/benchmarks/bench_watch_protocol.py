@@ -0,0 +1,72 @@
+# backend/benchmarks/bench_watch_protocol.py
+"""
+Bytes y tiempo de codificación por frame de /ws/watch: JSON completo frente al protocolo
+binario con deltas (core/watch_protocol.py), con la serpiente fijada a varias longitudes
+(mismo recorrido que bench_env_step). Comprueba además que el decodificador reconstruye
+exactamente cada frame.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_watch_protocol --lengths 1 50 200 --frames 2000
+"""
+import argparse
+import json
+import logging
+import time
+
+from benchmarks.bench_env_step import _cycle, _prepare
+from core.snake_env import SnakeEnv
+from core.watch_protocol import DeltaFrameDecoder, DeltaFrameEncoder
+from core.watch_simulator import build_frame
+
+
+def _frames(length: int, count: int, board_size: int):
+    cells, actions = _cycle(board_size)
+    env = SnakeEnv(board_size=board_size, info_mode="none")
+    pos = _prepare(env, length, cells)
+    frames = [build_frame(env, False)]
+    for _ in range(count - 1):
+        env.step(actions[pos])
+        pos = (pos + 1) % len(cells)
+        frames.append(build_frame(env, False))
+    return frames
+
+
+def _measure(encode, frames):
+    start = time.perf_counter()
+    total = sum(len(encode(frame)) for frame in frames)
+    elapsed = time.perf_counter() - start
+    return total / len(frames), elapsed / len(frames) * 1e6
+
+
+def run(lengths, count: int, board_size: int):
+    results = []
+    for length in lengths:
+        frames = _frames(length, count, board_size)
+        json_bytes, json_us = _measure(
+            lambda frame: json.dumps({"type": "game_state_update", "data": frame}).encode(), frames)
+        delta_bytes, delta_us = _measure(DeltaFrameEncoder().encode, frames)
+
+        encoder, decoder = DeltaFrameEncoder(), DeltaFrameDecoder()
+        for frame in frames: # Ida y vuelta: el cliente debe ver exactamente el mismo estado
+            decoded = decoder.decode(encoder.encode(frame))
+            assert decoded["snake"] == frame["snake"] and decoded["food"] == frame["food"]
+
+        results.append({"snake_length": length,
+                        "json_bytes_per_frame": round(json_bytes, 1), "delta_bytes_per_frame": round(delta_bytes, 1),
+                        "json_us_per_frame": round(json_us, 2), "delta_us_per_frame": round(delta_us, 2),
+                        "bytes_ratio": round(json_bytes / delta_bytes, 1), "cpu_ratio": round(json_us / delta_us, 1)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--board-size", type=int, default=SnakeEnv.DEFAULT_BOARD_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps({"benchmark": "watch_protocol", "results": run(args.lengths, args.frames, args.board_size)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# backend/benchmarks/bench_ws_broadcast.py
+"""
+Latencia de entrega de mensajes de entrenamiento a clientes rápidos cuando hay un cliente
+lento conectado: envío secuencial (await send_text por conexión, el comportamiento anterior)
+frente a WebSocketManager (cola acotada + tarea escritora por conexión).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_ws_broadcast --fast-clients 10 --slow-delay 0.05 --messages 200
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+
+from api.websocket_manager import WebSocketManager
+
+
+class _FakeWebSocket:
+    """WebSocket simulado: cada envío tarda `delay` segundos y registra la latencia de entrega."""
+
+    def __init__(self, name: str, delay: float):
+        self.client = name
+        self.delay = delay
+        self.latencies = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        frame = json.loads(message)
+        now = time.perf_counter()
+        for item in frame["data"] if frame["type"] == "batch" else [frame]:
+            self.latencies.append(now - item["data"]["t"])
+
+
+async def _run_mode(mode: str, fast_clients: int, slow_delay: float, messages: int, interval: float):
+    # El lento primero: en el envío secuencial retrasa a todos los que van detrás
+    clients = [_FakeWebSocket("slow", slow_delay)] + [_FakeWebSocket(f"fast{i}", 0.0) for i in range(fast_clients)]
+    manager = WebSocketManager()
+    for ws in clients:
+        await manager.connect(ws, "training")
+
+    async def sequential_broadcast(message):
+        for ws in clients:
+            await ws.send_text(message)
+
+    pending = []
+    for i in range(messages):
+        message = json.dumps({"type": "training_metric", "data": {"i": i, "t": time.perf_counter()}})
+        if mode == "sequential": # Una tarea por mensaje que envía conexión a conexión
+            pending.append(asyncio.create_task(sequential_broadcast(message)))
+        else:
+            manager.publish_to_training(message)
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.1)
+    for task in pending:
+        task.cancel()
+    stats = manager.get_stats()
+    for ws in clients:
+        manager.disconnect(ws, "training")
+    fast = np.concatenate([ws.latencies for ws in clients[1:]]) * 1000.0
+    return {"mode": mode, "fast_delivered": int(fast.size), "fast_expected": fast_clients * messages,
+            "fast_p50_ms": round(float(np.percentile(fast, 50)), 2), "fast_p99_ms": round(float(np.percentile(fast, 99)), 2),
+            "slow_delivered": len(clients[0].latencies),
+            "dropped": stats["dropped"] if mode == "outbox" else None}
+
+
+def run(fast_clients: int, slow_delay: float, messages: int, interval: float):
+    return [asyncio.run(_run_mode(mode, fast_clients, slow_delay, messages, interval))
+            for mode in ("sequential", "outbox")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fast-clients", type=int, default=10)
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="Segundos por envío del cliente lento.")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01, help="Segundos entre mensajes.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps({"benchmark": "ws_broadcast",
+                      "results": run(args.fast_clients, args.slow_delay, args.messages, args.interval)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# backend/callbacks/stop_training_callback.py
+import logging
+import threading
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+logger = logging.getLogger(__name__)
+
+
+class StopTrainingCallback(BaseCallback):
+    """
+    Callback simple para detener el entrenamiento de SB3 cuando un evento threading se activa.
+    """
+    def __init__(self, stop_event: threading.Event, verbose=0):
+        super().__init__(verbose)
+        self.stop_event = stop_event
+
+    def _on_step(self) -> bool:
+        """
+        Se llama en cada paso del algoritmo. Devuelve False para detener el entrenamiento.
+        """
+        if self.stop_event.is_set():
+            logger.info("StopTrainingCallback: Señal de parada detectada.")
+            return False  # Detiene model.learn()
+        return True
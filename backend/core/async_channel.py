@@ -0,0 +1,91 @@
+# backend/core/async_channel.py
+import asyncio
+import collections
+import logging
+import queue
+import threading
+import time
+from typing import Any, Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadToAsyncChannel:
+    """
+    Canal de mensajes desde cualquier hilo hacia un único consumidor asyncio.
+
+    Los productores (ej. el hilo de entrenamiento) usan `put_nowait`, con la misma interfaz que
+    `queue.Queue` (lanza `queue.Full` si está lleno). El consumidor espera con `get_batch`, que
+    devuelve todo lo acumulado de una vez. Solo se despierta al bucle de eventos
+    (`call_soon_threadsafe`) cuando el canal pasa de vacío a no vacío: los mensajes que llegan
+    antes de que el consumidor se ejecute viajan en el mismo lote, sin crear tareas ni hilos.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self.maxsize = maxsize
+        self._items: Deque[Any] = collections.deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._wakeup_pending = False # Hay un despertar planificado que aún no ha vaciado el canal
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Asocia el canal al bucle del consumidor (llamar desde ese bucle)."""
+        self._ready = asyncio.Event()
+        with self._lock:
+            self._loop = loop
+            self._wakeup_pending = bool(self._items)
+        if self._wakeup_pending: # Mensajes encolados antes de tener bucle
+            self._ready.set()
+
+    def unbind(self) -> None:
+        with self._lock:
+            self._loop = None
+            self._wakeup_pending = False
+
+    def put_nowait(self, item: Any) -> None:
+        with self._lock:
+            if self.maxsize and len(self._items) >= self.maxsize:
+                raise queue.Full
+            self._items.append(item)
+            if self._wakeup_pending or self._loop is None:
+                return
+            self._wakeup_pending = True
+            loop = self._loop
+        try:
+            loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError: # Bucle cerrado (apagado de la aplicación)
+            logger.debug("ThreadToAsyncChannel: bucle cerrado, mensaje sin consumidor.")
+
+    def put(self, item: Any, poll_seconds: float = 0.01) -> bool:
+        """
+        Como `put_nowait`, pero espera mientras el canal esté lleno (para productores que pueden
+        esperar, ej. los hilos lectores de procesos hijo). False si se descarta porque no hay bucle.
+        """
+        while True:
+            try:
+                self.put_nowait(item)
+                return True
+            except queue.Full:
+                if self._loop is None:
+                    return False
+                time.sleep(poll_seconds)
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    async def get_batch(self) -> List[Any]:
+        """Espera a que haya mensajes y devuelve todos los pendientes, en orden de llegada."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            with self._lock:
+                items = list(self._items)
+                self._items.clear()
+                self._wakeup_pending = False
+            if items:
+                return items
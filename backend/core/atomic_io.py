@@ -0,0 +1,27 @@
+# backend/core/atomic_io.py
+"""
+Escritura atómica de ficheros: se escribe en un temporal del mismo directorio y se sustituye
+con `os.replace`, así un lector (ej. el ModelRegistry recargando best_model.zip) ve el
+fichero anterior o el nuevo completo, nunca uno a medio escribir.
+"""
+import os
+import tempfile
+
+
+def atomic_write_bytes(path: str, data: bytes, fsync: bool = True) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,229 @@
+# backend/core/batched_snake_env.py
+import logging
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, VecEnvIndices, VecEnvObs, VecEnvStepReturn
+
+from core.snake_env import SnakeEnv
+
+logger = logging.getLogger(__name__)
+
+# Vectores de movimiento (dy, dx) por acción: 0:Up, 1:Right, 2:Down, 3:Left
+_DELTAS = np.array([[-1, 0], [0, 1], [1, 0], [0, -1]], dtype=np.int32)
+
+
+class BatchedSnakeEnv(VecEnv):
+    """
+    VecEnv nativo de SB3 que simula N tableros de Snake a la vez sobre arrays NumPy apilados.
+
+    Reproduce la dinámica, recompensas y la observación de 18 características de `SnakeEnv`,
+    pero avanza todos los tableros en un único `step_wait` vectorizado (sin procesos ni IPC).
+    El estado de cada tablero es:
+      - `_board`: rejilla de ocupación con un borde de paredes (N, B+2, B+2), así las
+        colisiones (paredes o cuerpo) son un simple indexado.
+      - `_body`: ring buffer de segmentos (N, B*B, 2) en coordenadas con borde; la cabeza está
+        en `_head_idx` y los segmentos siguen en orden hasta `_length`.
+      - `_food`, `_direction`, contadores de pasos.
+
+    Los episodios terminados se reinician automáticamente (convención VecEnv de SB3:
+    `terminal_observation` y `TimeLimit.truncated` en `infos`). Para estadísticas de episodio
+    ("episode" en infos) envolver con `VecMonitor`.
+    """
+
+    def __init__(self, num_envs: int, board_size: int = SnakeEnv.DEFAULT_BOARD_SIZE, seed: Optional[int] = None):
+        assert num_envs >= 1
+        assert board_size >= 5
+        self.board_size = board_size
+        self.render_mode = None # Necesario antes de VecEnv.__init__ (lo consulta vía get_attr)
+        super().__init__(num_envs, SnakeEnv.build_observation_space(), spaces.Discrete(4))
+        logger.info(f"Inicializando BatchedSnakeEnv con num_envs={num_envs}, board_size={board_size}")
+
+        self.max_steps_without_food = board_size * board_size * 2
+        self._rng = np.random.default_rng(seed)
+        self._env_range = np.arange(num_envs)
+
+        padded = board_size + 2
+        capacity = board_size * board_size
+        self._board = np.zeros((num_envs, padded, padded), dtype=bool)
+        self._body = np.zeros((num_envs, capacity, 2), dtype=np.int32)
+        self._head_idx = np.zeros(num_envs, dtype=np.int64)
+        self._length = np.zeros(num_envs, dtype=np.int64)
+        self._food = np.zeros((num_envs, 2), dtype=np.int32)
+        self._direction = np.zeros(num_envs, dtype=np.int64)
+        self._current_step = np.zeros(num_envs, dtype=np.int64)
+        self._steps_since_food = np.zeros(num_envs, dtype=np.int64)
+        self._actions: Optional[np.ndarray] = None
+
+        self._reset_boards(self._env_range)
+
+    # --- Helpers de estado ---
+
+    def _heads(self) -> np.ndarray:
+        """Cabezas (N, 2) en coordenadas con borde."""
+        return self._body[self._env_range, self._head_idx]
+
+    def _reset_boards(self, idx: np.ndarray) -> None:
+        """Reinicia los tableros indicados (serpiente de longitud 1 en el centro)."""
+        if idx.size == 0:
+            return
+        center = self.board_size // 2 + 1 # +1 por el borde
+        self._board[idx] = False
+        self._board[idx, 0, :] = True; self._board[idx, -1, :] = True
+        self._board[idx, :, 0] = True; self._board[idx, :, -1] = True
+        self._head_idx[idx] = 0
+        self._length[idx] = 1
+        self._body[idx, 0] = (center, center)
+        self._board[idx, center, center] = True
+        self._direction[idx] = self._rng.integers(0, 4, size=idx.size)
+        self._current_step[idx] = 0
+        self._steps_since_food[idx] = 0
+        self._place_food(idx)
+
+    def _place_food(self, idx: np.ndarray) -> np.ndarray:
+        """
+        Coloca comida en una celda libre uniforme para los tableros indicados.
+        Devuelve una máscara (len(idx),) con los tableros que no tenían celdas libres.
+        """
+        if idx.size == 0:
+            return np.zeros(0, dtype=bool)
+        free = ~self._board[idx, 1:-1, 1:-1].reshape(idx.size, -1)
+        scores = self._rng.random(free.shape)
+        scores[~free] = -1.0
+        cells = scores.argmax(axis=1)
+        full = ~free.any(axis=1)
+        self._food[idx, 0] = cells // self.board_size + 1
+        self._food[idx, 1] = cells % self.board_size + 1
+        return full
+
+    def _get_obs(self) -> np.ndarray:
+        """Observación de 18 características para todos los tableros (misma codificación que SnakeEnv)."""
+        n, size = self.num_envs, self.board_size
+        heads = self._heads()
+        neighbours = heads[:, None, :] + _DELTAS[None, :, :] # (N, 4, 2)
+        danger = self._board[self._env_range[:, None], neighbours[..., 0], neighbours[..., 1]] # (N, 4) por acción
+        d = self._direction
+        head_y = heads[:, 0] - 1
+        head_x = heads[:, 1] - 1
+
+        obs = np.empty((n, SnakeEnv.OBS_DIM), dtype=np.float32)
+        obs[:, 0] = danger[self._env_range, d]           # Delante
+        obs[:, 1] = danger[self._env_range, (d + 1) % 4] # Izquierda (relativa, igual que SnakeEnv)
+        obs[:, 2] = danger[self._env_range, (d + 3) % 4] # Derecha
+        obs[:, 3] = danger[:, 0]; obs[:, 4] = danger[:, 2] # N, S
+        obs[:, 5] = danger[:, 1]; obs[:, 6] = danger[:, 3] # E, W
+        obs[:, 7] = np.clip((self._food[:, 0] - 1 - head_y) / size, -1., 1.)
+        obs[:, 8] = np.clip((self._food[:, 1] - 1 - head_x) / size, -1., 1.)
+        obs[:, 9] = head_y / (size - 1)
+        obs[:, 10] = (size - 1 - head_y) / (size - 1)
+        obs[:, 11] = head_x / (size - 1)
+        obs[:, 12] = (size - 1 - head_x) / (size - 1)
+        obs[:, 13:17] = 0.0
+        obs[self._env_range, 13 + d] = 1.0
+        obs[:, 17] = self._length / (size * size)
+        return obs
+
+    def action_masks(self) -> np.ndarray:
+        """Máscara (N, 4) de acciones válidas: inválida si lleva a pared o cuerpo actual."""
+        neighbours = self._heads()[:, None, :] + _DELTAS[None, :, :]
+        return ~self._board[self._env_range[:, None], neighbours[..., 0], neighbours[..., 1]]
+
+    # --- API VecEnv ---
+
+    def reset(self) -> VecEnvObs:
+        if self._seeds[0] is not None:
+            self._rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._reset_boards(self._env_range)
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self._get_obs()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        rows = self._env_range
+        actions = self._actions
+        old_heads = self._heads()
+        self._current_step += 1
+        self._steps_since_food += 1
+
+        # --- Dirección real (evitar reversa si longitud > 1) ---
+        reverse = (self._length > 1) & (actions == (self._direction + 2) % 4)
+        self._direction = np.where(reverse, self._direction, actions)
+        new_heads = old_heads + _DELTAS[self._direction]
+
+        # --- Colisiones, comida y recompensas ---
+        terminated = self._board[rows, new_heads[:, 0], new_heads[:, 1]]
+        alive = ~terminated
+        ate = alive & np.all(new_heads == self._food, axis=1)
+        old_dist = np.sqrt(((old_heads - self._food) ** 2).sum(axis=1))
+        new_dist = np.sqrt(((new_heads - self._food) ** 2).sum(axis=1))
+        rewards = SnakeEnv.REWARD_STEP + (old_dist - new_dist) * SnakeEnv.REWARD_DIST_FACTOR
+        rewards[ate] = SnakeEnv.REWARD_FOOD
+        rewards[terminated] = SnakeEnv.REWARD_DEATH
+        self._steps_since_food[ate] = 0
+
+        # --- Actualizar serpientes vivas: añadir cabeza y quitar cola si no comió ---
+        capacity = self._body.shape[1]
+        live = rows[alive]
+        self._head_idx[live] = (self._head_idx[live] - 1) % capacity
+        self._body[live, self._head_idx[live]] = new_heads[live]
+        self._board[live, new_heads[live, 0], new_heads[live, 1]] = True
+        grow = rows[ate]
+        self._length[grow] += 1
+        move = rows[alive & ~ate]
+        tails = self._body[move, (self._head_idx[move] + self._length[move]) % capacity]
+        self._board[move, tails[:, 0], tails[:, 1]] = False
+
+        # Tablero lleno tras comer: no queda sitio para la comida -> fin del episodio (victoria)
+        won = np.zeros(self.num_envs, dtype=bool)
+        won[grow] = self._place_food(grow)
+        terminated = terminated | won
+
+        truncated = ~terminated & (self._steps_since_food > self.max_steps_without_food)
+        dones = terminated | truncated
+
+        obs = self._get_obs()
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        done_idx = rows[dones]
+        if done_idx.size:
+            for i in done_idx:
+                infos[i]["terminal_observation"] = obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = bool(truncated[i])
+                infos[i]["snake_length"] = int(self._length[i])
+            self._reset_boards(done_idx)
+            obs[done_idx] = self._get_obs()[done_idx]
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def close(self) -> None:
+        logger.info("Cerrando BatchedSnakeEnv.")
+
+    def _indices(self, indices: VecEnvIndices) -> Sequence[int]:
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        value = getattr(self, attr_name)
+        return [value for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        """
+        Llama al método sobre el lote completo. Si devuelve un array con una fila por entorno
+        (ej. `action_masks`, que es lo que pide MaskablePPO) se reparte por índice.
+        """
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        if isinstance(result, np.ndarray) and result.shape[:1] == (self.num_envs,):
+            return [result[i] for i in self._indices(indices)]
+        return [result for _ in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices: VecEnvIndices = None) -> List[bool]:
+        return [False for _ in self._indices(indices)]
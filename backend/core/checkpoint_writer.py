@@ -0,0 +1,216 @@
+# backend/core/checkpoint_writer.py
+"""
+Guardado de modelos fuera del hilo de entrenamiento.
+
+`model.save()` serializa los atributos a JSON, hace `torch.save` de los state_dict y comprime
+el zip, todo dentro de `learn()`. Aquí el hilo de entrenamiento solo toma una instantánea
+(`take_snapshot`: copia de los tensores a CPU y de los contenedores mutables, lo mismo que
+guardaría `BaseAlgorithm.save`); un hilo del `CheckpointWriter` la convierte en el zip de SB3
+(cargable con `MaskablePPO.load`) y la escribe de forma atómica (`core/atomic_io.py`).
+
+Retención en el directorio de checkpoints (`rl_model_<paso>_steps.zip`, mismos nombres que
+CheckpointCallback), aplicada tras cada escritura:
+  - se conservan los `keep_last` más recientes;
+  - se conserva el checkpoint "mejor": el último anterior o igual al paso de la mejor
+    evaluación (`mark_best`, lo llama AsyncEvalCallback);
+  - de los más antiguos se conserva uno por tramo logarítmico de antigüedad
+    (floor(log2(último paso - paso))), siempre el más antiguo del tramo, así que el número de
+    ficheros crece como log2 de la longitud del entrenamiento.
+Al borrar un checkpoint se borra también su exportación mapeable (core/mmap_model.py), si existe.
+"""
+import copy
+import io
+import logging
+import math
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import torch
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.save_util import recursive_getattr, save_to_zip_file
+
+from core.atomic_io import atomic_write_bytes
+from core.mmap_model import remove_export
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEEP_LAST = 5
+CHECKPOINT_PREFIX = "rl_model"
+MAX_PENDING_CHECKPOINTS = 2 # Si el disco no da abasto se omiten checkpoints en vez de acumular instantáneas
+
+
+@dataclass
+class ModelSnapshot:
+    """Copia de lo que guarda `BaseAlgorithm.save`, independiente del modelo que sigue entrenando."""
+    timestep: int
+    data: Dict[str, Any]
+    params: Dict[str, Any]
+    pytorch_variables: Optional[Dict[str, Any]]
+
+
+def _clone_tensors(value: Any) -> Any:
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return {key: _clone_tensors(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_clone_tensors(item) for item in value)
+    return value
+
+
+def _copy_mutable(value: Any) -> Any:
+    # ep_info_buffer (deque) y los arrays del último paso cambian mientras se serializa en otro hilo
+    if isinstance(value, (deque, np.ndarray, list, dict)):
+        return copy.copy(value)
+    return value
+
+
+def take_snapshot(model: BaseAlgorithm) -> ModelSnapshot:
+    """Instantánea del modelo para serializarla en otro hilo (mismas exclusiones que `model.save`)."""
+    state_dicts_names, torch_variable_names = model._get_torch_save_params()
+    exclude = set(model._excluded_save_params())
+    exclude.update(name.split(".")[0] for name in state_dicts_names + torch_variable_names)
+    data = {key: _copy_mutable(value) for key, value in model.__dict__.items() if key not in exclude}
+    pytorch_variables = None
+    if torch_variable_names is not None:
+        pytorch_variables = {name: _clone_tensors(recursive_getattr(model, name)) for name in torch_variable_names}
+    return ModelSnapshot(timestep=model.num_timesteps, data=data, params=_clone_tensors(model.get_parameters()),
+                         pytorch_variables=pytorch_variables)
+
+
+def serialize_snapshot(snapshot: ModelSnapshot) -> bytes:
+    """Zip de SB3 a partir de la instantánea (el mismo contenido que escribiría `model.save`)."""
+    buffer = io.BytesIO()
+    save_to_zip_file(buffer, data=snapshot.data, params=snapshot.params, pytorch_variables=snapshot.pytorch_variables)
+    return buffer.getvalue()
+
+
+def retained_steps(steps: Iterable[int], keep_last: int, best_step: Optional[int] = None) -> Set[int]:
+    """Pasos de checkpoint que sobreviven a la política de retención (ver el docstring del módulo)."""
+    ordered = sorted(set(steps))
+    if not ordered:
+        return set()
+    keep = set(ordered[-keep_last:]) if keep_last > 0 else set()
+    if best_step is not None:
+        candidates = [step for step in ordered if step <= best_step]
+        if candidates:
+            keep.add(candidates[-1])
+    latest = ordered[-1]
+    buckets: Set[int] = set()
+    for step in ordered: # De más antiguo a más reciente: gana el más antiguo de cada tramo
+        if step == latest:
+            continue
+        bucket = int(math.log2(latest - step))
+        if bucket not in buckets:
+            buckets.add(bucket)
+            keep.add(step)
+    return keep
+
+
+class CheckpointWriter:
+    """Un hilo que serializa y escribe instantáneas; aplica la retención en `checkpoint_dir`."""
+
+    def __init__(self, checkpoint_dir: str, keep_last: int = DEFAULT_KEEP_LAST, name_prefix: str = CHECKPOINT_PREFIX,
+                 adopt_existing: bool = False):
+        """
+        :param adopt_existing: Incluir en la retención los checkpoints que ya había en el directorio
+            (al continuar un entrenamiento). Si no, solo se gestionan los escritos por este writer y los
+            de sesiones anteriores no se tocan.
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_last = keep_last
+        self.name_prefix = name_prefix
+        self._pattern = re.compile(rf"^{re.escape(name_prefix)}_(\d+)_steps\.zip$")
+        self._managed: Set[int] = set(self._existing_steps()) if adopt_existing else set()
+        self._best_step: Optional[int] = None
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CheckpointWriter")
+        self.written = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    def checkpoint_path(self, timestep: int) -> str:
+        return os.path.join(self.checkpoint_dir, f"{self.name_prefix}_{timestep}_steps.zip")
+
+    def save(self, snapshot: ModelSnapshot, path: str) -> Future:
+        """Escribe la instantánea en `path` (ej. last_model.zip). El future falla si la escritura falla."""
+        return self._executor.submit(self._write, snapshot, path)
+
+    def save_checkpoint(self, snapshot: ModelSnapshot) -> Optional[Future]:
+        """Checkpoint periódico con retención. None si se omite porque aún hay escrituras pendientes."""
+        with self._lock:
+            self._pending = [future for future in self._pending if not future.done()]
+            if len(self._pending) >= MAX_PENDING_CHECKPOINTS:
+                self.skipped += 1
+                logger.warning(f"Checkpoint del paso {snapshot.timestep} omitido: hay {len(self._pending)} escrituras pendientes.")
+                return None
+            future = self._executor.submit(self._write_checkpoint, snapshot)
+            self._pending.append(future)
+            return future
+
+    def mark_best(self, timestep: int) -> None:
+        """Paso de la mejor evaluación: su checkpoint (o el anterior más cercano) no se borra."""
+        self._best_step = timestep
+
+    def close(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _write(self, snapshot: ModelSnapshot, path: str) -> None:
+        atomic_write_bytes(path, serialize_snapshot(snapshot))
+        self.written += 1
+
+    def _write_checkpoint(self, snapshot: ModelSnapshot) -> None:
+        try:
+            self._write(snapshot, self.checkpoint_path(snapshot.timestep))
+        except OSError as e:
+            logger.error(f"Error guardando el checkpoint del paso {snapshot.timestep}: {e}", exc_info=True)
+            return
+        self._managed.add(snapshot.timestep)
+        self._apply_retention()
+
+    def _existing_steps(self) -> List[int]:
+        try:
+            names = os.listdir(self.checkpoint_dir)
+        except FileNotFoundError:
+            return []
+        return [int(match.group(1)) for match in map(self._pattern.match, names) if match]
+
+    def _apply_retention(self) -> None:
+        keep = retained_steps(self._managed, self.keep_last, self._best_step)
+        for step in sorted(self._managed - keep):
+            try:
+                os.remove(self.checkpoint_path(step))
+                remove_export(self.checkpoint_path(step)) # Conversión con `python -m core.mmap_model`, si la hay
+                self.deleted += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"No se pudo borrar el checkpoint del paso {step}: {e}")
+                continue
+            self._managed.discard(step)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"written": self.written, "skipped": self.skipped, "deleted": self.deleted,
+                "retained": sorted(self._managed), "best_step": self._best_step}
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """Sustituye a CheckpointCallback: cada `save_freq` llamadas toma una instantánea y la entrega al writer."""
+
+    def __init__(self, writer: CheckpointWriter, save_freq: int, verbose: int = 0):
+        super().__init__(verbose)
+        self.writer = writer
+        self.save_freq = save_freq
+
+    def _on_step(self) -> bool:
+        if self.save_freq > 0 and self.n_calls % self.save_freq == 0:
+            self.writer.save_checkpoint(take_snapshot(self.model))
+        return True
@@ -0,0 +1,143 @@
+# backend/core/cpu_placement.py
+"""
+Reparto de núcleos entre el learner (proceso de entrenamiento, hilos de torch) y los workers
+de los VecEnv con subprocesos ('subproc', 'shared_memory').
+
+Sin reparto, torch abre un hilo por núcleo y cada worker puede ejecutarse en cualquier núcleo
+(y abrir sus propios pools OpenMP/MKL): el learner y los workers se pisan y se invalidan las
+cachés. Con `placement="auto"`:
+  - cada worker se fija a un núcleo físico propio (con sus hermanos SMT) y arranca con
+    OMP/MKL/OpenBLAS a 1 hilo;
+  - el learner se queda con los núcleos físicos restantes (al menos uno) y usa un hilo de torch
+    por núcleo físico;
+  - con VecEnv de un solo proceso ('batched', 'dummy') no hay workers: el learner usa todos.
+La topología sale de /sys (Linux) y, si no está disponible, de los contadores de psutil que ya
+usa `TrainingManager.get_hardware_info`. Solo se reparten los núcleos de la afinidad actual del
+proceso (ej. los asignados a un run por el RunScheduler).
+"""
+import contextlib
+import logging
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+import psutil
+
+try: # Opcional: limita en caliente los pools de hilos de BLAS/OpenMP ya cargados
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+logger = logging.getLogger(__name__)
+
+WORKER_PROCESS_KINDS = ("subproc", "shared_memory") # VecEnv con un proceso por entorno
+# Variables que fijan el tamaño de los pools de hilos de las librerías numéricas al importarse
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def _available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(psutil.cpu_count(logical=True) or 1))
+
+
+def cpu_topology() -> List[List[int]]:
+    """Núcleos físicos disponibles, cada uno como la lista de sus CPUs lógicas (hermanos SMT)."""
+    cpus = _available_cpus()
+    cores: Dict[tuple, List[int]] = {}
+    try:
+        for cpu in cpus:
+            base = f"/sys/devices/system/cpu/cpu{cpu}/topology"
+            with open(f"{base}/physical_package_id") as f:
+                package = int(f.read())
+            with open(f"{base}/core_id") as f:
+                core = int(f.read())
+            cores.setdefault((package, core), []).append(cpu)
+        return [sorted(siblings) for _, siblings in sorted(cores.items(), key=lambda item: min(item[1]))]
+    except (OSError, ValueError):
+        # Sin /sys: agrupar las CPUs lógicas consecutivas según la proporción lógicas/físicas de psutil
+        logical = psutil.cpu_count(logical=True) or len(cpus)
+        physical = psutil.cpu_count(logical=False) or logical
+        per_core = max(logical // physical, 1)
+        return [cpus[i:i + per_core] for i in range(0, len(cpus), per_core)]
+
+
+@dataclass
+class PlacementPlan:
+    """CPUs del learner, CPUs de cada worker (vacío si no hay workers en procesos) e hilos de torch."""
+    learner_cpus: List[int]
+    torch_threads: int
+    worker_cpus: List[List[int]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def plan_placement(vec_env_kind: str, n_envs: int, cores: Optional[List[List[int]]] = None) -> PlacementPlan:
+    """Reparto "auto" (ver el docstring del módulo) para `n_envs` entornos del VecEnv indicado."""
+    cores = cores if cores is not None else cpu_topology()
+    if vec_env_kind not in WORKER_PROCESS_KINDS:
+        return PlacementPlan(learner_cpus=sorted(cpu for core in cores for cpu in core), torch_threads=len(cores))
+    n_learner = max(len(cores) - n_envs, 1)
+    learner_cores = cores[:n_learner]
+    worker_pool = cores[n_learner:] or cores # Sin núcleos libres los workers comparten con el learner
+    return PlacementPlan(learner_cpus=sorted(cpu for core in learner_cores for cpu in core), torch_threads=n_learner,
+                         worker_cpus=[list(worker_pool[i % len(worker_pool)]) for i in range(n_envs)])
+
+
+def pin_process(cpus: List[int]) -> None:
+    """
+    Fija todos los hilos ya creados del proceso actual (y los que cree después) a `cpus`.
+    `os.sched_setaffinity(0, ...)` en Linux solo afecta al hilo que llama.
+    """
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        tids = [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        tids = [0]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError as e: # Hilo ya terminado o CPU fuera del cpuset
+            logger.debug(f"No se pudo fijar la afinidad del hilo {tid}: {e}")
+
+
+def configure_worker(cpus: Optional[List[int]]) -> None:
+    """
+    Al arrancar un worker con reparto: afinidad y librerías numéricas a un hilo. Las ya cargadas
+    (numpy se importa antes de llegar aquí) se limitan con threadpoolctl si está instalado;
+    si no, solo cuenta lo heredado de `worker_thread_env`.
+    """
+    if not cpus:
+        return
+    pin_process(cpus)
+    os.environ.update({name: "1" for name in THREAD_ENV_VARS}) # Para las que se carguen después
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(1)
+
+
+@contextlib.contextmanager
+def worker_thread_env(threads: Optional[int]) -> Iterator[None]:
+    """
+    Durante el bloque, THREAD_ENV_VARS = `threads` en el entorno del proceso, para que los
+    workers lanzados dentro lo hereden antes de importar numpy. Con spawn siempre; con
+    forkserver, solo si el servidor arranca dentro del bloque (entonces también lo heredan los
+    workers posteriores). None = no tocar el entorno.
+    """
+    if threads is None:
+        yield
+        return
+    previous = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
@@ -0,0 +1,253 @@
+# backend/core/evaluation_service.py
+"""
+Evaluación asíncrona del agente durante el entrenamiento (sustituye a EvalCallback de SB3).
+
+EvalCallback juega sus episodios en serie dentro de `learn()`, que se detiene mientras tanto.
+`AsyncEvalCallback` solo toma una instantánea del modelo (`take_snapshot`, ver
+core/checkpoint_writer.py); el zip se genera en un hilo aparte, que reparte los episodios
+entre los procesos de un pool; cada proceso los juega en un
+BatchedSnakeEnv (varios tableros por paso) con la política determinista y máscaras de
+acciones. Los resultados vuelven por un future y el callback los recoge al final de cada
+rollout: los publica ('training_eval'), los añade a `evaluations.npz` y, si la media mejora,
+escribe la instantánea como `best_model.zip` de forma atómica en un hilo aparte, junto con su
+exportación mapeable (core/mmap_model.py) que carga el modo "Ver IA" y, si se pide, su
+exportación ONNX (core/onnx_model.py).
+Si la evaluación anterior no ha terminado cuando toca otra, esta se salta.
+"""
+import io
+import json
+import logging
+import math
+import multiprocessing as mp
+import os
+import queue
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecMonitor
+
+from core.atomic_io import atomic_write_bytes
+from core.checkpoint_writer import CheckpointWriter, ModelSnapshot, serialize_snapshot, take_snapshot
+from core.mmap_model import export_mmap_model
+from core.onnx_model import export_onnx_model, remove_onnx_export
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVAL_EPISODES = 50
+DEFAULT_EVAL_WORKERS = 2
+MAX_ENVS_PER_TASK = 16 # Tableros simultáneos por proceso de evaluación
+EVAL_WORKER_NICE = 5 # Los procesos de evaluación ceden CPU al learner
+FINAL_EVAL_TIMEOUT = 60.0 # Espera máxima a la evaluación en curso al terminar el entrenamiento
+
+# Modelo cacheado en cada proceso del pool: se carga entero la primera vez y luego solo los pesos
+_worker_model = None
+
+
+def _init_eval_worker() -> None:
+    import torch
+    import sb3_contrib # noqa: F401 - importación lenta: se paga al arrancar el pool, no en la primera evaluación
+    torch.set_num_threads(1)
+    try:
+        os.nice(EVAL_WORKER_NICE)
+    except OSError:
+        pass
+
+
+def _warm_up() -> None:
+    """Tarea vacía para que el pool arranque sus procesos al empezar el entrenamiento."""
+
+
+def _evaluate_snapshot(snapshot: bytes, board_size: int, n_episodes: int, seed: int) -> Tuple[List[float], List[int]]:
+    """Tarea del pool: juega `n_episodes` episodios deterministas con la instantánea del modelo."""
+    global _worker_model
+    from sb3_contrib import MaskablePPO
+    from sb3_contrib.common.maskable.evaluation import evaluate_policy
+    from core.batched_snake_env import BatchedSnakeEnv
+
+    if _worker_model is None:
+        _worker_model = MaskablePPO.load(io.BytesIO(snapshot), device="cpu")
+    else:
+        _worker_model.set_parameters(io.BytesIO(snapshot), exact_match=True, device="cpu")
+    env = VecMonitor(BatchedSnakeEnv(num_envs=min(n_episodes, MAX_ENVS_PER_TASK), board_size=board_size, seed=seed))
+    try:
+        rewards, lengths = evaluate_policy(_worker_model.policy, env, n_eval_episodes=n_episodes,
+                                           deterministic=True, return_episode_rewards=True)
+    finally:
+        env.close()
+    return [float(r) for r in rewards], [int(l) for l in lengths]
+
+
+class AsyncEvalCallback(BaseCallback):
+    """Ver el docstring del módulo."""
+
+    def __init__(self, board_size: int, eval_freq: int, best_model_save_path: str, log_path: Optional[str] = None,
+                 n_eval_episodes: int = DEFAULT_EVAL_EPISODES, n_workers: int = DEFAULT_EVAL_WORKERS,
+                 update_queue=None, checkpoint_writer: Optional[CheckpointWriter] = None, seed: int = 0,
+                 onnx_export: bool = False, onnx_quantize: bool = False, verbose: int = 0):
+        """
+        :param eval_freq: Llamadas a `_on_step` entre evaluaciones (como en EvalCallback).
+        :param update_queue: Canal del TrainingManager para los mensajes 'training_eval' (opcional).
+        :param checkpoint_writer: Se le avisa del paso de cada nuevo mejor modelo (retención).
+        :param onnx_export: Exportar también cada nuevo mejor modelo a ONNX (`onnx_quantize`: y a int8).
+        """
+        super().__init__(verbose)
+        self.board_size = board_size
+        self.eval_freq = eval_freq
+        self.best_model_path = os.path.join(best_model_save_path, "best_model.zip")
+        self.evaluations_path = os.path.join(log_path, "evaluations.npz") if log_path else None
+        self.n_eval_episodes = n_eval_episodes
+        self.n_workers = max(n_workers, 1)
+        self.update_queue = update_queue
+        self.checkpoint_writer = checkpoint_writer
+        self.seed = seed
+        self.onnx_export = onnx_export
+        self.onnx_quantize = onnx_quantize
+        self.best_mean_reward = -math.inf
+        self.evaluations = 0
+        self.skipped = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        # (timestep, t0, future del hilo escritor que devuelve (zip, futures del pool))
+        self._pending: Optional[Tuple[int, float, Future]] = None
+        self._timesteps: List[int] = []
+        self._results: List[List[float]] = []
+        self._ep_lengths: List[List[int]] = []
+
+    def _on_training_start(self) -> None:
+        # forkserver/spawn: el proceso de entrenamiento tiene hilos (lector de la cola, torch)
+        context = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+        self._pool = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=context, initializer=_init_eval_worker)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="EvalWriter")
+        for _ in range(self.n_workers):
+            self._pool.submit(_warm_up)
+
+    def _on_step(self) -> bool:
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            self._start_evaluation()
+        return True
+
+    def _on_rollout_end(self) -> None:
+        if self._pending is not None and self._ready(self._pending[2]):
+            self._collect()
+
+    def _on_training_end(self) -> None:
+        if self._pending is not None:
+            dispatch = self._pending[2]
+            wait([dispatch], timeout=FINAL_EVAL_TIMEOUT)
+            if dispatch.done() and dispatch.exception() is None:
+                wait(dispatch.result()[1], timeout=FINAL_EVAL_TIMEOUT)
+            if self._ready(dispatch):
+                self._collect()
+        self.close()
+
+    def close(self) -> None:
+        """Espera a las escrituras pendientes y libera el pool (también si `learn()` falló)."""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._pending = None
+
+    @staticmethod
+    def _ready(dispatch: Future) -> bool:
+        if not dispatch.done():
+            return False
+        return dispatch.exception() is not None or all(f.done() for f in dispatch.result()[1])
+
+    def _start_evaluation(self) -> None:
+        if self._pending is not None:
+            self.skipped += 1
+            logger.info(f"Evaluación en el paso {self.num_timesteps} omitida: la anterior sigue en curso.")
+            return
+        dispatch = self._writer.submit(self._dispatch, take_snapshot(self.model), self.seed + self.evaluations * 1000)
+        self._pending = (self.num_timesteps, time.perf_counter(), dispatch)
+
+    def _dispatch(self, snapshot: ModelSnapshot, seed: int) -> Tuple[bytes, List[Future]]:
+        """Hilo escritor: genera el zip y reparte los episodios entre los procesos (semillas distintas por tarea)."""
+        data = serialize_snapshot(snapshot)
+        counts = [self.n_eval_episodes // self.n_workers + (1 if i < self.n_eval_episodes % self.n_workers else 0)
+                  for i in range(self.n_workers)]
+        futures = [self._pool.submit(_evaluate_snapshot, data, self.board_size, count, seed + i)
+                   for i, count in enumerate(counts) if count > 0]
+        return data, futures
+
+    def _collect(self) -> None:
+        timestep, started, dispatch = self._pending
+        self._pending = None
+        rewards: List[float] = []
+        lengths: List[int] = []
+        try:
+            snapshot, futures = dispatch.result()
+            for future in futures:
+                task_rewards, task_lengths = future.result()
+                rewards.extend(task_rewards)
+                lengths.extend(task_lengths)
+        except Exception as e:
+            logger.error(f"Error en la evaluación del paso {timestep}: {e}", exc_info=True)
+            return
+        self.evaluations += 1
+        mean_reward, std_reward = float(np.mean(rewards)), float(np.std(rewards))
+        mean_length = float(np.mean(lengths))
+        is_best = mean_reward > self.best_mean_reward
+        if is_best:
+            self.best_mean_reward = mean_reward
+            self._writer.submit(self._write_best, snapshot, timestep, mean_reward)
+            if self.checkpoint_writer is not None:
+                self.checkpoint_writer.mark_best(timestep)
+        self._timesteps.append(timestep)
+        self._results.append(rewards)
+        self._ep_lengths.append(lengths)
+        if self.evaluations_path:
+            self._writer.submit(self._write_evaluations, list(self._timesteps), list(self._results), list(self._ep_lengths))
+        self.logger.record("eval/mean_reward", mean_reward)
+        self.logger.record("eval/mean_ep_length", mean_length)
+        seconds = time.perf_counter() - started
+        logger.info(f"Evaluación del paso {timestep}: {len(rewards)} episodios, recompensa {mean_reward:.2f} ± {std_reward:.2f}, "
+                    f"longitud {mean_length:.1f} ({seconds:.1f}s){' - nuevo mejor modelo' if is_best else ''}")
+        if self.update_queue is not None:
+            message = {"type": "training_eval", "data": {
+                "timestep": timestep, "episodes": len(rewards), "mean_reward": round(mean_reward, 2),
+                "std_reward": round(std_reward, 2), "mean_ep_length": round(mean_length, 2),
+                "best_mean_reward": round(self.best_mean_reward, 2), "is_best": is_best, "seconds": round(seconds, 2)}}
+            try:
+                self.update_queue.put_nowait(json.dumps(message))
+            except queue.Full:
+                pass
+
+    def _write_best(self, snapshot: bytes, timestep: int, mean_reward: float) -> None:
+        try:
+            atomic_write_bytes(self.best_model_path, snapshot)
+            logger.info(f"Nuevo best_model.zip (paso {timestep}, recompensa media {mean_reward:.2f}).")
+        except OSError as e:
+            logger.error(f"Error guardando best_model.zip: {e}", exc_info=True)
+            return
+        try:
+            export_mmap_model(self.best_model_path, board_size=self.board_size)
+        except (OSError, ValueError) as e: # Sin exportación el ModelRegistry carga el zip
+            logger.error(f"Error exportando best_model.zip al formato mapeable: {e}", exc_info=True)
+            return
+        if not self.onnx_export:
+            remove_onnx_export(self.best_model_path) # No dejar un ONNX de un mejor modelo anterior
+            return
+        try:
+            export_onnx_model(self.best_model_path, quantize=self.onnx_quantize)
+        except (ImportError, OSError, ValueError) as e: # El runtime ONNX del ModelRegistry recurre a NumPy
+            logger.error(f"Error exportando best_model.zip a ONNX: {e}", exc_info=True)
+
+    def _write_evaluations(self, timesteps: List[int], results: List[List[float]], ep_lengths: List[List[int]]) -> None:
+        """Mismo fichero que EvalCallback; las filas pueden tener distinto número de episodios si cambia la config."""
+        try:
+            buffer = io.BytesIO()
+            np.savez(buffer, timesteps=np.array(timesteps), results=np.array(results, dtype=object),
+                     ep_lengths=np.array(ep_lengths, dtype=object))
+            atomic_write_bytes(self.evaluations_path, buffer.getvalue(), fsync=False)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error guardando evaluations.npz: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"evaluations": self.evaluations, "skipped": self.skipped, "best_mean_reward": self.best_mean_reward}
@@ -0,0 +1,164 @@
+# backend/core/inference_batcher.py
+import asyncio
+import contextlib
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tiempo máximo que se espera a más observaciones tras la primera. No se paga cuando ya no puede
+# llegar nada más: si los productores registrados con `session()` tienen todos su petición en el
+# lote (ej. un único visor), se procesa al momento. Solo las peticiones de código sin sesión
+# (productores desconocidos) esperan la ventana completa.
+DEFAULT_WINDOW_SECONDS = 0.002
+DEFAULT_MAX_BATCH = 256
+
+_STOP = object() # Centinela para detener el hilo
+
+
+class InferenceBatcher:
+    """
+    Agrupa las inferencias de todas las sesiones de /ws/watch en pasadas forward por lotes.
+
+    Las sesiones envían (modelo, observación) con `submit` (desde cualquier hilo) o `predict`
+    (desde el bucle de eventos). Un hilo trabajador recoge las peticiones pendientes durante
+    `window_seconds` (o hasta `max_batch`), las agrupa por modelo, hace un único
+    `model.predict(batch, deterministic=True)` por grupo y reparte las acciones a cada futuro.
+    Así N visores cuestan aproximadamente una pasada por tick en lugar de N, y la inferencia
+    no se ejecuta en el bucle de eventos.
+
+    Cada productor que envía una petición tras otra (ej. una simulación) se registra con
+    `with batcher.session():`; el lote se cierra en cuanto todos los productores activos tienen
+    una petición pendiente, sin agotar la ventana.
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, max_batch: int = DEFAULT_MAX_BATCH):
+        assert max_batch >= 1
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._requests: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._producers_lock = threading.Lock()
+        self._active_producers = 0
+        # Contadores para diagnóstico
+        self.batches = 0
+        self.requests = 0
+        self.max_batch_seen = 0
+
+    # --- API pública ---
+
+    def submit(self, model: Any, obs: np.ndarray) -> "Future[int]":
+        """Encola una observación; el futuro se resuelve con la acción (int)."""
+        self._ensure_started()
+        future: "Future[int]" = Future()
+        self._requests.put((model, obs, future))
+        return future
+
+    async def predict(self, model: Any, obs: np.ndarray) -> int:
+        """Versión awaitable de `submit` para usar desde el bucle de eventos."""
+        return await asyncio.wrap_future(self.submit(model, obs))
+
+    @contextlib.contextmanager
+    def session(self) -> Iterator["InferenceBatcher"]:
+        """Registra un productor activo (como mucho una petición pendiente a la vez) mientras dura el bloque."""
+        with self._producers_lock:
+            self._active_producers += 1
+        try:
+            yield self
+        finally:
+            with self._producers_lock:
+                self._active_producers -= 1
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Detiene el hilo trabajador (las peticiones pendientes se cancelan)."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._requests.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"batches": self.batches, "requests": self.requests, "max_batch_seen": self.max_batch_seen,
+                "active_producers": self._active_producers,
+                "mean_batch": round(self.requests / self.batches, 2) if self.batches else 0.0}
+
+    # --- Hilo trabajador ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="InferenceBatcher", daemon=True)
+                self._thread.start()
+                logger.info("InferenceBatcher: hilo de inferencia iniciado.")
+
+    def _all_producers_waiting(self, pending: int) -> bool:
+        """True si cada productor registrado ya tiene su petición en el lote (no va a llegar otra)."""
+        return 0 < self._active_producers <= pending
+
+    def _collect(self) -> Tuple[List[tuple], bool]:
+        """Bloquea hasta la primera petición y recoge las que lleguen dentro de la ventana."""
+        first = self._requests.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch and not self._all_producers_waiting(len(batch)):
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if batch:
+                self._process(batch)
+        # Cancelar lo que quede en la cola
+        while True:
+            try:
+                item = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[2].cancel()
+        logger.info("InferenceBatcher: hilo de inferencia detenido.")
+
+    def _process(self, batch: List[tuple]) -> None:
+        groups: Dict[int, List[tuple]] = {}
+        for request in batch:
+            groups.setdefault(id(request[0]), []).append(request)
+        for requests in groups.values():
+            model = requests[0][0]
+            # Descartar peticiones canceladas (ej. la sesión se detuvo mientras esperaba)
+            pending = [(o, future) for _, o, future in requests if future.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+            futures = [future for _, future in pending]
+            obs = np.stack([np.asarray(o, dtype=np.float32) for o, _ in pending])
+            try:
+                actions, _ = model.predict(obs, deterministic=True)
+            except Exception as e:
+                logger.error(f"InferenceBatcher: error en predict por lotes: {e}", exc_info=True)
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, action in zip(futures, np.asarray(actions).reshape(len(futures))):
+                future.set_result(int(action))
+            self.batches += 1
+            self.requests += len(futures)
+            self.max_batch_seen = max(self.max_batch_seen, len(futures))
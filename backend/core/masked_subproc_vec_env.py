@@ -0,0 +1,142 @@
+# backend/core/masked_subproc_vec_env.py
+import logging
+import multiprocessing as mp
+from typing import Any, Callable, List, Optional
+
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnvIndices, VecEnvObs, VecEnvStepReturn
+from stable_baselines3.common.vec_env.patch_gym import _patch_env
+from stable_baselines3.common.vec_env.subproc_vec_env import SubprocVecEnv, _stack_obs
+
+from core.cpu_placement import configure_worker, worker_thread_env
+
+logger = logging.getLogger(__name__)
+
+ACTION_MASKS_METHOD = "action_masks" # Nombre que usa sb3_contrib (get_action_masks)
+
+
+def _masked_worker(remote, parent_remote, env_fn_wrapper: CloudpickleWrapper, cpus: Optional[List[int]] = None) -> None:
+    """
+    Igual que el worker de SubprocVecEnv, pero 'step' y 'reset' devuelven también la máscara
+    de acciones del estado resultante, en el mismo mensaje.
+    """
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    configure_worker(cpus)
+    env = _patch_env(env_fn_wrapper.var())
+    action_masks = env.get_wrapper_attr(ACTION_MASKS_METHOD)
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                observation, reward, terminated, truncated, info = env.step(data)
+                done = terminated or truncated
+                info["TimeLimit.truncated"] = truncated and not terminated
+                reset_info = {}
+                if done:
+                    # Guardar observación final y reiniciar (convención VecEnv de SB3)
+                    info["terminal_observation"] = observation
+                    observation, reset_info = env.reset()
+                remote.send((observation, reward, done, info, reset_info, action_masks()))
+            elif cmd == "reset":
+                maybe_options = {"options": data[1]} if data[1] else {}
+                observation, reset_info = env.reset(seed=data[0], **maybe_options)
+                remote.send((observation, reset_info, action_masks()))
+            elif cmd == "render":
+                remote.send(env.render())
+            elif cmd == "close":
+                env.close()
+                remote.close()
+                break
+            elif cmd == "get_spaces":
+                remote.send((env.observation_space, env.action_space))
+            elif cmd == "env_method":
+                method = env.get_wrapper_attr(data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == "get_attr":
+                remote.send(env.get_wrapper_attr(data))
+            elif cmd == "has_attr":
+                try:
+                    env.get_wrapper_attr(data)
+                    remote.send(True)
+                except AttributeError:
+                    remote.send(False)
+            elif cmd == "set_attr":
+                remote.send(setattr(env, data[0], data[1]))
+            elif cmd == "is_wrapped":
+                remote.send(is_wrapped(env, data))
+            else:
+                raise NotImplementedError(f"`{cmd}` no está implementado en el worker")
+        except (EOFError, KeyboardInterrupt):
+            break
+
+
+class MaskedSubprocVecEnv(SubprocVecEnv):
+    """
+    SubprocVecEnv que recibe observación, recompensa, info y máscara de acciones en un único
+    mensaje por worker y paso.
+
+    MaskablePPO obtiene las máscaras con `env_method("action_masks")`; con SubprocVecEnv eso
+    supone un segundo round-trip a cada worker en cada paso. Aquí las máscaras llegan junto
+    con el resultado de `step`/`reset` y se sirven desde caché (sin IPC).
+    Los entornos deben exponer `action_masks()` (ej. SnakeEnv).
+    `worker_cpus` (uno por entorno, ver core/cpu_placement.py) fija cada worker a sus CPUs y
+    lo arranca con las librerías numéricas a un hilo.
+    """
+
+    def __init__(self, env_fns: List[Callable[[], gym.Env]], start_method: Optional[str] = None,
+                 worker_cpus: Optional[List[List[int]]] = None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        if start_method is None:
+            forkserver_available = "forkserver" in mp.get_all_start_methods()
+            start_method = "forkserver" if forkserver_available else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        with worker_thread_env(1 if worker_cpus else None):
+            for env_idx, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+                args = (work_remote, remote, CloudpickleWrapper(env_fn), worker_cpus[env_idx] if worker_cpus else None)
+                process = ctx.Process(target=_masked_worker, args=args, daemon=True)
+                process.start()
+                self.processes.append(process)
+                work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        observation_space, action_space = self.remotes[0].recv()
+        self._action_masks = np.ones((n_envs, action_space.n), dtype=bool)
+
+        # Llamar a VecEnv.__init__ directamente (el __init__ de SubprocVecEnv crearía sus propios workers)
+        super(SubprocVecEnv, self).__init__(n_envs, observation_space, action_space)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        obs, rews, dones, infos, self.reset_infos, masks = zip(*results)
+        self._action_masks = np.stack(masks)
+        return _stack_obs(obs, self.observation_space), np.stack(rews), np.stack(dones), infos
+
+    def reset(self) -> VecEnvObs:
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        results = [remote.recv() for remote in self.remotes]
+        obs, self.reset_infos, masks = zip(*results)
+        self._action_masks = np.stack(masks)
+        self._reset_seeds()
+        self._reset_options()
+        return _stack_obs(obs, self.observation_space)
+
+    def action_masks(self) -> np.ndarray:
+        """Máscaras (n_envs, n_actions) del último step/reset, sin IPC."""
+        return self._action_masks.copy()
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        """Sirve `action_masks` desde la caché; el resto de métodos van a los workers."""
+        if method_name == ACTION_MASKS_METHOD and not method_args and not method_kwargs:
+            return [self._action_masks[i].copy() for i in self._get_indices(indices)]
+        return super().env_method(method_name, *method_args, indices=indices, **method_kwargs)
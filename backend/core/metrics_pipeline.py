@@ -0,0 +1,115 @@
+# backend/core/metrics_pipeline.py
+"""
+Etapa de agregación de métricas de entrenamiento entre el callback de SB3 y los WebSockets.
+
+El hilo de entrenamiento solo entrega `RolloutSample` con números Python (sin numpy ni JSON);
+el `MetricsAggregator` los acumula en el bucle de eventos (Python puro, las listas son pequeñas)
+y emite un único mensaje 'training_metric' por ventana de tiempo con mean/min/max/p95 de cada
+métrica.
+"""
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+DEFAULT_WINDOW_SECONDS = 1.0 # Cadencia de emisión; 0 = un mensaje por lote recibido (sin ventana)
+
+class _FlushMetrics:
+    """Tipo del centinela FLUSH_METRICS; se deserializa como el mismo objeto (colas de multiprocessing)."""
+    def __reduce__(self):
+        return "FLUSH_METRICS"
+    def __repr__(self):
+        return "FLUSH_METRICS"
+
+
+# Centinela que el callback envía al terminar el entrenamiento: emitir ya lo acumulado
+FLUSH_METRICS = _FlushMetrics()
+
+# Métrica -> (clave de la media, decimales). La media conserva el nombre que usan las gráficas
+_METRICS = {
+    "ep_rew": ("ep_rew_mean", 2),
+    "ep_len": ("ep_len_mean", 2),
+    "value_loss": ("value_loss", 4),
+    "explained_variance": ("explained_variance", 4),
+}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil con interpolación lineal (igual que np.percentile) de una lista ya ordenada."""
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+@dataclass
+class RolloutSample:
+    """Datos en bruto de un rollout: episodios terminados desde el anterior y escalares de SB3."""
+    timestep: int
+    episode_rewards: List[float] = field(default_factory=list)
+    episode_lengths: List[float] = field(default_factory=list)
+    scalars: Dict[str, float] = field(default_factory=dict) # ej. value_loss, explained_variance
+
+
+class MetricsAggregator:
+    """
+    Acumula `RolloutSample` y los resume en un mensaje por ventana. Las métricas de episodio se
+    calculan sobre los episodios terminados en la ventana; las de SB3, sobre sus rollouts.
+    Se usa desde un solo hilo (el bucle de eventos).
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, message_type: str = "training_metric",
+                 extra: Optional[Dict[str, Any]] = None):
+        """
+        :param message_type: Tipo de los mensajes emitidos.
+        :param extra: Campos fijos añadidos a cada mensaje (ej. el run_id en el planificador).
+        """
+        self.window_seconds = window_seconds
+        self.message_type = message_type
+        self.extra = extra or {}
+        self._values: Dict[str, List[float]] = {name: [] for name in _METRICS}
+        self._rollouts = 0
+        self._timestep = 0
+        self._window_start = time.monotonic()
+        # Contadores para diagnóstico
+        self.samples = 0
+        self.messages = 0
+
+    def add(self, sample: RolloutSample) -> None:
+        self._values["ep_rew"].extend(sample.episode_rewards)
+        self._values["ep_len"].extend(sample.episode_lengths)
+        for name, value in sample.scalars.items():
+            if name in self._values:
+                self._values[name].append(value)
+        self._timestep = max(self._timestep, sample.timestep)
+        self._rollouts += 1
+        self.samples += 1
+
+    def pending(self) -> bool:
+        return self._rollouts > 0
+
+    def flush(self) -> Optional[str]:
+        """Mensaje JSON (tipo `message_type`) con lo acumulado (None si no hay nada) y reinicia la ventana."""
+        self._window_start = time.monotonic()
+        if not self._rollouts:
+            return None
+        data = {**self.extra, "timestep": self._timestep, "rollouts": self._rollouts, "episodes": len(self._values["ep_rew"])}
+        for name, (mean_key, decimals) in _METRICS.items():
+            values = self._values[name]
+            if values:
+                values.sort()
+                data[mean_key] = round(sum(values) / len(values), decimals)
+                data[f"{name}_min"] = round(values[0], decimals)
+                data[f"{name}_max"] = round(values[-1], decimals)
+                data[f"{name}_p95"] = round(_percentile(values, 95), decimals)
+                values.clear()
+        self._rollouts = 0
+        self.messages += 1
+        return json.dumps({"type": self.message_type, "data": data}, separators=(',', ':'))
+
+    def seconds_until_due(self) -> float:
+        """Tiempo hasta el fin de la ventana actual."""
+        return max(0.0, self._window_start + self.window_seconds - time.monotonic())
+
+    def stats(self) -> Dict[str, float]:
+        return {"window_seconds": self.window_seconds, "samples": self.samples, "messages": self.messages}
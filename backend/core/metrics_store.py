@@ -0,0 +1,185 @@
+# backend/core/metrics_store.py
+"""
+Histórico persistente de métricas de entrenamiento: un directorio por run, con una columna por
+fichero (`<columna>.f64`, float64 little-endian, solo se añaden filas) y un `meta.json`.
+
+El `MetricsRunWriter` acumula filas y las añade a disco cada `flush_rows` filas o
+`flush_seconds` segundos. La columna `timestep` se escribe la última, así un lector que calcula
+el número de filas por el tamaño de los ficheros nunca ve una fila a medio escribir.
+`MetricsStore.read` abre las columnas con `np.memmap`, recorta el rango por timestep con
+búsqueda binaria (los timesteps son crecientes) y reduce cada serie con LTTB.
+"""
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Columnas de cada run (una fila por rollout). Valores ausentes = NaN
+METRICS_COLUMNS = ("timestep", "wall_time", "ep_rew_mean", "ep_len_mean", "value_loss", "explained_variance")
+SERIES_COLUMNS = METRICS_COLUMNS[2:] # Las que se devuelven como series (eje X = timestep)
+DEFAULT_DOWNSAMPLE = 1000 # Puntos por serie por defecto en las consultas
+DEFAULT_FLUSH_ROWS = 256
+DEFAULT_FLUSH_SECONDS = 1.0
+
+_DTYPE = np.dtype("<f8")
+_RUN_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+_META_FILE = "meta.json"
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Índices de los puntos elegidos por Largest-Triangle-Three-Buckets (Steinarsson, 2013):
+    conserva el primero y el último, y de cada cubo el punto que forma el triángulo de mayor
+    área con el elegido en el cubo anterior y la media del cubo siguiente.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+class MetricsRunWriter:
+    """Escritor de un run (un solo hilo: el de entrenamiento). Ver el docstring del módulo."""
+
+    def __init__(self, run_dir: str, flush_rows: int = DEFAULT_FLUSH_ROWS, flush_seconds: float = DEFAULT_FLUSH_SECONDS):
+        self.run_dir = run_dir
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self._rows: List[tuple] = []
+        self._last_flush = time.monotonic()
+
+    def append(self, timestep: int, ep_rew_mean: Optional[float] = None, ep_len_mean: Optional[float] = None,
+               value_loss: Optional[float] = None, explained_variance: Optional[float] = None) -> None:
+        nan = float("nan")
+        self._rows.append((timestep, time.time(),
+                           nan if ep_rew_mean is None else ep_rew_mean, nan if ep_len_mean is None else ep_len_mean,
+                           nan if value_loss is None else value_loss,
+                           nan if explained_variance is None else explained_variance))
+        if len(self._rows) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        block = np.asarray(self._rows, dtype=_DTYPE)
+        self._rows = []
+        # timestep (columna 0) al final: marca las filas como completas
+        for column in list(range(1, len(METRICS_COLUMNS))) + [0]:
+            with open(os.path.join(self.run_dir, f"{METRICS_COLUMNS[column]}.f64"), "ab") as f:
+                f.write(np.ascontiguousarray(block[:, column]).tobytes())
+        self.rows_written += len(block)
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MetricsStore:
+    """Directorio raíz con un subdirectorio por run (ver el docstring del módulo)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _run_dir(self, run_id: str) -> str:
+        """Ruta del run; KeyError si el id no es válido o no existe."""
+        if not _RUN_ID_RE.match(run_id):
+            raise KeyError(run_id)
+        run_dir = os.path.join(self.root, run_id)
+        if not os.path.isfile(os.path.join(run_dir, _META_FILE)):
+            raise KeyError(run_id)
+        return run_dir
+
+    def new_run_id(self) -> str:
+        """
+        Id libre basado en la fecha (ej. 20240501-153000, o 20240501-153000-2 si ya existe). El
+        directorio se crea aquí para reservar el id (varios runs pueden arrancar en el mismo segundo).
+        """
+        base = time.strftime("%Y%m%d-%H%M%S")
+        run_id, suffix = base, 1
+        while True:
+            try:
+                os.mkdir(os.path.join(self.root, run_id))
+                return run_id
+            except FileExistsError:
+                suffix += 1
+                run_id = f"{base}-{suffix}"
+
+    def create_run(self, run_id: str, metadata: Optional[Dict[str, Any]] = None, **writer_kwargs) -> MetricsRunWriter:
+        if not _RUN_ID_RE.match(run_id):
+            raise ValueError(f"Id de run no válido: {run_id}")
+        run_dir = os.path.join(self.root, run_id)
+        os.makedirs(run_dir, exist_ok=True) # Puede existir ya, reservado por new_run_id
+        if os.path.exists(os.path.join(run_dir, _META_FILE)):
+            raise FileExistsError(f"El run {run_id} ya existe")
+        meta = {"run_id": run_id, "created": time.time(), "columns": list(METRICS_COLUMNS), **(metadata or {})}
+        with open(os.path.join(run_dir, _META_FILE), "w") as f:
+            json.dump(meta, f)
+        return MetricsRunWriter(run_dir, **writer_kwargs)
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        runs = []
+        for run_id in sorted(os.listdir(self.root)):
+            try:
+                run_dir = self._run_dir(run_id)
+                with open(os.path.join(run_dir, _META_FILE)) as f:
+                    meta = json.load(f)
+            except (KeyError, OSError, ValueError):
+                continue
+            meta["rows"] = self._row_count(run_dir)
+            runs.append(meta)
+        return runs
+
+    @staticmethod
+    def _row_count(run_dir: str) -> int:
+        sizes = []
+        for column in METRICS_COLUMNS:
+            path = os.path.join(run_dir, f"{column}.f64")
+            sizes.append(os.path.getsize(path) if os.path.exists(path) else 0)
+        return min(sizes) // _DTYPE.itemsize
+
+    def read(self, run_id: str, t_from: Optional[float] = None, t_to: Optional[float] = None,
+             downsample: int = DEFAULT_DOWNSAMPLE, columns: Sequence[str] = SERIES_COLUMNS) -> Dict[str, Any]:
+        """
+        Series del run entre los timesteps `t_from` y `t_to` (incluidos), cada una reducida a
+        como mucho `downsample` puntos con LTTB (0 = sin reducir; 1 = el último punto, 2 = el
+        primero y el último). KeyError si el run no existe.
+        """
+        run_dir = self._run_dir(run_id)
+        rows = self._row_count(run_dir)
+        result: Dict[str, Any] = {"run_id": run_id, "rows": rows, "points_in_range": 0, "series": {}}
+        if rows == 0:
+            return result
+        mapped = lambda column: np.memmap(os.path.join(run_dir, f"{column}.f64"), dtype=_DTYPE, mode="r", shape=(rows,))
+        timesteps = mapped("timestep")
+        lo = 0 if t_from is None else int(np.searchsorted(timesteps, t_from, side="left"))
+        hi = rows if t_to is None else int(np.searchsorted(timesteps, t_to, side="right"))
+        result["points_in_range"] = max(hi - lo, 0)
+        x_range = np.asarray(timesteps[lo:hi])
+        for column in columns:
+            if column not in SERIES_COLUMNS:
+                raise ValueError(f"Columna desconocida: {column}")
+            y = np.asarray(mapped(column)[lo:hi])
+            valid = ~np.isnan(y)
+            x, y = x_range[valid], y[valid]
+            if downsample and len(x) > downsample:
+                # LTTB necesita 3 puntos; con 1 o 2 quedan el último o los extremos
+                keep = lttb_indices(x, y, downsample) if downsample >= 3 else np.array([0, len(x) - 1])[-downsample:]
+                x, y = x[keep], y[keep]
+            result["series"][column] = {"x": x.astype(np.int64).tolist(), "y": y.tolist()}
+        return result
@@ -0,0 +1,244 @@
+# backend/core/mmap_model.py
+"""
+Formato de pesos mapeable en memoria para la inferencia (modo "Ver IA").
+
+`PPO.load` abre el zip de SB3, descomprime cada state_dict, lo deserializa con `torch.load`
+y copia los tensores en una política recién inicializada. Aquí la política se exporta a:
+  - `<nombre>-<hash>.weights`: los tensores de la política (sin optimizador) en crudo, sin
+    comprimir, cada uno alineado a 64 bytes;
+  - `<nombre>.json`: sidecar con la clase de la política, sus kwargs (net_arch, activación),
+    los espacios de observación/acción, obs_dim, board_size, timesteps, el zip de origen y la
+    tabla de tensores (nombre, dtype, forma, offset).
+`load_mmap_policy` mapea el fichero (`np.memmap` copy-on-write) y asigna los tensores a la
+política sin copiarlos (`load_state_dict(assign=True)`): no se descomprime ni se deserializa
+nada, y las páginas de pesos las comparte el page cache entre todos los procesos que sirven el
+mismo modelo.
+
+El sidecar se escribe el último y de forma atómica, y el nombre del fichero de pesos lleva el
+hash de su contenido: un lector ve siempre un par sidecar/pesos coherente. Continuar un
+entrenamiento sigue usando el zip (necesita el optimizador y el estado del algoritmo).
+
+Este módulo solo importa torch/SB3/gymnasium dentro de las funciones que los usan: el servidor
+lee los sidecars y mapea los pesos sin ellos (core/numpy_policy.py).
+
+Conversión de modelos existentes (desde backend/):
+    python -m core.mmap_model logs/best_model/best_model.zip logs/checkpoints --board-size 20
+"""
+import argparse
+import glob
+import hashlib
+import importlib
+import io
+import json
+import logging
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from core.atomic_io import atomic_write_bytes
+
+if TYPE_CHECKING:
+    from gymnasium import spaces
+    from stable_baselines3.common.policies import BasePolicy
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = "snake3d-mmap"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+WEIGHTS_SUFFIX = ".weights"
+SIDECAR_SUFFIX = ".json"
+
+
+def sidecar_path(model_path: str) -> str:
+    """Sidecar de la exportación de `model_path` (ej. best_model.zip -> best_model.json)."""
+    return os.path.splitext(model_path)[0] + SIDECAR_SUFFIX
+
+
+def _class_name(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _import_class(name: str) -> type:
+    module, _, qualname = name.partition(":")
+    obj: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _encode_kwargs(policy_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = {}
+    for key, value in policy_kwargs.items():
+        if isinstance(value, type):
+            encoded[key] = {"__class__": _class_name(value)}
+            continue
+        try:
+            json.dumps(value)
+        except TypeError:
+            raise ValueError(f"policy_kwargs['{key}'] no es exportable al sidecar: {value!r}")
+        encoded[key] = value
+    return encoded
+
+
+def _decode_kwargs(encoded: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: _import_class(value["__class__"]) if isinstance(value, dict) and "__class__" in value else value
+            for key, value in encoded.items()}
+
+
+def _encode_spaces(observation_space: "spaces.Space", action_space: "spaces.Space") -> Dict[str, Any]:
+    from gymnasium import spaces
+    if not isinstance(observation_space, spaces.Box) or len(observation_space.shape) != 1:
+        raise ValueError(f"Solo se exportan observaciones Box 1D, recibido: {observation_space}")
+    if not isinstance(action_space, spaces.Discrete):
+        raise ValueError(f"Solo se exportan acciones Discrete, recibido: {action_space}")
+    return {"observation_space": {"low": observation_space.low.tolist(), "high": observation_space.high.tolist(),
+                                  "dtype": str(observation_space.dtype)},
+            "obs_dim": int(observation_space.shape[0]), "n_actions": int(action_space.n)}
+
+
+def export_mmap_model(model_path: str, output_path: Optional[str] = None, board_size: Optional[int] = None) -> str:
+    """
+    Exporta la política del zip de SB3 `model_path`. Devuelve la ruta del sidecar
+    (por defecto junto al zip, con el mismo nombre). Borra los ficheros de pesos anteriores.
+    """
+    from stable_baselines3.common.save_util import load_from_zip_file
+
+    source_stat = os.stat(model_path)
+    data, params, _ = load_from_zip_file(model_path, device="cpu")
+    meta = {"format": FORMAT_NAME, "version": FORMAT_VERSION,
+            "policy_class": _class_name(data["policy_class"]),
+            "policy_kwargs": _encode_kwargs(data.get("policy_kwargs") or {}),
+            **_encode_spaces(data["observation_space"], data["action_space"]),
+            "board_size": board_size, "timesteps": int(data.get("num_timesteps", 0)),
+            "source": {"file": os.path.basename(model_path), "size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns}}
+
+    buffer = io.BytesIO()
+    tensors: List[Dict[str, Any]] = []
+    for name, tensor in params["policy"].items():
+        array = tensor.detach().cpu().contiguous().numpy()
+        offset = -buffer.tell() % ALIGNMENT + buffer.tell()
+        buffer.seek(offset)
+        buffer.write(array.tobytes())
+        tensors.append({"name": name, "dtype": str(array.dtype), "shape": list(array.shape), "offset": offset})
+    weights = buffer.getvalue()
+
+    sidecar = output_path or sidecar_path(model_path)
+    stem = os.path.splitext(os.path.basename(sidecar))[0]
+    weights_name = f"{stem}-{hashlib.sha1(weights).hexdigest()[:12]}{WEIGHTS_SUFFIX}"
+    directory = os.path.dirname(os.path.abspath(sidecar))
+    atomic_write_bytes(os.path.join(directory, weights_name), weights)
+    meta.update({"weights_file": weights_name, "weights_bytes": len(weights), "tensors": tensors})
+    atomic_write_bytes(sidecar, json.dumps(meta, indent=2).encode())
+    # Los procesos que ya mapearon los pesos anteriores los conservan hasta soltarlos (Linux)
+    for stale in glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(stem)}-*{WEIGHTS_SUFFIX}")):
+        if os.path.basename(stale) != weights_name:
+            try:
+                os.remove(stale)
+            except OSError as e:
+                logger.debug(f"No se pudo borrar {stale}: {e}")
+    return sidecar
+
+
+def remove_export(model_path: str) -> None:
+    """Borra el sidecar y los pesos exportados de `model_path` (si existen)."""
+    sidecar = sidecar_path(model_path)
+    stem = os.path.splitext(os.path.basename(sidecar))[0]
+    directory = os.path.dirname(os.path.abspath(sidecar))
+    for path in [sidecar] + glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(stem)}-*{WEIGHTS_SUFFIX}")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def read_sidecar(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_NAME or meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} no es un sidecar {FORMAT_NAME} v{FORMAT_VERSION}.")
+    return meta
+
+
+def current_export(model_path: str) -> Optional[str]:
+    """Sidecar de `model_path` si existe y se exportó desde la versión actual del zip; si no, None."""
+    sidecar = sidecar_path(model_path)
+    try:
+        source = read_sidecar(sidecar)["source"]
+        stat = os.stat(model_path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if source.get("size") != stat.st_size or source.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return sidecar
+
+
+def map_arrays(meta: Dict[str, Any], directory: str, mode: str = "r") -> Dict[str, np.ndarray]:
+    """
+    Arrays (vistas del `np.memmap`) que apuntan directamente al fichero de pesos. 'r' = solo
+    lectura; 'c' = copy-on-write (escribibles, pero las páginas siguen compartidas mientras nadie
+    escriba en ellas).
+    """
+    weights = np.memmap(os.path.join(directory, meta["weights_file"]), dtype=np.uint8, mode=mode)
+    if weights.size != meta["weights_bytes"]:
+        raise ValueError(f"{meta['weights_file']}: {weights.size} bytes, se esperaban {meta['weights_bytes']}.")
+    state = {}
+    for entry in meta["tensors"]:
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        array = weights[entry["offset"]:entry["offset"] + count * dtype.itemsize].view(dtype).reshape(entry["shape"])
+        state[entry["name"]] = array
+    return state
+
+
+def load_mmap_policy(path: str) -> "BasePolicy":
+    """
+    Política de SB3 (en CPU, modo evaluación) a partir de un sidecar. Expone el mismo
+    `predict(obs, deterministic=...)` que el modelo completo, que es lo que usa el modo "Ver IA".
+    """
+    import torch
+    from gymnasium import spaces
+
+    meta = read_sidecar(path)
+    # Copy-on-write: torch exige buffers escribibles
+    state = {name: torch.from_numpy(array)
+             for name, array in map_arrays(meta, os.path.dirname(os.path.abspath(path)), mode="c").items()}
+    obs = meta["observation_space"]
+    observation_space = spaces.Box(np.array(obs["low"], dtype=obs["dtype"]), np.array(obs["high"], dtype=obs["dtype"]),
+                                   dtype=obs["dtype"])
+    policy_class = _import_class(meta["policy_class"])
+    # Sin inicialización ortogonal (cara y los pesos se sustituyen); no se construye en 'meta' porque
+    # MlpExtractor hace `.to(device)` en su constructor
+    policy = policy_class(observation_space, spaces.Discrete(meta["n_actions"]), lambda _: 0.0,
+                          **{**_decode_kwargs(meta["policy_kwargs"]), "ortho_init": False})
+    policy.load_state_dict(state, assign=True)
+    policy.optimizer = None # Solo inferencia; así se liberan también los pesos iniciales
+    policy.set_training_mode(False)
+    return policy
+
+
+def _expand(paths: List[str]) -> List[str]:
+    expanded = []
+    for path in paths:
+        expanded.extend(sorted(glob.glob(os.path.join(path, "*.zip"))) if os.path.isdir(path) else [path])
+    return expanded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Zips de SB3 o directorios con zips (ej. logs/checkpoints).")
+    parser.add_argument("--board-size", type=int, default=None, help="Tamaño del tablero con el que se entrenó (metadato).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for model_path in _expand(args.paths):
+        try:
+            sidecar = export_mmap_model(model_path, board_size=args.board_size)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"{model_path}: {e}")
+            continue
+        logger.info(f"{model_path} -> {sidecar} ({read_sidecar(sidecar)['weights_bytes']} bytes de pesos)")
+
+
+if __name__ == "__main__":
+    main()
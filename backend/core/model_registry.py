@@ -0,0 +1,153 @@
+# backend/core/model_registry.py
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.mmap_model import current_export, load_mmap_policy
+from core.numpy_policy import NumpyPolicy
+from core.onnx_model import ONNXRUNTIME_AVAILABLE, OnnxPolicy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MODELS = 4 # Modelos distintos (rutas) que se mantienen cargados a la vez
+
+
+def load_model_cpu(path: str):
+    """
+    Política para inferencia en CPU sin torch (core/numpy_policy.py) a partir de la exportación
+    mapeable al día (core/mmap_model.py). Si la arquitectura no la soporta el runtime NumPy se usa
+    la política de torch sobre la misma exportación; si no hay exportación, la del zip.
+    """
+    sidecar = current_export(path)
+    if sidecar is None:
+        logger.info(f"{path} no tiene exportación mapeable (python -m core.mmap_model); se carga con torch.")
+        return load_torch_model_cpu(path)
+    try:
+        return NumpyPolicy.from_sidecar(sidecar)
+    except ValueError as e:
+        logger.info(f"Runtime NumPy no disponible para {path} ({e}); se carga con torch.")
+        return load_mmap_policy(sidecar)
+
+
+def load_torch_model_cpu(path: str):
+    """
+    Política de torch para inferencia en CPU (mismo `predict` que el modelo completo). Si junto al
+    zip hay una exportación mapeable al día se usa esa (carga sin copias); si no, se reconstruye la
+    política del zip, sin el algoritmo (vale para zips de PPO y de MaskablePPO).
+    """
+    sidecar = current_export(path)
+    if sidecar is not None:
+        return load_mmap_policy(sidecar)
+    from stable_baselines3.common.save_util import load_from_zip_file
+
+    data, params, _ = load_from_zip_file(path, device="cpu")
+    policy = data["policy_class"](data["observation_space"], data["action_space"], lambda _: 0.0,
+                                  **(data.get("policy_kwargs") or {}))
+    policy.load_state_dict(params["policy"])
+    policy.set_training_mode(False)
+    return policy
+
+
+def load_onnx_model_cpu(path: str, quantized: bool = False):
+    """
+    Política sobre onnxruntime (core/onnx_model.py) a partir de la exportación ONNX al día del zip
+    (la int8 si `quantized`). Sin onnxruntime o sin exportación al día se usa `load_model_cpu`.
+    """
+    try:
+        return OnnxPolicy.load(path, quantized=quantized)
+    except (ImportError, FileNotFoundError, ValueError) as e:
+        logger.info(f"Runtime ONNX no disponible para {path} ({e}); se usa el runtime NumPy.")
+        return load_model_cpu(path)
+
+
+# Runtimes de inferencia de /ws/watch (WATCH_RUNTIME en dependencies.py). 'auto': ONNX si onnxruntime
+# está instalado (con su propio fallback a NumPy y torch), si no NumPy.
+LOADERS: Dict[str, Callable[[str], Any]] = {
+    "numpy": load_model_cpu, "torch": load_torch_model_cpu,
+    "onnx": load_onnx_model_cpu, "onnx-int8": partial(load_onnx_model_cpu, quantized=True),
+    "auto": load_onnx_model_cpu if ONNXRUNTIME_AVAILABLE else load_model_cpu,
+}
+
+
+class ModelRegistry:
+    """
+    Caché de modelos compartida por todo el proceso (todas las sesiones de /ws/watch).
+
+    - Cada ruta se carga una sola vez; las siguientes peticiones devuelven la misma instancia.
+    - Si el `mtime` del fichero cambia (ej. AsyncEvalCallback guarda un nuevo best_model.zip) el
+      modelo se recarga en la siguiente petición. Si la recarga falla (fichero a medio escribir)
+      se sigue sirviendo la versión anterior y se reintenta en la próxima petición.
+    - Con más de `max_models` rutas distintas se descarta la menos usada recientemente (LRU).
+
+    Es thread-safe: puede llamarse desde el bucle de eventos vía `asyncio.to_thread` o desde hilos.
+    """
+
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS, loader: Callable[[str], Any] = load_model_cpu):
+        assert max_models >= 1
+        self.max_models = max_models
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict() # ruta -> (mtime, modelo)
+        self.loads = 0 # Contadores para diagnóstico
+        self.hits = 0
+
+    def get(self, path: str) -> Any:
+        """
+        Devuelve el modelo de `path`, cargándolo o recargándolo si hace falta.
+        Lanza FileNotFoundError si no existe y no hay versión anterior en caché.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._models.get(key)
+            try:
+                mtime = os.path.getmtime(key)
+            except OSError:
+                if cached is not None: # Borrado temporalmente (ej. durante un guardado): servir la caché
+                    self._models.move_to_end(key)
+                    return cached[1]
+                raise FileNotFoundError(f"Modelo no encontrado: {path}")
+
+            if cached is not None and cached[0] == mtime:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+            try:
+                model = self.loader(key)
+            except Exception:
+                if cached is None:
+                    raise
+                logger.warning(f"ModelRegistry: recarga de {path} fallida, se mantiene la versión anterior.", exc_info=True)
+                self._models.move_to_end(key)
+                return cached[1]
+
+            self.loads += 1
+            self._models[key] = (mtime, model)
+            self._models.move_to_end(key)
+            logger.info(f"ModelRegistry: modelo {'recargado' if cached else 'cargado'} desde {path} (mtime={mtime}).")
+            while len(self._models) > self.max_models:
+                evicted, _ = self._models.popitem(last=False)
+                logger.info(f"ModelRegistry: descartado {evicted} (LRU).")
+            return model
+
+    def peek(self, path: str) -> Optional[Any]:
+        """Modelo en caché para `path` sin comprobar el disco (None si no está cargado)."""
+        with self._lock:
+            cached = self._models.get(os.path.abspath(path))
+            return cached[1] if cached else None
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Olvida un modelo concreto (o todos si `path` es None)."""
+        with self._lock:
+            if path is None:
+                self._models.clear()
+            else:
+                self._models.pop(os.path.abspath(path), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cached": list(self._models.keys()), "loads": self.loads, "hits": self.hits,
+                    "max_models": self.max_models}
@@ -0,0 +1,122 @@
+# backend/core/numpy_policy.py
+"""
+Inferencia de la política (solo el actor) con NumPy, sin torch ni SB3.
+
+El modo "Ver IA" solo necesita `predict` sobre un MLP pequeño (18 -> 128 -> 128 -> 4): importar
+torch para eso dispara el arranque y la memoria del servidor. `NumpyPolicy` carga los pesos del
+actor de una exportación mapeable (core/mmap_model.py; vistas de solo lectura del fichero, sin
+copias) y calcula los logits por lotes:
+    h = act(h @ W.T + b) por cada capa de `mlp_extractor.policy_net`, logits = h @ W.T + b (action_net)
+Las acciones no válidas (`action_masks`) se descartan como en MaskableCategorical; con
+`deterministic=True` se elige el argmax, como `MaskablePPO.predict(deterministic=True)`.
+
+Solo admite lo que produce el entrenamiento de este repo: observaciones Box 1D sin extractor de
+características (Flatten), acciones Discrete y activaciones de ACTIVATIONS. Para lo demás
+`from_sidecar` lanza ValueError y el ModelRegistry recurre a la política de torch.
+
+Paridad con MaskablePPO: tests/test_numpy_policy_parity.py. Latencia y arranque: benchmarks/bench_numpy_policy.py
+"""
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.mmap_model import map_arrays, read_sidecar
+
+# Activaciones de torch.nn (como las guarda el sidecar) y su equivalente NumPy
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "torch.nn.modules.activation:Tanh": np.tanh,
+    "torch.nn.modules.activation:ReLU": lambda x: np.maximum(x, 0),
+    "torch.nn.modules.activation:ELU": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    "torch.nn.modules.activation:LeakyReLU": lambda x: np.where(x > 0, x, 0.01 * x),
+    "torch.nn.modules.activation:SiLU": lambda x: x / (1 + np.exp(-x)),
+}
+DEFAULT_ACTIVATION = "torch.nn.modules.activation:Tanh" # La de ActorCriticPolicy si no se indica
+SUPPORTED_POLICIES = ("sb3_contrib.common.maskable.policies:MaskableActorCriticPolicy",
+                      "stable_baselines3.common.policies:ActorCriticPolicy")
+# kwargs de la política que no cambian el cálculo del actor
+_INERT_KWARGS = {"net_arch", "activation_fn", "ortho_init", "share_features_extractor", "normalize_images",
+                 "optimizer_kwargs", "log_std_init"}
+MASKED_LOGIT = -1e8 # Igual que MaskableCategorical
+_LAYER_PATTERN = re.compile(r"^mlp_extractor\.policy_net\.(\d+)\.(weight|bias)$")
+
+
+class PolicyBackend:
+    """
+    Interfaz `predict` de las políticas de SB3 sobre arrays NumPy. Las subclases solo calculan los
+    logits sin máscara (`_forward`); aquí se aplican las máscaras y se eligen las acciones.
+    Implementaciones: NumpyPolicy y OnnxPolicy (core/onnx_model.py).
+    """
+    obs_dim: int
+    n_actions: int
+
+    def __init__(self, seed: Optional[int] = None):
+        self._rng = np.random.default_rng(seed)
+
+    def _forward(self, obs: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def logits(self, obs: np.ndarray, action_masks: Optional[np.ndarray] = None) -> np.ndarray:
+        """Logits (n, n_actions) para un lote de observaciones (n, obs_dim)."""
+        logits = self._forward(np.asarray(obs, dtype=np.float32))
+        if action_masks is not None:
+            masks = np.asarray(action_masks, dtype=bool).reshape(logits.shape)
+            logits = np.where(masks, logits, np.float32(MASKED_LOGIT))
+        return logits
+
+    def predict(self, observation: np.ndarray, state=None, episode_start=None, deterministic: bool = False,
+                action_masks: Optional[np.ndarray] = None) -> Tuple[np.ndarray, None]:
+        """Como `BasePolicy.predict`: acepta una observación o un lote; devuelve (acciones, None)."""
+        observation = np.asarray(observation)
+        vectorized = observation.ndim == 2
+        logits = self.logits(observation.reshape(-1, self.obs_dim), action_masks)
+        if deterministic:
+            actions = logits.argmax(axis=1)
+        else: # Muestreo de la categórica (truco de Gumbel-max)
+            actions = (logits - np.log(-np.log(self._rng.random(logits.shape)))).argmax(axis=1)
+        return (actions if vectorized else actions[0]), None
+
+
+class NumpyPolicy(PolicyBackend):
+    """Ver el docstring del módulo."""
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray]], action_weight: np.ndarray, action_bias: np.ndarray,
+                 activation: str = DEFAULT_ACTIVATION, seed: Optional[int] = None):
+        """:param activation: Clase de torch.nn (clave de ACTIVATIONS), como la guarda el sidecar."""
+        super().__init__(seed)
+        self.layers = layers
+        self.action_weight = action_weight
+        self.action_bias = action_bias
+        self.activation_name = activation
+        self.activation = ACTIVATIONS[activation]
+        self.obs_dim = layers[0][0].shape[1] if layers else action_weight.shape[1]
+        self.n_actions = action_weight.shape[0]
+
+    @classmethod
+    def from_sidecar(cls, path: str, seed: Optional[int] = None) -> "NumpyPolicy":
+        meta = read_sidecar(path)
+        if meta["policy_class"] not in SUPPORTED_POLICIES:
+            raise ValueError(f"Política no soportada por el runtime NumPy: {meta['policy_class']}")
+        kwargs = meta["policy_kwargs"]
+        unsupported = set(kwargs) - _INERT_KWARGS
+        if unsupported:
+            raise ValueError(f"policy_kwargs no soportados por el runtime NumPy: {sorted(unsupported)}")
+        activation_name = kwargs.get("activation_fn", {}).get("__class__", DEFAULT_ACTIVATION)
+        if activation_name not in ACTIVATIONS:
+            raise ValueError(f"Activación no soportada por el runtime NumPy: {activation_name}")
+
+        arrays = map_arrays(meta, os.path.dirname(os.path.abspath(path)))
+        indices = sorted({int(m.group(1)) for m in map(_LAYER_PATTERN.match, arrays) if m})
+        layers = [(arrays[f"mlp_extractor.policy_net.{i}.weight"], arrays[f"mlp_extractor.policy_net.{i}.bias"]) for i in indices]
+        policy = cls(layers, arrays["action_net.weight"], arrays["action_net.bias"], activation_name, seed=seed)
+        if policy.obs_dim != meta["obs_dim"] or policy.n_actions != meta["n_actions"]:
+            raise ValueError(f"Pesos incoherentes con el sidecar: obs_dim {policy.obs_dim}/{meta['obs_dim']}, "
+                             f"n_actions {policy.n_actions}/{meta['n_actions']}")
+        return policy
+
+    def _forward(self, obs: np.ndarray) -> np.ndarray:
+        hidden = obs
+        for weight, bias in self.layers:
+            hidden = self.activation(hidden @ weight.T + bias)
+        return hidden @ self.action_weight.T + self.action_bias
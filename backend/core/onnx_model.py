@@ -0,0 +1,229 @@
+# backend/core/onnx_model.py
+"""
+Exportación ONNX (opcionalmente cuantizada a int8) de la política y su runtime con onnxruntime.
+
+A partir de la exportación mapeable (core/mmap_model.py) se genera el grafo del actor:
+    obs -> [MatMul -> Add -> activación] por capa de `mlp_extractor.policy_net` -> MatMul -> Add -> logits
+con el lote como dimensión dinámica. Se construye con `onnx.helper` desde los mismos pesos que
+usa NumpyPolicy (core/numpy_policy.py), sin torch, así que admite lo mismo que ese runtime.
+  - `<nombre>.onnx`: pesos float32.
+  - `<nombre>.int8.onnx`: cuantización dinámica de onnxruntime (pesos int8 de los MatMul,
+    activaciones cuantizadas en cada llamada). Su metadato `action_agreement` es la fracción de
+    observaciones de prueba (aleatorias dentro del espacio de observación) en las que elige la
+    misma acción determinista que la versión float32.
+Los metadatos del modelo guardan además el tamaño y mtime del zip de origen: `OnnxPolicy.load`
+rechaza (ValueError) una exportación que no corresponde a la versión actual del zip.
+
+`onnx` (exportar) y `onnxruntime` (cuantizar e inferir) son opcionales y se importan dentro de las
+funciones que los usan. `OnnxPolicy` usa un solo hilo de onnxruntime por defecto: con un MLP tan
+pequeño el coste es el de cada llamada, no el cálculo.
+
+Conversión de modelos existentes (desde backend/):
+    python -m core.onnx_model logs/best_model/best_model.zip --quantize
+Comparación con torch y NumPy (latencia y acuerdo de acciones): benchmarks/bench_onnx_policy.py
+"""
+import argparse
+import importlib.util
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.atomic_io import atomic_write_bytes
+from core.mmap_model import current_export, export_mmap_model, read_sidecar
+from core.numpy_policy import NumpyPolicy, PolicyBackend
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = "snake3d-onnx"
+OPSET_VERSION = 17
+IR_VERSION = 8 # El más antiguo compatible con el opset 17: lo carga cualquier onnxruntime reciente
+FP32_SUFFIX = ".onnx"
+INT8_SUFFIX = ".int8.onnx"
+AGREEMENT_SAMPLES = 4096
+ONNX_AVAILABLE = importlib.util.find_spec("onnx") is not None
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec("onnxruntime") is not None
+
+# Operadores ONNX de cada activación de torch.nn (mismas claves que numpy_policy.ACTIVATIONS)
+ACTIVATION_OPS = {
+    "torch.nn.modules.activation:Tanh": ("Tanh", {}),
+    "torch.nn.modules.activation:ReLU": ("Relu", {}),
+    "torch.nn.modules.activation:ELU": ("Elu", {"alpha": 1.0}),
+    "torch.nn.modules.activation:LeakyReLU": ("LeakyRelu", {"alpha": 0.01}),
+    "torch.nn.modules.activation:SiLU": ("Sigmoid", {}), # x * sigmoid(x): el Mul se añade al construir el grafo
+}
+
+
+def onnx_path(model_path: str, quantized: bool = False) -> str:
+    """Fichero ONNX de `model_path` (ej. best_model.zip -> best_model.onnx / best_model.int8.onnx)."""
+    return os.path.splitext(model_path)[0] + (INT8_SUFFIX if quantized else FP32_SUFFIX)
+
+
+def _build_graph(policy: NumpyPolicy, metadata: Dict[str, str]):
+    from onnx import TensorProto, helper, numpy_helper
+
+    if policy.activation_name not in ACTIVATION_OPS:
+        raise ValueError(f"Activación sin equivalente ONNX: {policy.activation_name}")
+    op_type, attributes = ACTIVATION_OPS[policy.activation_name]
+    nodes, initializers = [], []
+    hidden = "obs"
+    layers = [*policy.layers, (policy.action_weight, policy.action_bias)]
+    for index, (weight, bias) in enumerate(layers):
+        last = index == len(layers) - 1
+        # MatMul (y no Gemm) para que la cuantización dinámica de onnxruntime cuantice los pesos
+        initializers += [numpy_helper.from_array(np.ascontiguousarray(weight.T, dtype=np.float32), f"W{index}"),
+                         numpy_helper.from_array(np.array(bias, dtype=np.float32), f"b{index}")]
+        nodes += [helper.make_node("MatMul", [hidden, f"W{index}"], [f"matmul{index}"]),
+                  helper.make_node("Add", [f"matmul{index}", f"b{index}"], ["logits" if last else f"pre{index}"])]
+        if last:
+            break
+        hidden = f"h{index}"
+        if policy.activation_name.endswith(":SiLU"):
+            nodes += [helper.make_node("Sigmoid", [f"pre{index}"], [f"gate{index}"]),
+                      helper.make_node("Mul", [f"pre{index}", f"gate{index}"], [hidden])]
+        else:
+            nodes.append(helper.make_node(op_type, [f"pre{index}"], [hidden], **attributes))
+    graph = helper.make_graph(nodes, "snake3d_policy", initializer=initializers,
+                              inputs=[helper.make_tensor_value_info("obs", TensorProto.FLOAT, ["batch", policy.obs_dim])],
+                              outputs=[helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", policy.n_actions])])
+    model = helper.make_model(graph, producer_name=FORMAT_NAME, opset_imports=[helper.make_opsetid("", OPSET_VERSION)])
+    model.ir_version = IR_VERSION
+    helper.set_model_props(model, metadata)
+    return model
+
+
+def _probe_observations(meta: Dict, samples: int = AGREEMENT_SAMPLES, seed: int = 0) -> np.ndarray:
+    space = meta["observation_space"]
+    low = np.maximum(np.array(space["low"], dtype=np.float64), -10.0) # Cotas infinitas: rango acotado
+    high = np.minimum(np.array(space["high"], dtype=np.float64), 10.0)
+    return np.random.default_rng(seed).uniform(low, high, size=(samples, meta["obs_dim"])).astype(np.float32)
+
+
+def _quantize(fp32_path: str, output_path: str, metadata: Dict[str, str], reference: np.ndarray, probe: np.ndarray) -> float:
+    """Cuantización dinámica de `fp32_path`; devuelve el acuerdo de acciones con `reference`."""
+    import onnx
+    from onnx import helper
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        quantized = onnx.load(tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    actions = _session_predict(quantized.SerializeToString(), probe)
+    agreement = float(np.mean(actions == reference))
+    del quantized.metadata_props[:]
+    helper.set_model_props(quantized, {**metadata, "quantized": "int8", "action_agreement": f"{agreement:.6f}"})
+    atomic_write_bytes(output_path, quantized.SerializeToString())
+    return agreement
+
+
+def _session_predict(model_bytes: bytes, obs: np.ndarray) -> np.ndarray:
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(model_bytes, providers=["CPUExecutionProvider"])
+    return session.run(["logits"], {"obs": obs})[0].argmax(axis=1)
+
+
+def export_onnx_model(model_path: str, quantize: bool = False) -> List[str]:
+    """
+    Exporta a ONNX la política del zip de SB3 `model_path` (y la versión int8 si `quantize`),
+    junto al zip. Usa su exportación mapeable, que se genera si no está al día. Devuelve las rutas
+    escritas. ImportError si falta `onnx` (u `onnxruntime` para cuantizar); ValueError si la
+    arquitectura no está soportada.
+    """
+    if not ONNX_AVAILABLE or (quantize and not ONNXRUNTIME_AVAILABLE):
+        raise ImportError("La exportación ONNX necesita el paquete 'onnx' (y 'onnxruntime' para cuantizar).")
+    sidecar = current_export(model_path) or export_mmap_model(model_path)
+    meta = read_sidecar(sidecar)
+    policy = NumpyPolicy.from_sidecar(sidecar)
+    metadata = {"format": FORMAT_NAME, "source_file": os.path.basename(model_path),
+                "source_size": str(meta["source"]["size"]), "source_mtime_ns": str(meta["source"]["mtime_ns"]),
+                "timesteps": str(meta["timesteps"]), "board_size": str(meta["board_size"])}
+    fp32_path = onnx_path(model_path)
+    atomic_write_bytes(fp32_path, _build_graph(policy, metadata).SerializeToString())
+    written = [fp32_path]
+    if quantize:
+        probe = _probe_observations(meta)
+        agreement = _quantize(fp32_path, onnx_path(model_path, quantized=True), metadata,
+                              policy.predict(probe, deterministic=True)[0], probe)
+        written.append(onnx_path(model_path, quantized=True))
+        log = logger.warning if agreement < 0.99 else logger.info
+        log(f"{os.path.basename(model_path)} cuantizado a int8: misma acción que float32 en el {agreement:.2%} de "
+            f"{len(probe)} observaciones de prueba.")
+    else:
+        remove_onnx_export(model_path, quantized=True) # Una versión int8 anterior ya no corresponde al zip
+    return written
+
+
+def remove_onnx_export(model_path: str, quantized: Optional[bool] = None) -> None:
+    """Borra los ONNX de `model_path` (solo float32 / solo int8 / ambos si `quantized` es None)."""
+    variants = [False, True] if quantized is None else [quantized]
+    for variant in variants:
+        try:
+            os.remove(onnx_path(model_path, variant))
+        except FileNotFoundError:
+            pass
+
+
+class OnnxPolicy(PolicyBackend):
+    """Política sobre una sesión de onnxruntime; misma interfaz `predict` que NumpyPolicy."""
+
+    def __init__(self, path: str, threads: int = 1, seed: Optional[int] = None):
+        import onnxruntime as ort
+
+        super().__init__(seed)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.path = path
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.metadata: Dict[str, str] = dict(self.session.get_modelmeta().custom_metadata_map)
+        if self.metadata.get("format") != FORMAT_NAME:
+            raise ValueError(f"{path} no es una exportación {FORMAT_NAME}.")
+        self.obs_dim = self.session.get_inputs()[0].shape[1]
+        self.n_actions = self.session.get_outputs()[0].shape[1]
+        self.quantized = self.metadata.get("quantized") == "int8"
+
+    @classmethod
+    def load(cls, model_path: str, quantized: bool = False, threads: int = 1) -> "OnnxPolicy":
+        """
+        Política de la exportación ONNX de `model_path`. FileNotFoundError si no existe,
+        ValueError si no corresponde a la versión actual del zip, ImportError sin onnxruntime.
+        """
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("onnxruntime no está instalado.")
+        path = onnx_path(model_path, quantized)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No hay exportación ONNX: {path}")
+        policy = cls(path, threads=threads)
+        stat = os.stat(model_path)
+        if (policy.metadata.get("source_size") != str(stat.st_size)
+                or policy.metadata.get("source_mtime_ns") != str(stat.st_mtime_ns)):
+            raise ValueError(f"{path} no corresponde a la versión actual de {os.path.basename(model_path)}.")
+        return policy
+
+    def _forward(self, obs: np.ndarray) -> np.ndarray:
+        return self.session.run(["logits"], {"obs": obs})[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Zips de SB3.")
+    parser.add_argument("--quantize", action="store_true", help="Genera también la versión int8.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for model_path in args.paths:
+        try:
+            written = export_onnx_model(model_path, quantize=args.quantize)
+        except (ImportError, OSError, ValueError, KeyError) as e:
+            logger.error(f"{model_path}: {e}")
+            continue
+        logger.info(f"{model_path} -> {', '.join(written)}")
+
+
+if __name__ == "__main__":
+    main()
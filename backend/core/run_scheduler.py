@@ -0,0 +1,260 @@
+# backend/core/run_scheduler.py
+"""
+Planificador de entrenamientos concurrentes: cola FIFO de runs con un presupuesto de CPUs.
+
+Cada run se ejecuta en su propio proceso (`TrainingProcess`, ver core/training_process.py)
+con sus propias rutas (`logs/runs/<run_id>/`). Un run pide `num_cpu` núcleos; arranca cuando
+hay núcleos libres para él y para los que tiene delante en la cola, y su proceso queda fijado
+a esos núcleos (`os.sched_setaffinity`, hilos de torch = núcleos asignados).
+
+En el proceso principal, el hilo lector de cada run reenvía lo que llega de su proceso al
+canal común (ThreadToAsyncChannel); una coroutine del bucle de eventos actualiza el estado de cada
+run y publica en el canal 'training' los mensajes 'run_status', 'run_metric' (agregados por
+ventana, como 'training_metric') y 'run_log', todos con el `run_id`.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from api.schemas import TrainingParams, TrainingStatus
+from core.async_channel import ThreadToAsyncChannel
+from core.metrics_pipeline import DEFAULT_WINDOW_SECONDS, FLUSH_METRICS, MetricsAggregator, RolloutSample
+from core.metrics_store import MetricsStore
+from core.training_manager import UPDATE_QUEUE_MAXSIZE, RunPaths
+from core.training_process import PROCESS_EXITED, TrainingProcess
+
+logger = logging.getLogger(__name__)
+
+RUN_STATES = ("queued", "running", "stopping", "completed", "stopped", "error")
+
+
+def default_cpu_budget() -> List[int]:
+    """Núcleos que puede repartir el planificador: TRAINING_CPU_BUDGET (número) o los disponibles."""
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(psutil.cpu_count() or 1))
+    budget = int(os.environ.get("TRAINING_CPU_BUDGET", "0")) or len(available)
+    return available[:budget] if budget <= len(available) else list(range(budget))
+
+
+class RunRecord:
+    """Estado de un run del planificador (solo se modifica desde el bucle de eventos)."""
+
+    def __init__(self, run_id: str, params: TrainingParams, paths: RunPaths, window_seconds: float):
+        self.run_id = run_id
+        self.params = params
+        self.paths = paths
+        self.state = "queued"
+        self.status = TrainingStatus(status="En cola", run_id=run_id, total_steps=params.total_timesteps)
+        self.cpus: List[int] = []
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.exitcode: Optional[int] = None
+        self.process: Optional[TrainingProcess] = None
+        self.metrics = MetricsAggregator(window_seconds, message_type="run_metric", extra={"run_id": run_id})
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = self.status.model_dump() if hasattr(self.status, "model_dump") else self.status.dict()
+        params = self.params.model_dump() if hasattr(self.params, "model_dump") else self.params.dict()
+        return {"run_id": self.run_id, "state": self.state, "cpus": self.cpus, "params": params, "status": status,
+                "submitted": self.submitted, "started": self.started, "finished": self.finished,
+                "exitcode": self.exitcode, "log_dir": self.paths.log_dir}
+
+
+class RunScheduler:
+    """
+    Cola de runs con presupuesto de CPUs (ver el docstring del módulo). Todos los métodos
+    públicos se llaman desde el bucle de eventos.
+    """
+
+    def __init__(self, ws_manager, metrics_store: MetricsStore, cpus: Optional[List[int]] = None,
+                 metrics_window_seconds: float = DEFAULT_WINDOW_SECONDS, nice: int = 0):
+        """:param nice: Incremento de nice de los procesos de los runs (ver TrainingProcess)."""
+        self._ws_manager = ws_manager
+        self._metrics_store = metrics_store
+        self.cpus = list(cpus) if cpus is not None else default_cpu_budget()
+        self._free_cpus = set(self.cpus)
+        self.metrics_window_seconds = metrics_window_seconds
+        self.nice = nice
+        self._runs: Dict[str, RunRecord] = {}
+        self._queue: List[str] = [] # run_ids en espera, en orden de llegada
+        self._channel = ThreadToAsyncChannel(maxsize=UPDATE_QUEUE_MAXSIZE)
+        self._consumer_task: Optional[asyncio.Task] = None
+        logger.info(f"RunScheduler configurado con {len(self.cpus)} CPUs: {self.cpus}")
+
+    # --- Ciclo de vida ---
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._channel.bind(loop)
+        if self._consumer_task is None or self._consumer_task.done():
+            self._consumer_task = loop.create_task(self._consume())
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Pide la parada de todos los runs, espera hasta `timeout` y termina los que sigan vivos."""
+        self._queue.clear()
+        running = [r for r in self._runs.values() if r.process is not None and r.process.is_alive()]
+        for record in running:
+            record.process.request_stop()
+        deadline = time.monotonic() + timeout
+        for record in running:
+            record.process.shutdown(max(deadline - time.monotonic(), 0))
+        if self._consumer_task is not None:
+            self._consumer_task.cancel()
+            self._consumer_task = None
+        self._channel.unbind()
+
+    # --- API pública ---
+    def submit(self, params: TrainingParams) -> RunRecord:
+        """Encola un run. ValueError si pide más CPUs que el presupuesto total."""
+        if params.num_cpu > len(self.cpus):
+            raise ValueError(f"El run pide {params.num_cpu} CPUs y el presupuesto es de {len(self.cpus)}.")
+        if self._consumer_task is None:
+            raise RuntimeError("RunScheduler no iniciado (falta start()).")
+        run_id = self._metrics_store.new_run_id()
+        record = RunRecord(run_id, params, RunPaths.for_run(run_id), self.metrics_window_seconds)
+        self._runs[run_id] = record
+        self._queue.append(run_id)
+        logger.info(f"Run {run_id} encolado ({params.num_cpu} CPUs, {params.total_timesteps} pasos).")
+        self._publish_status(record)
+        self._schedule()
+        return record
+
+    def stop(self, run_id: str) -> RunRecord:
+        """Detiene un run (si está en cola, lo quita). KeyError si no existe."""
+        record = self._runs[run_id]
+        if record.state == "queued":
+            self._queue.remove(run_id)
+            record.state, record.finished = "stopped", time.time()
+            record.status.status = "Detenido"
+            self._publish_status(record)
+        elif record.state == "running":
+            record.state = "stopping"
+            asyncio.get_running_loop().create_task(record.process.stop())
+            self._publish_status(record)
+        return record
+
+    def get(self, run_id: str) -> RunRecord:
+        return self._runs[run_id]
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [record.to_dict() for record in self._runs.values()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        states = {state: 0 for state in RUN_STATES}
+        for record in self._runs.values():
+            states[record.state] += 1
+        return {"cpus": len(self.cpus), "free_cpus": len(self._free_cpus), "queued": len(self._queue), "runs": states}
+
+    # --- Planificación ---
+    def _schedule(self) -> None:
+        """Arranca los runs de la cabeza de la cola mientras quepan (FIFO estricto: sin adelantar)."""
+        while self._queue:
+            record = self._runs[self._queue[0]]
+            if record.params.num_cpu > len(self._free_cpus):
+                return
+            self._queue.pop(0)
+            record.cpus = sorted(self._free_cpus)[:record.params.num_cpu]
+            self._free_cpus.difference_update(record.cpus)
+            try:
+                self._launch(record)
+            except Exception as e:
+                logger.error(f"No se pudo lanzar el run {record.run_id}: {e}", exc_info=True)
+                record.status.status, record.status.message = "Error", f"No se pudo lanzar el proceso: {e}"
+                self._finish(record)
+
+    def _launch(self, record: RunRecord) -> None:
+        record.paths.ensure()
+        run_id = record.run_id
+        # Con el canal lleno, el hilo lector espera y la presión llega a la cola del hijo (que descarta)
+        record.process = TrainingProcess(
+            run_id, record.params, record.paths.log_dir, forward=lambda item: self._channel.put((run_id, item)),
+            metrics_root=self._metrics_store.root, cpus=record.cpus, torch_threads=len(record.cpus), nice=self.nice)
+        record.process.start()
+        record.state, record.started = "running", time.time()
+        logger.info(f"Run {run_id} lanzado (CPUs {record.cpus}).")
+        self._publish_status(record)
+
+    def _finish(self, record: RunRecord) -> None:
+        """Estado final del run, libera sus CPUs y arranca los siguientes."""
+        if record.process is not None:
+            record.exitcode = record.process.exitcode
+        last = record.status.status
+        if last == "Completado" and record.exitcode == 0:
+            record.state = "completed"
+        elif last == "Detenido" or (record.state == "stopping" and last != "Error"):
+            record.state = "stopped"
+        else:
+            record.state = "error"
+            if last != "Error":
+                record.status.status = "Error"
+                record.status.message = f"El proceso del run terminó inesperadamente (exitcode={record.exitcode})."
+        record.finished = time.time()
+        self._free_cpus.update(record.cpus)
+        logger.info(f"Run {record.run_id} finalizado: {record.state} (exitcode={record.exitcode}).")
+        self._publish_status(record)
+        self._schedule()
+
+    # --- Canal de estado ---
+    async def _consume(self) -> None:
+        """Coroutine del bucle de eventos: procesa lo que llega de todos los runs."""
+        logger.info("Consumidor del RunScheduler iniciado.")
+        try:
+            while True:
+                timeout = self._seconds_until_metrics_due()
+                try:
+                    items = await asyncio.wait_for(self._channel.get_batch(), timeout)
+                except asyncio.TimeoutError:
+                    items = []
+                messages = []
+                for run_id, item in items:
+                    record = self._runs.get(run_id)
+                    if record is None:
+                        continue
+                    try: # Un mensaje erróneo (o un fallo al lanzar el siguiente run) no detiene el consumidor
+                        messages.extend(self._route(record, item))
+                    except Exception as e:
+                        logger.error(f"RunScheduler: error procesando un mensaje del run {run_id}: {e}", exc_info=True)
+                try:
+                    for record in self._runs.values():
+                        if record.metrics.pending() and record.metrics.seconds_until_due() <= 0:
+                            messages.append(record.metrics.flush())
+                    self._ws_manager.publish_batch_to_training(messages)
+                except Exception as e:
+                    logger.error(f"RunScheduler: error publicando estado y métricas: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            logger.info("Consumidor del RunScheduler detenido.")
+            raise
+
+    def _seconds_until_metrics_due(self) -> Optional[float]:
+        pending = [r.metrics.seconds_until_due() for r in self._runs.values() if r.metrics.pending()]
+        return min(pending) if pending else None
+
+    def _route(self, record: RunRecord, item) -> List[str]:
+        if isinstance(item, RolloutSample):
+            record.metrics.add(item)
+            return []
+        if item is FLUSH_METRICS:
+            message = record.metrics.flush()
+            return [message] if message else []
+        if item is PROCESS_EXITED:
+            message = record.metrics.flush()
+            self._finish(record)
+            return [message] if message else []
+        message = json.loads(item)
+        if message.get("type") == "training_status":
+            record.status = TrainingStatus(**{**message["data"], "run_id": record.run_id})
+            return [self._status_message(record)]
+        if message.get("type") in ("training_log", "training_eval"):
+            run_type = "run_log" if message["type"] == "training_log" else "run_eval"
+            return [json.dumps({"type": run_type, "data": {**message["data"], "run_id": record.run_id}})]
+        return []
+
+    def _status_message(self, record: RunRecord) -> str:
+        status = record.status.model_dump() if hasattr(record.status, "model_dump") else record.status.dict()
+        return json.dumps({"type": "run_status", "data": {**status, "state": record.state, "cpus": record.cpus}})
+
+    def _publish_status(self, record: RunRecord) -> None:
+        self._ws_manager.publish_to_training(self._status_message(record))
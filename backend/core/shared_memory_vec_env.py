@@ -0,0 +1,219 @@
+# backend/core/shared_memory_vec_env.py
+import logging
+import multiprocessing as mp
+import pickle
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv, VecEnvObs, VecEnvStepReturn
+from stable_baselines3.common.vec_env.patch_gym import _patch_env
+
+from core.cpu_placement import configure_worker, worker_thread_env
+from core.masked_subproc_vec_env import ACTION_MASKS_METHOD, MaskedSubprocVecEnv
+
+logger = logging.getLogger(__name__)
+
+# Señales de 1 byte que cruzan el pipe en cada paso (el resto de datos va por memoria compartida)
+_STEP_SIGNAL = b"s"
+_STEP_DONE = b"d"
+
+# Layout: nombre -> (shape sin el eje de entornos, dtype). 'obs' y 'mask' se completan con los espacios.
+_BUFFER_LAYOUT = {
+    "actions": ((), np.int64),
+    "rewards": ((), np.float32),
+    "dones": ((), np.bool_),
+    "truncated": ((), np.bool_), # TimeLimit.truncated (truncado y no terminado)
+}
+
+BufferSpec = Dict[str, Tuple[str, Tuple[int, ...], str]] # nombre -> (nombre shm, shape, dtype)
+
+
+def _attach_buffers(spec: BufferSpec) -> Tuple[List[shared_memory.SharedMemory], Dict[str, np.ndarray]]:
+    """Abre los bloques de memoria compartida existentes y devuelve vistas NumPy sobre ellos."""
+    blocks, arrays = [], {}
+    for key, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return blocks, arrays
+
+
+def _shm_worker(remote, parent_remote, env_fn_wrapper: CloudpickleWrapper, env_idx: int, spec: BufferSpec,
+                cpus: Optional[List[int]] = None) -> None:
+    """
+    Worker que escribe observación, recompensa, flags y máscara en su fila de la memoria
+    compartida. En cada paso solo recibe/envía una señal de 1 byte; el resto de comandos
+    (reset, get_attr, env_method...) siguen el protocolo pickled de SubprocVecEnv.
+    """
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    configure_worker(cpus)
+    env = _patch_env(env_fn_wrapper.var())
+    action_masks = env.get_wrapper_attr(ACTION_MASKS_METHOD)
+    blocks, buf = _attach_buffers(spec)
+    i = env_idx
+    try:
+        while True:
+            try:
+                raw = remote.recv_bytes()
+                if raw == _STEP_SIGNAL:
+                    observation, reward, terminated, truncated, _info = env.step(buf["actions"][i])
+                    done = terminated or truncated
+                    buf["rewards"][i] = reward
+                    buf["dones"][i] = done
+                    buf["truncated"][i] = truncated and not terminated
+                    if done:
+                        buf["terminal_obs"][i] = observation
+                        observation, _reset_info = env.reset()
+                    buf["obs"][i] = observation
+                    buf["mask"][i] = action_masks()
+                    remote.send_bytes(_STEP_DONE)
+                    continue
+
+                cmd, data = pickle.loads(raw)
+                if cmd == "reset":
+                    maybe_options = {"options": data[1]} if data[1] else {}
+                    observation, reset_info = env.reset(seed=data[0], **maybe_options)
+                    buf["obs"][i] = observation
+                    buf["mask"][i] = action_masks()
+                    remote.send(reset_info)
+                elif cmd == "render":
+                    remote.send(env.render())
+                elif cmd == "close":
+                    env.close()
+                    remote.close()
+                    break
+                elif cmd == "get_spaces":
+                    remote.send((env.observation_space, env.action_space))
+                elif cmd == "env_method":
+                    method = env.get_wrapper_attr(data[0])
+                    remote.send(method(*data[1], **data[2]))
+                elif cmd == "get_attr":
+                    remote.send(env.get_wrapper_attr(data))
+                elif cmd == "has_attr":
+                    try:
+                        env.get_wrapper_attr(data)
+                        remote.send(True)
+                    except AttributeError:
+                        remote.send(False)
+                elif cmd == "set_attr":
+                    remote.send(setattr(env, data[0], data[1]))
+                elif cmd == "is_wrapped":
+                    remote.send(is_wrapped(env, data))
+                else:
+                    raise NotImplementedError(f"`{cmd}` no está implementado en el worker")
+            except (EOFError, KeyboardInterrupt):
+                break
+    finally:
+        del buf # Liberar las vistas antes de cerrar los bloques
+        for shm in blocks:
+            shm.close()
+
+
+class SharedMemoryVecEnv(MaskedSubprocVecEnv):
+    """
+    VecEnv multiproceso cuyos workers escriben en buffers `multiprocessing.shared_memory`:
+    observaciones (n_envs, obs_dim) float32, recompensas, dones, truncados, observaciones
+    terminales y máscaras de acción. Por el pipe solo cruza una señal de 1 byte por paso.
+
+    Los infos que se devuelven solo contienen las claves que necesita SB3
+    (`terminal_observation`, `TimeLimit.truncated`); para estadísticas de episodio envolver
+    con `VecMonitor` en lugar de usar `Monitor` en cada worker.
+    """
+
+    def __init__(self, env_fns: List[Callable[[], gym.Env]], start_method: Optional[str] = None,
+                 worker_cpus: Optional[List[List[int]]] = None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        if start_method is None:
+            forkserver_available = "forkserver" in mp.get_all_start_methods()
+            start_method = "forkserver" if forkserver_available else "spawn"
+        ctx = mp.get_context(start_method)
+
+        # Los espacios se obtienen de un entorno temporal para poder dimensionar los buffers
+        probe_env = env_fns[0]()
+        observation_space, action_space = probe_env.observation_space, probe_env.action_space
+        probe_env.close()
+
+        layout = dict(_BUFFER_LAYOUT)
+        layout["obs"] = (observation_space.shape, np.float32)
+        layout["terminal_obs"] = (observation_space.shape, np.float32)
+        layout["mask"] = ((action_space.n,), np.bool_)
+        self._shm_blocks: List[shared_memory.SharedMemory] = []
+        self._buffers: Dict[str, np.ndarray] = {}
+        spec: BufferSpec = {}
+        for key, (shape, dtype) in layout.items():
+            full_shape = (n_envs,) + tuple(shape)
+            nbytes = max(int(np.prod(full_shape)) * np.dtype(dtype).itemsize, 1)
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._shm_blocks.append(shm)
+            spec[key] = (shm.name, full_shape, np.dtype(dtype).str)
+            self._buffers[key] = np.ndarray(full_shape, dtype=dtype, buffer=shm.buf)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        with worker_thread_env(1 if worker_cpus else None): # Ver MaskedSubprocVecEnv
+            for env_idx, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+                args = (work_remote, remote, CloudpickleWrapper(env_fn), env_idx, spec,
+                        worker_cpus[env_idx] if worker_cpus else None)
+                process = ctx.Process(target=_shm_worker, args=args, daemon=True)
+                process.start()
+                self.processes.append(process)
+                work_remote.close()
+
+        # Las máscaras cacheadas de MaskedSubprocVecEnv son directamente la vista compartida
+        self._action_masks = self._buffers["mask"]
+        # Llamar a VecEnv.__init__ directamente (los __init__ de las clases padre crearían sus propios workers)
+        VecEnv.__init__(self, n_envs, observation_space, action_space)
+        logger.info(f"SharedMemoryVecEnv creado con {n_envs} workers.")
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._buffers["actions"][:] = actions
+        for remote in self.remotes:
+            remote.send_bytes(_STEP_SIGNAL)
+        self.waiting = True
+
+    def step_wait(self) -> VecEnvStepReturn:
+        for remote in self.remotes:
+            remote.recv_bytes()
+        self.waiting = False
+        buf = self._buffers
+        dones = buf["dones"].copy()
+        infos = [{} for _ in range(self.num_envs)]
+        for i in np.flatnonzero(dones):
+            infos[i]["terminal_observation"] = buf["terminal_obs"][i].copy()
+            infos[i]["TimeLimit.truncated"] = bool(buf["truncated"][i])
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return buf["obs"].copy(), buf["rewards"].copy(), dones, infos
+
+    def reset(self) -> VecEnvObs:
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        self._reset_seeds()
+        self._reset_options()
+        return self._buffers["obs"].copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv_bytes()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+        # Liberar vistas y bloques de memoria compartida (el proceso padre es el dueño)
+        self._buffers = {}
+        self._action_masks = np.zeros((self.num_envs, self.action_space.n), dtype=bool)
+        for shm in self._shm_blocks:
+            shm.close()
+            shm.unlink()
+        self._shm_blocks = []
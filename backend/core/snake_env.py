@@ -5,6 +5,8 @@ import numpy as np
 import collections  # Para usar deque
 import logging
 
+from core import snake_kernel
+
 # --- Definir Logger a Nivel de Módulo ---
 logger = logging.getLogger(__name__) # <-- DEFINIR LOGGER AQUÍ
 
@@ -16,25 +18,59 @@ class SnakeEnv(gym.Env):
     metadata = {'render_modes': ['human', 'ansi'], 'render_fps': 10}
     DEFAULT_BOARD_SIZE = 20
 
-    def __init__(self, board_size=DEFAULT_BOARD_SIZE, render_mode=None):
+    # --- Recompensas (compartidas con BatchedSnakeEnv) ---
+    # Mantener la recompensa de -0.05 por paso, +40 por comida, -100 por muerte
+    REWARD_FOOD = 40.0
+    REWARD_DEATH = -100.0
+    REWARD_STEP = -0.05
+    REWARD_DIST_FACTOR = 0.1 # Factor para recompensa por distancia
+
+    OBS_DIM = 18
+    INFO_MODES = ("full", "slim", "none")
+
+    @classmethod
+    def build_observation_space(cls) -> spaces.Box:
+        """Espacio de observación de 18 características (compartido con BatchedSnakeEnv)."""
+        low = np.full(cls.OBS_DIM, -1.0, dtype=np.float32)
+        high = np.full(cls.OBS_DIM, 1.0, dtype=np.float32)
+        low[0:7]=0; high[0:7]=1; low[9:13]=0; high[9:13]=1; low[13:17]=0; high[13:17]=1; low[17]=0; high[17]=1
+        return spaces.Box(low, high, dtype=np.float32)
+
+    def __init__(self, board_size=DEFAULT_BOARD_SIZE, render_mode=None, info_mode="full"):
+        """
+        :param info_mode: Contenido del dict `info` de step/reset.
+            'full': estado completo (cabeza, comida, dirección, contadores, recompensa y máscara).
+            'slim': solo la máscara de acciones (lo que consume el entrenamiento).
+            'none': dict vacío (cuando la máscara viaja por otro canal, ej. MaskedSubprocVecEnv).
+        """
         super().__init__()
         self.board_size = board_size
         assert board_size >= 5
+        if info_mode not in self.INFO_MODES:
+            raise ValueError(f"info_mode debe ser uno de {self.INFO_MODES}, recibido: {info_mode}")
+        self.info_mode = info_mode
         self.render_mode = render_mode
         logger.info(f"Inicializando SnakeEnv con board_size={board_size}")
 
         self.action_space = spaces.Discrete(4) # 0:Up, 1:Right, 2:Down, 3:Left
 
         # Espacio de Observación (18 características)
-        self.obs_dim = 18
-        low = np.full(self.obs_dim, -1.0, dtype=np.float32)
-        high = np.full(self.obs_dim, 1.0, dtype=np.float32)
-        low[0:7]=0; high[0:7]=1; low[9:13]=0; high[9:13]=1; low[13:17]=0; high[13:17]=1; low[17]=0; high[17]=1
-        self.observation_space = spaces.Box(low, high, dtype=np.float32)
+        self.obs_dim = self.OBS_DIM
+        self.observation_space = self.build_observation_space()
         logger.info(f"Observation space: {self.observation_space}")
 
         # Estado interno
         self.snake = None
+        # Rejilla de ocupación (True = celda ocupada por la serpiente). Se actualiza
+        # incrementalmente al añadir cabeza / quitar cola, así las colisiones son O(1).
+        self._occupancy = np.zeros((board_size, board_size), dtype=bool)
+        # Índice de celdas libres (swap-remove): `_free_cells[:_n_free]` son los ids (y*N+x) libres
+        # y `_free_pos[id]` la posición de cada id en `_free_cells`. Colocar comida es O(1).
+        # Listas Python: más rápidas que arrays NumPy para accesos escalares sueltos.
+        self._free_cells = list(range(board_size * board_size))
+        self._free_pos = list(range(board_size * board_size))
+        self._n_free = board_size * board_size
+        self._won = False # Tablero lleno: la serpiente ocupa todas las celdas
         self.direction = None
         self.food_pos = None
         self.current_step = 0
@@ -54,13 +90,19 @@ class SnakeEnv(gym.Env):
         }
 
     def _place_food(self):
-        # ... (sin cambios)
+        """
+        Coloca la comida en una celda libre uniforme usando el índice de celdas libres (O(1)).
+        Devuelve False si no queda ninguna celda libre (tablero lleno: victoria).
+        """
         if self.np_random is None:
             seed = np.random.randint(0, 2**32 - 1); super().reset(seed=seed)
             logger.warning("np_random reinicializado en _place_food.")
-        while True:
-            pos = tuple(self.np_random.integers(0, self.board_size, size=2))
-            if pos not in set(self.snake): self.food_pos = pos; return
+        if self._n_free == 0:
+            self.food_pos = None
+            return False
+        cell = self._free_cells[self.np_random.integers(0, self._n_free)]
+        self.food_pos = divmod(cell, self.board_size)
+        return True
 
     def _get_info(self):
         """Devuelve información adicional (útil para logging/debugging)."""
@@ -72,20 +114,42 @@ class SnakeEnv(gym.Env):
             "steps_since_food": self.steps_since_last_food,
             "last_reward": self.last_reward, # Recompensa del paso anterior
             "current_step": self.current_step,
+            "won": self._won,
         }
 
     def _is_collision(self, point):
         """Comprueba colisión inmediata con paredes o cuerpo ACTUAL."""
         y, x = point
-        # Paredes
-        if not (0 <= y < self.board_size and 0 <= x < self.board_size):
-            return True
-        # Cuerpo (incluyendo la cabeza actual para la comprobación de máscara,
-        # ya que si la acción lleva a la posición actual de un segmento, es inválida)
-        # Usamos toda la serpiente actual para la máscara.
-        if self.snake and tuple(point) in set(list(self.snake)):
-             return True
-        return False
+        # Paredes o cuerpo (incluyendo la cabeza actual, ya que si la acción lleva a la
+        # posición actual de un segmento, es inválida). Consulta O(1) en la rejilla de ocupación.
+        return snake_kernel.is_blocked(self._occupancy, self.board_size, int(y), int(x))
+
+    def _push_head(self, point):
+        """Añade una nueva cabeza a la serpiente y marca su celda como ocupada."""
+        self.snake.appendleft(point)
+        y, x = point
+        self._occupancy[y, x] = True
+        # Sacar la celda del índice de libres: intercambiarla con la última libre
+        cell = y * self.board_size + x
+        free_cells, free_pos = self._free_cells, self._free_pos
+        self._n_free -= 1
+        p, last = free_pos[cell], free_cells[self._n_free]
+        free_cells[p], free_pos[last] = last, p
+        free_cells[self._n_free], free_pos[cell] = cell, self._n_free
+
+    def _pop_tail(self):
+        """Quita la cola de la serpiente y libera su celda."""
+        tail = self.snake.pop()
+        y, x = tail
+        self._occupancy[y, x] = False
+        # Devolver la celda al índice de libres: intercambiarla con la primera ocupada
+        cell = y * self.board_size + x
+        free_cells, free_pos = self._free_cells, self._free_pos
+        p, first_taken = free_pos[cell], free_cells[self._n_free]
+        free_cells[p], free_pos[first_taken] = first_taken, p
+        free_cells[self._n_free], free_pos[cell] = cell, self._n_free
+        self._n_free += 1
+        return tail
 
     # --- !! NUEVO MÉTODO: action_masks !! ---
     def action_masks(self) -> np.ndarray:
@@ -93,51 +157,20 @@ class SnakeEnv(gym.Env):
         Devuelve una máscara booleana indicando acciones válidas.
         Una acción es inválida si lleva a una colisión inmediata (pared o cuerpo).
         """
-        head_np = np.array(self.snake[0])
-        valid_actions = [True] * 4 # Empezar asumiendo que todas son válidas
-
-        for action, move_vec in self._action_to_direction.items():
-            potential_next_head = head_np + move_vec
-            # Si moverse a potential_next_head es una colisión, la acción es inválida
-            if self._is_collision(tuple(potential_next_head)):
-                valid_actions[action] = False
-
-        return np.array(valid_actions)
+        head_y, head_x = self.snake[0]
+        mask = np.empty(4, dtype=bool)
+        snake_kernel.action_mask(self._occupancy, self.board_size, int(head_y), int(head_x), mask)
+        return mask
     # --- FIN NUEVO MÉTODO ---
 
     def _get_obs(self):
-        # ... (Lógica de observación sin cambios, usa _is_collision) ...
-        # Asegúrate de que _is_collision aquí use la lógica correcta para la observación
-        # (probablemente excluyendo la cola si no se comió, como estaba antes)
-        # La función _is_collision definida arriba es para la MÁSCARA.
-        # Podrías necesitar renombrar o duplicar la lógica si difieren.
-        # Por simplicidad, asumiremos que la _is_collision actual funciona para ambos,
-        # aunque la comprobación de máscara es más estricta (incluye la cabeza).
-        # --- (Código de _get_obs igual que en la versión anterior) ---
+        """Observación de 18 características (codificada por snake_kernel.encode_obs)."""
         if not self.snake: return np.zeros(self.observation_space.shape, dtype=np.float32)
-        head=self.snake[0]; head_y, head_x = head
-        dir_vectors={0:(-1,0),1:(0,1),2:(1,0),3:(0,-1)}; current_dir_vec=np.array(dir_vectors[self.direction])
-        left_dir_vec=np.array([current_dir_vec[1],-current_dir_vec[0]]); right_dir_vec=np.array([-current_dir_vec[1],current_dir_vec[0]])
-        point_ahead=np.array(head)+current_dir_vec; point_left=np.array(head)+left_dir_vec; point_right=np.array(head)+right_dir_vec
-        danger_ahead=1.0 if self._is_collision(point_ahead) else 0.0 # Usa _is_collision (¿correcto para obs?)
-        danger_left=1.0 if self._is_collision(point_left) else 0.0
-        danger_right=1.0 if self._is_collision(point_right) else 0.0
-        point_N=(head_y-1,head_x); point_S=(head_y+1,head_x); point_E=(head_y,head_x+1); point_W=(head_y,head_x-1)
-        danger_N=1.0 if self._is_collision(point_N) else 0.0; danger_S=1.0 if self._is_collision(point_S) else 0.0
-        danger_E=1.0 if self._is_collision(point_E) else 0.0; danger_W=1.0 if self._is_collision(point_W) else 0.0
-        food_y,food_x = self.food_pos if self.food_pos else (head_y,head_x)
-        food_dir_y_norm=np.clip((food_y-head_y)/self.board_size,-1.,1.); food_dir_x_norm=np.clip((food_x-head_x)/self.board_size,-1.,1.)
-        dist_N_norm=head_y/(self.board_size-1) if self.board_size>1 else 0; dist_S_norm=(self.board_size-1-head_y)/(self.board_size-1) if self.board_size>1 else 0
-        dist_W_norm=head_x/(self.board_size-1) if self.board_size>1 else 0; dist_E_norm=(self.board_size-1-head_x)/(self.board_size-1) if self.board_size>1 else 0
-        dir_one_hot=np.zeros(4,dtype=np.float32);
-        if self.direction is not None: dir_one_hot[self.direction]=1.0
-        len_norm=len(self.snake)/(self.board_size*self.board_size)
-        observation=np.array([danger_ahead,danger_left,danger_right,danger_N,danger_S,danger_E,danger_W,
-                              food_dir_y_norm,food_dir_x_norm,dist_N_norm,dist_S_norm,dist_W_norm,dist_E_norm,
-                              dir_one_hot[0],dir_one_hot[1],dir_one_hot[2],dir_one_hot[3],len_norm], dtype=np.float32)
-        if observation.shape[0] != self.obs_dim:
-             logger.error(f"¡Error de forma en observación! Esperado {self.obs_dim}, Obtenido {observation.shape[0]}")
-             return np.zeros(self.observation_space.shape, dtype=np.float32)
+        head_y, head_x = self.snake[0]
+        food_y, food_x = self.food_pos if self.food_pos else (head_y, head_x)
+        observation = np.empty(self.obs_dim, dtype=np.float32)
+        snake_kernel.encode_obs(self._occupancy, self.board_size, int(head_y), int(head_x), int(food_y), int(food_x),
+                                int(self.direction), len(self.snake), observation)
         return observation
 
 
@@ -147,7 +180,12 @@ class SnakeEnv(gym.Env):
 
         start_y = self.board_size // 2
         start_x = self.board_size // 2
-        self.snake = collections.deque([(start_y, start_x)])
+        self.snake = collections.deque()
+        self._occupancy.fill(False)
+        self._free_cells = list(range(self.board_size * self.board_size))
+        self._free_pos = list(range(self.board_size * self.board_size))
+        self._n_free = self.board_size * self.board_size
+        self._push_head((start_y, start_x))
         self.direction = self.action_space.sample()
         self._place_food()
         self.current_step = 0
@@ -155,9 +193,11 @@ class SnakeEnv(gym.Env):
         self.last_reward = 0
         self._terminated = False
         self._truncated = False
+        self._won = False
 
         observation = self._get_obs()
-        info = self._get_info() # Asegurarse que info no contenga claves que interfieran con wrappers
+        # Asegurarse que info no contenga claves que interfieran con wrappers
+        info = self._get_info() if self.info_mode == "full" else {}
 
         if self.render_mode == "human":
             self._render_frame()
@@ -167,55 +207,35 @@ class SnakeEnv(gym.Env):
         # --- FIN CORRECCIÓN ---
 
     def step(self, action):
-        # --- Lógica de Recompensa y Movimiento Ajustada Anteriormente ---
-        # Mantener la recompensa de -0.05 por paso, +40 por comida, -100 por muerte
-        # (Ajusta si quieres experimentar más)
-        REWARD_FOOD = 40.0
-        REWARD_DEATH = -100.0
-        REWARD_STEP = -0.05
-        REWARD_DIST_FACTOR = 0.1 # Factor para recompensa por distancia
-
-        old_head = self.snake[0]; old_food_pos = self.food_pos
+        # --- Movimiento, colisión, comida y recompensa (snake_kernel.move) ---
+        # Recompensas: -0.05 por paso (+ término de distancia), +40 por comida, -100 por muerte
+        # (constantes a nivel de clase; ajusta allí si quieres experimentar)
+        head_y, head_x = self.snake[0]
+        food_y, food_x = self.food_pos if self.food_pos else (-1, -1) # Sin comida solo tras ganar
         self.current_step += 1; self.steps_since_last_food += 1
-        self._terminated = False; self._truncated = False; reward = 0.0
-
-        # --- Determinar Dirección Real (evitar reversa) ---
-        opposite_direction = (self.direction + 2) % 4
-        if len(self.snake) > 1 and action == opposite_direction: action = self.direction
-        self.direction = action
-
-        # --- Mover Cabeza ---
-        move_vec = self._action_to_direction[self.direction]
-        new_head = (old_head[0] + move_vec[0], old_head[1] + move_vec[1])
-
-        # --- Comprobar Colisiones (Paredes y Cuerpo) ---
-        # Usar la misma lógica de colisión que la máscara aquí es consistente
-        if self._is_collision(new_head):
-             self._terminated = True
-             reward = REWARD_DEATH
-             logger.debug(f"Step {self.current_step}: Muerte por colisión. Pos: {new_head}")
-
-        # --- Comida y Recompensas (si no muerto) ---
-        ate_food = False
-        if not self._terminated:
-            if new_head == self.food_pos:
-                ate_food = True
-                reward = REWARD_FOOD
-                self.steps_since_last_food = 0
-                # logger.debug(f"Step {self.current_step}: Comida! Score: {len(self.snake)}")
-            else:
-                # Penalización por paso + Recompensa/Penalización por Distancia
-                reward = REWARD_STEP
-                if old_food_pos: # Calcular distancia solo si había comida
-                    old_dist = np.linalg.norm(np.array(old_head) - np.array(old_food_pos))
-                    new_dist = np.linalg.norm(np.array(new_head) - np.array(old_food_pos))
-                    reward += (old_dist - new_dist) * REWARD_DIST_FACTOR
+        self._truncated = False
+
+        self.direction, new_y, new_x, reward, self._terminated, ate_food = snake_kernel.move(
+            self._occupancy, self.board_size, int(head_y), int(head_x), int(food_y), int(food_x),
+            int(self.direction), int(action), len(self.snake),
+            self.REWARD_FOOD, self.REWARD_DEATH, self.REWARD_STEP, self.REWARD_DIST_FACTOR)
+        new_head = (new_y, new_x)
+
+        if self._terminated:
+            logger.debug(f"Step {self.current_step}: Muerte por colisión. Pos: {new_head}")
+        elif ate_food:
+            self.steps_since_last_food = 0
 
         # --- Actualizar Serpiente ---
         if not self._terminated:
-            self.snake.appendleft(new_head)
-            if ate_food: self._place_food()
-            elif len(self.snake) > 1: self.snake.pop()
+            self._push_head(new_head)
+            if ate_food:
+                if not self._place_food():
+                    # Tablero lleno: no queda sitio para la comida -> victoria, fin del episodio
+                    self._won = True
+                    self._terminated = True
+                    logger.debug(f"Step {self.current_step}: ¡Tablero completo! Longitud: {len(self.snake)}")
+            elif len(self.snake) > 1: self._pop_tail()
 
         # --- Truncamiento ---
         if not self._terminated and self.steps_since_last_food > self.max_steps_without_food:
@@ -224,14 +244,18 @@ class SnakeEnv(gym.Env):
 
         # --- Final ---
         observation = self._get_obs()
-        info = self._get_info()
         self.last_reward = reward
-        info["reward"] = reward # Incluir recompensa del paso actual
+        if self.info_mode == "full":
+            info = self._get_info()
+            info["reward"] = reward # Incluir recompensa del paso actual
+        else:
+            info = {}
 
         # --- Action Mask para el *siguiente* estado (SB3 lo pide aquí) ---
         # Es crucial que esto se devuelva en 'info' si el VecEnv no lo maneja automáticamente
         # SB3 MaskablePPO espera encontrar la máscara aquí si no la obtiene del VecEnv wrapper
-        info["action_mask"] = self.action_masks()
+        if self.info_mode != "none":
+            info["action_mask"] = self.action_masks()
 
         if self.render_mode == "human": self._render_frame()
         elif self.render_mode == "ansi": print(self._render_ansi())
@@ -277,6 +301,7 @@ class SnakeEnv(gym.Env):
         output += "+-" + "-".join(["-"] * self.board_size) + "-+\n"
         score = len(self.snake) -1 if self.snake else 0
         output += f"Score: {score} | Step: {self.current_step} | Steps w/o food: {self.steps_since_last_food} | LastRew: {self.last_reward:.2f}"
+        if self._won: output += " | WIN"
         if self._terminated: output += " | TERMINATED"
         if self._truncated: output += " | TRUNCATED"
         return output
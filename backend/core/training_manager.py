@@ -4,26 +4,32 @@ import threading
 import time
 import logging
 import psutil
-import torch
 import queue
 import json
 import asyncio
-from typing import Optional, Dict, Any # Añadir Any para policy_kwargs
-
-# Importar wrappers y tipos necesarios de Gymnasium y SB3
-from gymnasium.wrappers import RecordEpisodeStatistics
-from stable_baselines3 import PPO
-from sb3_contrib import MaskablePPO
-from stable_baselines3.common.env_util import make_vec_env
-from stable_baselines3.common.vec_env import SubprocVecEnv, DummyVecEnv, VecEnv # Importar VecEnv base
-from stable_baselines3.common.callbacks import BaseCallback, CallbackList, CheckpointCallback, EvalCallback
-from stable_baselines3.common.policies import ActorCriticPolicy # Para type hint si fuera necesario
+import shutil
+import subprocess
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Dict, Any, Tuple # Añadir Any para policy_kwargs
 
 # Importar nuestros componentes personalizados
-from callbacks.websocket_callback import WebSocketUpdateCallback
-from core.snake_env import SnakeEnv # Asumiendo que SnakeEnv puede aceptar board_size
+from core.async_channel import ThreadToAsyncChannel
+from core.metrics_store import MetricsStore
+from core.metrics_pipeline import DEFAULT_WINDOW_SECONDS, FLUSH_METRICS, MetricsAggregator, RolloutSample
+from core.training_process import PROCESS_EXITED, TrainingProcess
+from core.cpu_placement import pin_process, plan_placement
+from core.onnx_model import ONNX_AVAILABLE, ONNXRUNTIME_AVAILABLE
 # Asegúrate de que TrainingParams en schemas.py se actualice si añades board_size, seed, policy_kwargs
 from api.schemas import TrainingParams, TrainingStatus
+# torch, SB3 y los VecEnv solo se importan en el proceso que entrena (dentro de `_training_loop`,
+# `build_vec_env`): el servidor importa este módulo y no los necesita para lanzar y vigilar el proceso.
+if TYPE_CHECKING:
+    from stable_baselines3.common.base_class import BaseAlgorithm
+    from stable_baselines3.common.vec_env import VecEnv
+    from core.checkpoint_writer import CheckpointWriter
+    from core.evaluation_service import AsyncEvalCallback
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +39,10 @@ TENSORBOARD_LOG_DIR = os.path.join(LOG_DIR, "tensorboard_logs")
 BEST_MODEL_SAVE_PATH = os.path.join(LOG_DIR, "best_model")
 CHECKPOINT_SAVE_PATH = os.path.join(LOG_DIR, "checkpoints")
 LAST_MODEL_PATH = os.path.join(LOG_DIR, "last_model.zip")
+METRICS_DIR = os.path.join(LOG_DIR, "metrics") # Histórico de métricas por run (MetricsStore)
+RUNS_DIR = os.path.join(LOG_DIR, "runs") # Salidas de los runs del planificador (una carpeta por run)
+FINAL_STATUSES = ("Completado", "Detenido", "Error") # Estados finales de una sesión
+UPDATE_QUEUE_MAXSIZE = 1000 # Mensajes pendientes hilo de entrenamiento -> WebSockets (put_nowait descarta si se llena)
 
 # Crear directorios si no existen
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -40,23 +50,54 @@ os.makedirs(TENSORBOARD_LOG_DIR, exist_ok=True)
 os.makedirs(BEST_MODEL_SAVE_PATH, exist_ok=True)
 os.makedirs(CHECKPOINT_SAVE_PATH, exist_ok=True)
 
-# --- Callback para detener el entrenamiento (Simple y correcto) ---
-class StopTrainingCallback(BaseCallback):
+@dataclass(frozen=True)
+class RunPaths:
+    """Rutas de salida de un entrenamiento (modelos, checkpoints, logs de evaluación y TensorBoard)."""
+    log_dir: str
+
+    @property
+    def tensorboard_dir(self) -> str: return os.path.join(self.log_dir, "tensorboard_logs")
+    @property
+    def best_model_dir(self) -> str: return os.path.join(self.log_dir, "best_model")
+    @property
+    def checkpoint_dir(self) -> str: return os.path.join(self.log_dir, "checkpoints")
+    @property
+    def last_model_path(self) -> str: return os.path.join(self.log_dir, "last_model.zip")
+
+    @classmethod
+    def for_run(cls, run_id: str) -> "RunPaths":
+        return cls(os.path.join(RUNS_DIR, run_id))
+
+    def ensure(self) -> None:
+        for directory in (self.log_dir, self.tensorboard_dir, self.best_model_dir, self.checkpoint_dir):
+            os.makedirs(directory, exist_ok=True)
+
+# Rutas del entrenamiento principal (el de la UI); /ws/watch lee su best_model.zip
+DEFAULT_RUN_PATHS = RunPaths(LOG_DIR)
+
+@lru_cache(maxsize=1)
+def _gpu_info() -> Tuple[bool, str]:
     """
-    Callback simple para detener el entrenamiento de SB3 cuando un evento threading se activa.
+    GPU CUDA disponible y su nombre. Con torch ya importado (proceso de entrenamiento) se le
+    pregunta a torch; en el servidor se usa nvidia-smi para no importar torch solo por esto.
     """
-    def __init__(self, stop_event: threading.Event, verbose=0):
-        super().__init__(verbose)
-        self.stop_event = stop_event
-
-    def _on_step(self) -> bool:
-        """
-        Se llama en cada paso del algoritmo. Devuelve False para detener el entrenamiento.
-        """
-        if self.stop_event.is_set():
-            logger.info("StopTrainingCallback: Señal de parada detectada.")
-            return False  # Detiene model.learn()
-        return True
+    if "torch" in sys.modules:
+        torch = sys.modules["torch"]
+        if not torch.cuda.is_available():
+            return False, "N/A"
+        try: return True, torch.cuda.get_device_name(0)
+        except Exception as e: logger.warning(f"Error obteniendo nombre de GPU: {e}"); return True, "Error"
+    nvidia_smi = shutil.which("nvidia-smi")
+    if nvidia_smi is None:
+        return False, "N/A"
+    try:
+        result = subprocess.run([nvidia_smi, "--query-gpu=name", "--format=csv,noheader"],
+                                capture_output=True, text=True, timeout=5, check=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Error consultando nvidia-smi: {e}")
+        return False, "N/A"
+    names = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+    return (True, names[0]) if names else (False, "N/A")
 
 # --- Clase TrainingManager ---
 class TrainingManager:
@@ -64,22 +105,38 @@ class TrainingManager:
     Gestiona el ciclo de vida del entrenamiento de RL (usando Stable Baselines 3),
     maneja el estado, parámetros, y comunicación con el frontend vía WebSockets.
     """
-    def __init__(self, ws_manager):
+    def __init__(self, ws_manager, metrics_window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                 metrics_store: Optional[MetricsStore] = None, paths: RunPaths = DEFAULT_RUN_PATHS,
+                 update_queue=None, stop_event=None, torch_threads: Optional[int] = None, nice: int = 0):
         """
         Inicializa el gestor de entrenamiento.
         :param ws_manager: Instancia del WebSocketManager para enviar actualizaciones.
+        :param metrics_window_seconds: Cadencia de los mensajes 'training_metric' (0 = uno por rollout).
+        :param metrics_store: Histórico persistente de métricas (None = no guardar).
+        :param paths: Rutas de salida del entrenamiento.
+        :param update_queue / stop_event: Cola de actualizaciones y evento de parada a usar en lugar de
+            los propios (ej. los de multiprocessing cuando el entrenamiento corre en un proceso hijo).
+        :param torch_threads: Hilos de torch del proceso de entrenamiento (None = núcleos físicos - 1).
+        :param nice: Incremento de nice del proceso de entrenamiento (prioridad del servidor sobre él).
         """
         self.current_status = TrainingStatus(status="Detenido") # Estado inicial
-        self._training_thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event() # Evento para señalar la parada del entrenamiento
-        self._model: Optional[PPO] = None # Instancia del modelo SB3
-        self._vec_env: Optional[VecEnv] = None # Entorno vectorizado SB3
-        self._eval_env: Optional[RecordEpisodeStatistics] = None # Entorno de evaluación
+        self._process: Optional[TrainingProcess] = None # Proceso hijo de la sesión actual (o de la última)
+        self.torch_threads = torch_threads or max((psutil.cpu_count(logical=False) or 1) - 1, 1)
+        self.nice = nice
+        self._stop_event = stop_event if stop_event is not None else threading.Event() # Evento para señalar la parada del entrenamiento
+        self.paths = paths
+        paths.ensure()
+        self._model: Optional["BaseAlgorithm"] = None # Instancia del modelo SB3
+        self._vec_env: Optional["VecEnv"] = None # Entorno vectorizado SB3
+        self._eval_callback: Optional["AsyncEvalCallback"] = None # Evaluación asíncrona (pool de procesos)
+        self._checkpoint_writer: Optional["CheckpointWriter"] = None # Guardado de modelos en segundo plano
         self.current_params: Optional[TrainingParams] = None # Parámetros del entrenamiento actual
-        self._update_queue = queue.Queue() # Cola para comunicación Thread -> Async loop
+        # Canal acotado Thread -> Async loop
+        self._update_queue = update_queue if update_queue is not None else ThreadToAsyncChannel(maxsize=UPDATE_QUEUE_MAXSIZE)
         self._ws_manager = ws_manager # Gestor de WebSockets
-        self._message_broadcaster_thread: Optional[threading.Thread] = None # Hilo para enviar mensajes WS
-        self._run_broadcaster = threading.Event() # Señal para controlar el hilo broadcaster
+        self._broadcaster_task: Optional[asyncio.Task] = None # Coroutine que reparte los mensajes WS
+        self._metrics = MetricsAggregator(metrics_window_seconds) # Agrega los rollouts por ventana (en el bucle)
+        self._metrics_store = metrics_store
         self._main_event_loop = None # Referencia al loop asyncio principal (inyectado después)
 
         logger.info("TrainingManager instanciado.")
@@ -89,71 +146,78 @@ class TrainingManager:
         if not self._main_event_loop:
             self._main_event_loop = loop
             logger.info("Bucle de eventos principal establecido en TrainingManager.")
-            self._start_message_broadcaster() # Arrancar broadcaster ahora
+            self._update_queue.bind(loop)
+            self._broadcaster_task = loop.create_task(self._broadcast_messages())
         else:
             logger.warning("Intento de re-establecer el bucle de eventos principal.")
 
-    # --- Métodos para manejar el Broadcaster de mensajes WS (Thread-safe) ---
-    def _start_message_broadcaster(self):
-        """Inicia el hilo que envía mensajes de la cola al WebSocketManager."""
-        if self._main_event_loop is None:
-             logger.error("No se puede iniciar el broadcaster: falta el bucle de eventos principal.")
-             return
-        if self._message_broadcaster_thread is None or not self._message_broadcaster_thread.is_alive():
-            self._run_broadcaster.set()
-            # Asegurar cola limpia al (re)iniciar
-            while not self._update_queue.empty():
-                try: self._update_queue.get_nowait()
-                except queue.Empty: break
-            self._message_broadcaster_thread = threading.Thread(target=self._broadcast_messages, daemon=True, name="WSBroadcasterThread")
-            self._message_broadcaster_thread.start()
-            logger.info("Hilo broadcaster de mensajes WebSocket iniciado.")
-
-    def _stop_message_broadcaster(self):
-        """Detiene el hilo broadcaster y limpia la cola."""
-        if not self._run_broadcaster.is_set(): # Si ya se pidió detener, no hacer nada
-            return
-        logger.info("Deteniendo hilo broadcaster de mensajes WebSocket...")
-        self._run_broadcaster.clear()
-        self._update_queue.put_nowait(None) # Despertar al hilo si está esperando en get()
-        if self._message_broadcaster_thread and self._message_broadcaster_thread.is_alive():
-            self._message_broadcaster_thread.join(timeout=1.0)
-            if self._message_broadcaster_thread.is_alive():
-                 logger.warning("El hilo broadcaster no terminó limpiamente después de 1s.")
-        self._message_broadcaster_thread = None
-        logger.info("Hilo broadcaster de mensajes WebSocket detenido.")
-        # Limpiar cola por si quedaron mensajes
-        while not self._update_queue.empty():
-            try: self._update_queue.get_nowait()
-            except queue.Empty: break
-
-    def _schedule_broadcast(self, message_json: str):
-        """Planifica la ejecución de broadcast_to_training en el loop principal (thread-safe)."""
-        if self._main_event_loop and self._main_event_loop.is_running():
-            self._main_event_loop.call_soon_threadsafe(
-                asyncio.create_task,
-                self._ws_manager.broadcast_to_training(message_json)
-            )
-        else:
-            logger.warning("Intento de planificar broadcast sin bucle principal activo o disponible.")
-
-    def _broadcast_messages(self):
-        """Función ejecutada por el hilo broadcaster. Lee de la cola y planifica envíos."""
-        logger.info("Hilo broadcaster iniciado y esperando mensajes...")
-        while self._run_broadcaster.is_set():
+    # --- Broadcaster de mensajes WS (coroutine en el bucle principal) ---
+    async def _broadcast_messages(self):
+        """
+        Consumidor único del canal de actualizaciones: cada lote (lo llegado desde la última
+        vuelta) se encola de una vez en las conexiones de entrenamiento, que lo envían en un frame.
+        Las muestras de rollout pasan por el MetricsAggregator, que emite una vez por ventana.
+        """
+        logger.info("Broadcaster de mensajes WebSocket iniciado.")
+        while True:
+            if self._metrics.window_seconds > 0 and self._metrics.pending():
+                try: # Esperar como mucho hasta el fin de la ventana de métricas
+                    items = await asyncio.wait_for(self._update_queue.get_batch(), self._metrics.seconds_until_due())
+                except asyncio.TimeoutError:
+                    items = []
+            else:
+                items = await self._update_queue.get_batch()
             try:
-                message_json = self._update_queue.get(block=True, timeout=1.0)
-                if message_json is None:
-                    logger.info("Hilo broadcaster recibió señal de parada (None).")
-                    break
-                self._schedule_broadcast(message_json)
-                # self._update_queue.task_done() # No es estrictamente necesario si no se usa join() en la cola
-            except queue.Empty:
-                continue # Simplemente volver a esperar si hay timeout
+                self._ws_manager.publish_batch_to_training(self._route_updates(items))
             except Exception as e:
-                logger.error(f"Error en el hilo broadcaster: {e}", exc_info=True)
-                time.sleep(0.1) # Evitar bucle rápido en caso de error persistente
-        logger.info("Hilo broadcaster finalizado.")
+                logger.error(f"Error en el broadcaster de mensajes WebSocket: {e}", exc_info=True)
+
+    def _route_updates(self, items) -> list:
+        """
+        Separa mensajes JSON ya listos de muestras de métricas y añade el resumen si toca emitirlo.
+        Los estados que llegan del proceso de entrenamiento se copian a `current_status`.
+        """
+        messages = []
+        for item in items:
+            if isinstance(item, RolloutSample):
+                self._metrics.add(item)
+            elif item is FLUSH_METRICS:
+                summary = self._metrics.flush()
+                if summary:
+                    messages.append(summary)
+            elif item is PROCESS_EXITED:
+                summary = self._metrics.flush()
+                if summary:
+                    messages.append(summary)
+                self._on_process_exit()
+            else:
+                message = json.loads(item)
+                if message.get("type") == "training_status":
+                    self.current_status = TrainingStatus(**message["data"])
+                messages.append(item)
+        if self._metrics.pending() and self._metrics.seconds_until_due() == 0:
+            messages.append(self._metrics.flush())
+        return messages
+
+    def stop_message_broadcaster(self):
+        """Detiene el broadcaster (al apagar la aplicación)."""
+        self._update_queue.unbind()
+        if self._broadcaster_task is not None and not self._broadcaster_task.done():
+            self._broadcaster_task.cancel()
+        self._broadcaster_task = None
+        logger.info("Broadcaster de mensajes WebSocket detenido.")
+
+    def _on_process_exit(self):
+        """Fin del proceso de entrenamiento: si no envió un estado final (fallo, terminate...), fijarlo aquí."""
+        if self._process is None or self._process.is_alive():
+            return # Fin de un proceso anterior que liberaba recursos mientras arrancaba el actual
+        exitcode = self._process.exitcode
+        logger.info(f"Proceso de entrenamiento finalizado (exitcode={exitcode}).")
+        if self.current_status.status not in FINAL_STATUSES:
+            if self._process is not None and self._process.stop_event.is_set():
+                self._update_status(status="Detenido", message=f"Proceso de entrenamiento detenido a la fuerza (exitcode={exitcode}).")
+            else:
+                self._update_status(status="Error", message=f"El proceso de entrenamiento terminó inesperadamente (exitcode={exitcode}).")
 
     # --- Actualización y envío de Estado ---
     def _update_status(self, status: str, message: Optional[str] = None, current_step: Optional[int] = None, total_steps: Optional[int] = None):
@@ -194,9 +258,66 @@ class TrainingManager:
             except Exception as e:
                 logger.error(f"Error al poner estado en cola WS: {e}")
 
-    # --- Bucle Principal de Entrenamiento (Ejecutado en un Hilo Separado) ---
+    # --- Creación del Entorno Vectorizado ---
+    @staticmethod
+    def build_vec_env(kind: str, n_envs: int, board_size: int, seed: Optional[int],
+                      worker_cpus: Optional[list] = None) -> "VecEnv":
+        """
+        Crea el VecEnv de entrenamiento según `TrainingParams.vec_env_cls`.
+        - 'batched': BatchedSnakeEnv, todos los tableros en NumPy dentro de este proceso (sin IPC).
+        - 'dummy': DummyVecEnv, entornos secuenciales en este proceso.
+        - 'subproc': un proceso por entorno; las máscaras viajan con el resultado de step.
+        - 'shared_memory': un proceso por entorno escribiendo en memoria compartida.
+        Todos exponen la info 'episode' (Monitor/VecMonitor) que consumen SB3 y WebSocketUpdateCallback.
+        `worker_cpus` (PlacementPlan.worker_cpus) fija los workers de 'subproc'/'shared_memory'.
+        """
+        # En entrenamiento solo se consumen la máscara y los datos de episodio (Monitor): info 'slim'.
+        # Con subprocesos la máscara ya viaja aparte, así que no hace falta info ('none').
+        from stable_baselines3.common.env_util import make_vec_env
+        from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
+        from core.snake_env import SnakeEnv
+        from core.batched_snake_env import BatchedSnakeEnv
+        from core.masked_subproc_vec_env import MaskedSubprocVecEnv
+        from core.shared_memory_vec_env import SharedMemoryVecEnv
+
+        env_lambda = lambda: SnakeEnv(board_size=board_size, info_mode="slim")
+        worker_env_lambda = lambda: SnakeEnv(board_size=board_size, info_mode="none")
+        if kind == "batched":
+            vec_env = BatchedSnakeEnv(num_envs=n_envs, board_size=board_size)
+        elif kind == "shared_memory":
+            vec_env = SharedMemoryVecEnv([worker_env_lambda for _ in range(n_envs)], worker_cpus=worker_cpus)
+        elif kind == "subproc":
+            return make_vec_env(worker_env_lambda, n_envs=n_envs, vec_env_cls=MaskedSubprocVecEnv, seed=seed,
+                                vec_env_kwargs={"worker_cpus": worker_cpus})
+        elif kind == "dummy":
+            return make_vec_env(env_lambda, n_envs=n_envs, vec_env_cls=DummyVecEnv, seed=seed)
+        else:
+            raise ValueError(f"Tipo de VecEnv desconocido: {kind}")
+        vec_env.seed(seed)
+        return VecMonitor(vec_env)
+
+    @staticmethod
+    def ppo_hyperparameters(params: TrainingParams) -> Dict[str, Any]:
+        """Hiperparámetros de MaskablePPO para un entrenamiento nuevo (también los usan los benchmarks)."""
+        policy_kwargs = getattr(params, 'policy_kwargs', None)
+        return dict(
+            learning_rate=params.learning_rate, n_steps=max(128, 2048 // params.num_cpu), batch_size=64, n_epochs=10,
+            gamma=0.99, gae_lambda=0.95, clip_range=0.2, ent_coef=0.0, vf_coef=0.5, max_grad_norm=0.5,
+            # Usar policy_kwargs si se proporcionó, sino usar default (la red más grande)
+            policy_kwargs=policy_kwargs if policy_kwargs else dict(net_arch=dict(pi=[128, 128], vf=[128, 128])),
+        )
+
+    # --- Bucle Principal de Entrenamiento (Ejecutado en el Proceso de Entrenamiento) ---
     def _training_loop(self, params: TrainingParams, continue_mode: bool = False):
         """Contiene la lógica principal de configuración y ejecución del entrenamiento SB3."""
+        import torch
+        from sb3_contrib import MaskablePPO
+        from stable_baselines3.common.callbacks import CallbackList
+        from callbacks.stop_training_callback import StopTrainingCallback
+        from callbacks.websocket_callback import WebSocketUpdateCallback
+        from core.checkpoint_writer import AsyncCheckpointCallback, CheckpointWriter, take_snapshot
+        from core.evaluation_service import AsyncEvalCallback
+
         # Obtener parámetros configurables o usar defaults
         # Asumiendo que estos campos existen en TrainingParams (schemas.py) o usar getattr
         board_size = getattr(params, 'board_size', 20)
@@ -204,8 +325,9 @@ class TrainingManager:
         policy_kwargs = getattr(params, 'policy_kwargs', None)
 
         logger.info(f"Iniciando _training_loop: continue={continue_mode}, board_size={board_size}, seed={seed}, policy_kwargs={policy_kwargs}, params={params.dict()}")
-        self._stop_event.clear()
-        self._eval_env = None # Reiniciar para el bloque finally
+        # El evento de parada lo limpia quien lanza la sesión: en un proceso hijo la señal puede llegar antes que este punto
+        self._eval_callback = None # Reiniciar para el bloque finally
+        self._checkpoint_writer = None
 
         try:
             # --- 1. Estado Inicial y Preparación ---
@@ -213,24 +335,30 @@ class TrainingManager:
             self._update_status(status="Inicializando", total_steps=initial_total_steps, current_step=0, message="Configurando entorno...")
 
             # --- 2. Crear Entorno Vectorizado ---
-            env_lambda = lambda: SnakeEnv(board_size=board_size)
-            vec_env_cls = SubprocVecEnv if params.num_cpu > 1 else DummyVecEnv
-            self._vec_env = make_vec_env(env_lambda, n_envs=params.num_cpu, vec_env_cls=vec_env_cls, seed=seed)
-            logger.info(f"Entorno VecEnv creado: {vec_env_cls.__name__} con {params.num_cpu} envs (size={board_size}, seed={seed}).")
+            vec_env_kind = getattr(params, 'vec_env_cls', 'batched')
+            placement = None
+            if getattr(params, 'cpu_placement', 'none') == 'auto':
+                placement = plan_placement(vec_env_kind, params.num_cpu)
+                torch.set_num_threads(placement.torch_threads)
+                pin_process(placement.learner_cpus)
+                logger.info(f"Reparto de CPUs (auto): {placement.to_dict()}")
+            self._vec_env = self.build_vec_env(vec_env_kind, params.num_cpu, board_size, seed,
+                                               worker_cpus=placement.worker_cpus if placement else None)
+            logger.info(f"Entorno VecEnv creado: {vec_env_kind} con {params.num_cpu} envs (size={board_size}, seed={seed}).")
 
             total_timesteps_for_learn = 0
             start_step = 0
 
             # --- 3. Crear o Cargar Modelo SB3 ---
             if continue_mode:
-                logger.info(f"[CONTINUE] Intentando cargar modelo MaskablePPO desde: {LAST_MODEL_PATH}")
-                if not os.path.exists(LAST_MODEL_PATH):
-                    raise FileNotFoundError(f"No se encontró {LAST_MODEL_PATH} para continuar.")
+                logger.info(f"[CONTINUE] Intentando cargar modelo MaskablePPO desde: {self.paths.last_model_path}")
+                if not os.path.exists(self.paths.last_model_path):
+                    raise FileNotFoundError(f"No se encontró {self.paths.last_model_path} para continuar.")
 
                 self._update_status(status="Inicializando", message="Cargando modelo MaskablePPO...")
                 # Nota: policy_kwargs generalmente no se pasa a load, se usan los del modelo guardado.
                 # Para cambiar hiperparámetros al continuar, se usan otros métodos de SB3.
-                self._model = MaskablePPO.load(LAST_MODEL_PATH, env=self._vec_env, device="auto", tensorboard_log=TENSORBOARD_LOG_DIR)
+                self._model = MaskablePPO.load(self.paths.last_model_path, env=self._vec_env, device="auto", tensorboard_log=self.paths.tensorboard_dir)
                 start_step = self._model.num_timesteps
                 # params.total_timesteps son los pasos *adicionales*
                 total_timesteps_for_learn = start_step + params.total_timesteps
@@ -241,16 +369,12 @@ class TrainingManager:
             else: # Nuevo entrenamiento
                  logger.info("[NEW] Creando nuevo modelo PPO...")
                  self._update_status(status="Inicializando", message="Creando nuevo modelo...")
-                 n_steps_per_env = max(128, 2048 // params.num_cpu)
-
-                 # Usar policy_kwargs si se proporcionó, sino usar default
-                 final_policy_kwargs = policy_kwargs if policy_kwargs else dict(net_arch=dict(pi=[128, 128], vf=[128, 128])) # Usar la red más grande
-                 logger.info(f"Usando policy_kwargs: {final_policy_kwargs}")
+                 ppo_kwargs = self.ppo_hyperparameters(params)
+                 n_steps_per_env = ppo_kwargs["n_steps"]
+                 logger.info(f"Usando policy_kwargs: {ppo_kwargs['policy_kwargs']}")
 
-                 self._model = MaskablePPO( "MlpPolicy", self._vec_env, verbose=0, tensorboard_log=TENSORBOARD_LOG_DIR,
-                                   learning_rate=params.learning_rate, n_steps=n_steps_per_env, batch_size=64, n_epochs=10,
-                                   gamma=0.99, gae_lambda=0.95, clip_range=0.2, ent_coef=0.0, vf_coef=0.5, max_grad_norm=0.5,
-                                   policy_kwargs=final_policy_kwargs, seed=seed, device="auto")
+                 self._model = MaskablePPO( "MlpPolicy", self._vec_env, verbose=0, tensorboard_log=self.paths.tensorboard_dir,
+                                   seed=seed, device="auto", **ppo_kwargs)
                  start_step = 0
                  total_timesteps_for_learn = params.total_timesteps # Total a alcanzar
                  logger.info(f"[NEW] Modelo PPO creado. Entrenando por {params.total_timesteps} pasos. "
@@ -260,26 +384,43 @@ class TrainingManager:
             # --- 4. Configurar Callbacks ---
             logger.info("Configurando callbacks...")
             stop_callback = StopTrainingCallback(self._stop_event)
-            websocket_callback = WebSocketUpdateCallback(self._update_queue, verbose=0)
+            metrics_writer = None
+            if self._metrics_store is not None and self.current_status.run_id:
+                metrics_writer = self._metrics_store.create_run(self.current_status.run_id, {
+                    "continue_mode": continue_mode, "start_step": start_step,
+                    "total_steps": total_timesteps_for_learn, "params": params.dict()})
+            websocket_callback = WebSocketUpdateCallback(self._update_queue, metrics_writer=metrics_writer, verbose=0)
             callback_list = [stop_callback, websocket_callback]
+            # Al continuar, los checkpoints anteriores siguen la misma numeración de pasos y entran en la retención
+            self._checkpoint_writer = CheckpointWriter(self.paths.checkpoint_dir, keep_last=params.checkpoint_keep_last,
+                                                       adopt_existing=continue_mode)
 
             try:
-                self._eval_env = RecordEpisodeStatistics(SnakeEnv(board_size=board_size))
                 steps_to_learn_this_session = total_timesteps_for_learn - start_step
                 eval_freq = max(steps_to_learn_this_session // 10 // params.num_cpu, 1)
                 checkpoint_freq = max(steps_to_learn_this_session // 5 // params.num_cpu, 1)
                 eval_freq = max(eval_freq, 5000 // params.num_cpu) # Mínimo razonable
                 checkpoint_freq = max(checkpoint_freq, 10000 // params.num_cpu) # Mínimo razonable
 
-                logger.info(f"Entorno de evaluación creado (size={board_size}). Frecuencia eval: {eval_freq}, checkpoint: {checkpoint_freq}")
-                eval_callback = EvalCallback(self._eval_env, best_model_save_path=BEST_MODEL_SAVE_PATH, log_path=LOG_DIR,
-                                            eval_freq=eval_freq, n_eval_episodes=5, deterministic=True, render=False, verbose=0)
-                checkpoint_callback = CheckpointCallback(save_freq=checkpoint_freq, save_path=CHECKPOINT_SAVE_PATH, name_prefix="rl_model")
-                callback_list.extend([eval_callback, checkpoint_callback])
-                logger.info("EvalCallback y CheckpointCallback añadidos.")
+                logger.info(f"Evaluación asíncrona (size={board_size}, {params.eval_episodes} episodios, {params.eval_workers} procesos). "
+                            f"Frecuencia eval: {eval_freq}, checkpoint: {checkpoint_freq}")
+                onnx_export = params.onnx_export and ONNX_AVAILABLE
+                onnx_quantize = params.onnx_quantize and onnx_export and ONNXRUNTIME_AVAILABLE
+                if params.onnx_export and not onnx_export:
+                    logger.warning("onnx_export: el paquete 'onnx' no está instalado, no se exportará el mejor modelo a ONNX.")
+                elif params.onnx_quantize and not onnx_quantize:
+                    logger.warning("onnx_quantize: 'onnxruntime' no está instalado, no se generará la versión int8.")
+                self._eval_callback = AsyncEvalCallback(board_size, eval_freq=eval_freq, best_model_save_path=self.paths.best_model_dir,
+                                                        log_path=self.paths.log_dir, n_eval_episodes=params.eval_episodes,
+                                                        n_workers=params.eval_workers, update_queue=self._update_queue,
+                                                        checkpoint_writer=self._checkpoint_writer, seed=seed or 0,
+                                                        onnx_export=onnx_export, onnx_quantize=onnx_quantize)
+                checkpoint_callback = AsyncCheckpointCallback(self._checkpoint_writer, save_freq=checkpoint_freq)
+                callback_list.extend([self._eval_callback, checkpoint_callback])
+                logger.info("AsyncEvalCallback y AsyncCheckpointCallback añadidos.")
             except Exception as e_eval:
-                 logger.error(f"No se pudo crear/configurar EvalCallback/CheckpointCallback: {e_eval}", exc_info=True)
-                 self._eval_env = None
+                 logger.error(f"No se pudo crear/configurar AsyncEvalCallback/AsyncCheckpointCallback: {e_eval}", exc_info=True)
+                 self._eval_callback = None
 
             # --- 5. Iniciar el Entrenamiento ---
             logger.info(f"Preparado para iniciar MaskablePPO model.learn | Objetivo total: {total_timesteps_for_learn} | "
@@ -302,27 +443,30 @@ class TrainingManager:
             duration = end_time - start_time
             logger.info(f"model.learn finalizado. Duración: {duration:.2f}s")
 
-            # --- 6. Manejar Fin del Entrenamiento ---
+            # --- 6. Guardar Modelo Final ---
+            # Antes de anunciar el estado final: quien reaccione a "Completado"/"Detenido" (ej. continuar) ya encuentra el modelo
             # Obtener pasos finales (puede ser ligeramente > total_timesteps_for_learn)
             final_steps = self._model.num_timesteps if self._model else self.current_status.current_step
+            save_error = None
+            if self._model:
+                logger.info(f"Guardando último modelo en: {self.paths.last_model_path}")
+                try:
+                    self._checkpoint_writer.save(take_snapshot(self._model), self.paths.last_model_path).result()
+                    logger.info("Último modelo guardado exitosamente.")
+                except Exception as e_save:
+                    logger.error(f"Error al guardar el último modelo: {e_save}", exc_info=True)
+                    save_error = e_save
 
-            if self._stop_event.is_set():
+            # --- 7. Manejar Fin del Entrenamiento ---
+            if save_error is not None:
+                self._update_status(status="Error", message=f"Error guardando modelo final: {save_error}", current_step=final_steps)
+            elif self._stop_event.is_set():
                 logger.info(f"Entrenamiento detenido por señal de stop en el paso {final_steps}.")
                 self._update_status(status="Detenido", message="Entrenamiento detenido por usuario.", current_step=final_steps)
             else:
                 logger.info(f"Entrenamiento completado normalmente al alcanzar {final_steps} pasos.")
                 self._update_status(status="Completado", message="Entrenamiento completado.", current_step=final_steps, total_steps=total_timesteps_for_learn)
 
-            # --- 7. Guardar Modelo Final ---
-            if self._model:
-                logger.info(f"Guardando último modelo en: {LAST_MODEL_PATH}")
-                try:
-                    self._model.save(LAST_MODEL_PATH)
-                    logger.info("Último modelo guardado exitosamente.")
-                except Exception as e_save:
-                    logger.error(f"Error al guardar el último modelo: {e_save}", exc_info=True)
-                    self._update_status(status="Error", message=f"Error guardando modelo final: {e_save}")
-
         except FileNotFoundError as e:
              logger.error(f"Error de archivo no encontrado en hilo de entrenamiento: {e}", exc_info=True)
              self._update_status(status="Error", message=f"Error: {e}")
@@ -333,10 +477,16 @@ class TrainingManager:
         finally:
             # --- 8. Limpieza de Recursos ---
             logger.info("Inicio de limpieza de recursos del hilo de entrenamiento...")
-            if self._eval_env:
-                try: self._eval_env.close(); logger.info("EvalEnv cerrado.")
-                except Exception as e_close: logger.error(f"Error cerrando EvalEnv: {e_close}")
-                self._eval_env = None
+            if self._eval_callback:
+                try: self._eval_callback.close(); logger.info("Evaluación asíncrona cerrada.")
+                except Exception as e_close: logger.error(f"Error cerrando la evaluación asíncrona: {e_close}")
+                self._eval_callback = None
+            if self._checkpoint_writer:
+                try:
+                    self._checkpoint_writer.close() # Espera a los checkpoints en curso
+                    logger.info(f"Escritor de checkpoints cerrado: {self._checkpoint_writer.stats()}")
+                except Exception as e_close: logger.error(f"Error cerrando el escritor de checkpoints: {e_close}")
+                self._checkpoint_writer = None
             if self._vec_env:
                 try: self._vec_env.close(); logger.info("VecEnv cerrado.")
                 except Exception as e_close: logger.error(f"Error cerrando VecEnv: {e_close}")
@@ -347,33 +497,48 @@ class TrainingManager:
             self._stop_event.clear() # Resetear evento para la próxima vez
             logger.info("Fin de limpieza de recursos del hilo de entrenamiento.")
             # El estado final ("Detenido", "Completado", "Error") ya se envió
-            # El broadcaster sigue activo hasta que se detenga explícitamente o muera la app
 
 
+    def _new_run_id(self):
+        """Asigna un id de run a la sesión que empieza (se envía en el estado)."""
+        if self._metrics_store is not None:
+            self.current_status.run_id = self._metrics_store.new_run_id()
+
     # --- Métodos Públicos de Control ---
+    def _is_training(self) -> bool:
+        """Sesión en curso: proceso vivo sin estado final (después del estado final solo libera recursos)."""
+        return (self._process is not None and self._process.is_alive()
+                and self.current_status.status not in FINAL_STATUSES)
+
+    def _launch_process(self, params: TrainingParams, continue_mode: bool):
+        """Lanza `_training_loop` en un proceso hijo supervisado (ver core/training_process.py)."""
+        self._process = TrainingProcess(
+            self.current_status.run_id, params, self.paths.log_dir, forward=self._update_queue.put,
+            metrics_root=self._metrics_store.root if self._metrics_store is not None else None,
+            continue_mode=continue_mode, torch_threads=self.torch_threads, nice=self.nice)
+        self._process.start()
+
     def start_training_session(self, params: TrainingParams):
-        """Inicia una nueva sesión de entrenamiento en un hilo separado."""
+        """Inicia una nueva sesión de entrenamiento en un proceso separado."""
         logger.info(f"Solicitud para iniciar NUEVA sesión con params: {params.dict()}")
-        if self._training_thread is not None and self._training_thread.is_alive():
+        if self._is_training():
             logger.warning("Intento de iniciar entrenamiento mientras otro ya está en curso.")
             raise ValueError("Ya hay un entrenamiento en curso.")
 
         self.current_params = params
-        self._stop_event.clear()
-        self._start_message_broadcaster() # Asegurar que esté activo
-        # El estado "Iniciando" indica que la solicitud fue aceptada y el hilo se está creando
+        self._new_run_id()
+        # El estado "Iniciando" indica que la solicitud fue aceptada y el proceso se está creando
         self._update_status(status="Iniciando", current_step=0, total_steps=params.total_timesteps, message="Preparando para iniciar...")
 
-        self._training_thread = threading.Thread(target=self._training_loop, args=(params, False), daemon=True, name="TrainingThread")
-        self._training_thread.start()
-        logger.info("Hilo de entrenamiento (nuevo) iniciado.")
+        self._launch_process(params, continue_mode=False)
+        logger.info("Proceso de entrenamiento (nuevo) iniciado.")
 
     def continue_training_session(self, additional_timesteps: int = 1_000_000):
-        """Continúa el último entrenamiento guardado en un hilo separado."""
+        """Continúa el último entrenamiento guardado en un proceso separado."""
         logger.info(f"Solicitud para CONTINUAR entrenamiento. Pasos adicionales solicitados (aprox): {additional_timesteps}")
-        if self._training_thread is not None and self._training_thread.is_alive():
+        if self._is_training():
             raise ValueError("Ya hay un entrenamiento en curso.")
-        if not os.path.exists(LAST_MODEL_PATH):
+        if not os.path.exists(self.paths.last_model_path):
             raise FileNotFoundError("No se encontró 'last_model.zip' para continuar.")
 
         num_cpu_available = self.get_hardware_info()['num_cpu']
@@ -386,64 +551,38 @@ class TrainingManager:
             # policy_kwargs=...?
         )
         self.current_params = temp_params
-        self._stop_event.clear()
-        self._start_message_broadcaster()
+        self._new_run_id()
         self._update_status(status="Iniciando", current_step=0, total_steps=0, message="Preparando para continuar...") # Total steps se actualiza al cargar
 
-        self._training_thread = threading.Thread(target=self._training_loop, args=(temp_params, True), daemon=True, name="TrainingThread")
-        self._training_thread.start()
-        logger.info("Hilo de entrenamiento (continuar) iniciado.")
+        self._launch_process(temp_params, continue_mode=True)
+        logger.info("Proceso de entrenamiento (continuar) iniciado.")
 
     async def stop_training_session(self) -> bool:
-        """Envía la señal de parada al hilo de entrenamiento."""
-        stopped = False
-        if self._training_thread is not None and self._training_thread.is_alive():
-            if not self._stop_event.is_set():
-                logger.info("Enviando señal de parada al hilo de entrenamiento...")
-                self._stop_event.set()
-                await asyncio.sleep(0.1) # Pequeña pausa para que el evento se procese
-                stopped = True
-                logger.info("Señal de parada enviada.")
-                # No detener el broadcaster aquí, esperar al estado final del loop
-            else:
-                logger.info("La señal de parada ya estaba activa.")
-                stopped = True
-        else:
+        """
+        Envía la señal de parada al proceso de entrenamiento. Si no termina en STOP_GRACE_SECONDS
+        se termina a la fuerza (ver TrainingProcess.stop).
+        """
+        if not self._is_training():
             logger.info("No había ningún entrenamiento activo para detener.")
-            # Si no había hilo activo, detener el broadcaster por si quedó huérfano
-            self._stop_message_broadcaster()
+            return False
+        if not self._process.stop_event.is_set():
+            logger.info("Enviando señal de parada al proceso de entrenamiento...")
+            asyncio.get_running_loop().create_task(self._process.stop())
+        else:
+            logger.info("La señal de parada ya estaba activa.")
+        return True
 
-        # Limpiar referencia si el hilo ya terminó (puede pasar entre el check y ahora)
-        if self._training_thread is not None and not self._training_thread.is_alive():
-             logger.info("(stop_training_session) Limpiando referencia a hilo finalizado.")
-             self._training_thread = None
-        return stopped
+    def shutdown_training_session(self, timeout: float = 10.0):
+        """Detiene el proceso de entrenamiento al apagar la aplicación (terminate si no para en `timeout`)."""
+        if self._process is not None:
+            self._process.shutdown(timeout)
 
     # --- Métodos de Información ---
     def get_status(self) -> TrainingStatus:
-        """Devuelve el estado actual, comprobando consistencia con el hilo."""
-        active_statuses = ["Entrenando", "Iniciando", "Inicializando"]
-        is_thread_alive = self._training_thread is not None and self._training_thread.is_alive()
-
-        if self.current_status.status in active_statuses and not is_thread_alive:
-             logger.warning(f"Estado inconsistente detectado: Status='{self.current_status.status}' pero hilo no activo. Actualizando...")
-             # Si el evento stop está activo, asumimos que se detuvo pero no actualizó estado final
-             if self._stop_event.is_set():
-                  self._update_status(status="Detenido", message="El hilo terminó después de señal de parada (detectado por get_status).")
-             else: # Si no, asumimos que falló
-                  self._update_status(status="Error", message="El hilo de entrenamiento terminó inesperadamente (detectado por get_status).")
-             # Detener broadcaster en caso de inconsistencia
-             self._stop_message_broadcaster()
-             self._training_thread = None # Limpiar referencia
-
-        # Detener broadcaster si el estado es final Y el hilo ya no está vivo
-        elif self.current_status.status not in active_statuses and not is_thread_alive:
-             self._stop_message_broadcaster()
-             # Limpiar referencia al hilo si ya terminó
-             if self._training_thread is not None:
-                  self._training_thread = None
-
-
+        """
+        Devuelve el estado actual. Lo mantiene el broadcaster con los estados del proceso de
+        entrenamiento; si el proceso termina sin estado final, lo fija al recibir PROCESS_EXITED.
+        """
         return self.current_status
 
     def get_default_parameters(self) -> Dict:
@@ -455,6 +594,7 @@ class TrainingManager:
              "total_timesteps": 2_000_000,
              "num_cpu": default_cpus,
              "learning_rate": 0.0003,
+             "vec_env_cls": "batched",
              # "board_size": 10, # Si lo añades a TrainingParams
              # "seed": None, # Si lo añades
              # "policy_kwargs": None # Si lo añades
@@ -462,11 +602,7 @@ class TrainingManager:
 
     def get_hardware_info(self) -> Dict:
         """Obtiene información básica de hardware (CPU/GPU)."""
-        gpu_available = torch.cuda.is_available()
-        gpu_name = "N/A"
-        if gpu_available:
-            try: gpu_name = torch.cuda.get_device_name(0)
-            except Exception as e: logger.warning(f"Error obteniendo nombre de GPU: {e}"); gpu_name = "Error"
+        gpu_available, gpu_name = _gpu_info()
         return {"num_cpu": psutil.cpu_count(logical=False) or 1,
                 "num_cpu_logical": psutil.cpu_count(logical=True) or 1,
                 "gpu_available": gpu_available, "gpu_name": gpu_name}
\ No newline at end of file
@@ -0,0 +1,149 @@
+# backend/core/training_process.py
+"""
+Entrenamiento en un proceso hijo supervisado.
+
+El proceso hijo (forkserver/spawn) crea un TrainingManager sin WebSockets y ejecuta su
+`_training_loop` con un evento de parada y una cola de multiprocessing como canal: por ella
+envía lo mismo que el hilo de entrenamiento ponía en el canal del TrainingManager (estado y
+logs en JSON, `RolloutSample`, `FLUSH_METRICS`) y un `None` final. Torch usa su propio pool
+de hilos (`torch_threads`) y, opcionalmente, el proceso baja su prioridad (`nice`) y se fija a
+unos núcleos (`cpus`), para que el servidor no compita por el GIL ni pierda CPU.
+
+En el proceso principal, `TrainingProcess` lanza el hijo y un hilo lector que reenvía la cola
+a `forward` y, cuando el hijo termina (con o sin `None`: fallo nativo, terminate...), envía
+`PROCESS_EXITED`. La parada es escalonada: evento, terminate() y kill().
+"""
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from api.schemas import TrainingParams
+from core.metrics_store import MetricsStore
+
+logger = logging.getLogger(__name__)
+
+STOP_GRACE_SECONDS = 30.0 # Tras pedir la parada: terminate() si el proceso sigue vivo, y kill() 5 s después
+KILL_GRACE_SECONDS = 5.0
+_READER_POLL_SECONDS = 0.5
+_CHILD_QUEUE_MAXSIZE = 1000
+
+
+class _ProcessExited:
+    def __repr__(self):
+        return "PROCESS_EXITED"
+
+
+# Marca del hilo lector: el proceso terminó y su cola ya está vacía (exitcode disponible)
+PROCESS_EXITED = _ProcessExited()
+
+
+def run_training_process(run_id: Optional[str], params: Dict[str, Any], continue_mode: bool, log_dir: str,
+                         metrics_root: Optional[str], cpus: Optional[List[int]], torch_threads: int, nice: int,
+                         update_queue, stop_event) -> None:
+    """Punto de entrada del proceso hijo (ver el docstring del módulo)."""
+    logging.basicConfig(level=logging.INFO,
+                        format=f'%(asctime)s - [training {run_id}] %(name)s - %(levelname)s - %(message)s')
+    # Importación diferida: training_manager importa este módulo (y torch solo hace falta en el hijo)
+    import torch
+    from core.training_manager import RunPaths, TrainingManager
+    try:
+        if nice > 0:
+            os.nice(nice)
+        if cpus and hasattr(os, "sched_setaffinity"):
+            # Con un presupuesto mayor que los núcleos reales (sobresuscripción) algunos ids no existen
+            allowed = set(cpus) & os.sched_getaffinity(0)
+            if allowed:
+                os.sched_setaffinity(0, allowed)
+        torch.set_num_threads(max(torch_threads, 1))
+        manager = TrainingManager(None, metrics_store=MetricsStore(metrics_root) if metrics_root else None,
+                                  paths=RunPaths(log_dir), update_queue=update_queue, stop_event=stop_event)
+        manager.current_status.run_id = run_id
+        manager._training_loop(TrainingParams(**params), continue_mode=continue_mode)
+    finally:
+        update_queue.put(None) # Fin del entrenamiento para el hilo lector
+
+
+class TrainingProcess:
+    """Proceso hijo de un entrenamiento y su hilo lector (ver el docstring del módulo)."""
+
+    def __init__(self, run_id: Optional[str], params: TrainingParams, log_dir: str, forward: Callable[[Any], None],
+                 metrics_root: Optional[str] = None, continue_mode: bool = False,
+                 cpus: Optional[List[int]] = None, torch_threads: int = 1, nice: int = 0):
+        """
+        :param forward: Recibe, en el hilo lector, cada elemento de la cola del hijo y al final PROCESS_EXITED.
+        :param cpus: Núcleos a los que fijar el proceso (None = sin afinidad).
+        :param torch_threads: Hilos de torch del hijo.
+        :param nice: Incremento de nice del hijo (0 = misma prioridad que el servidor).
+        """
+        self.run_id = run_id
+        self.forward = forward
+        # forkserver/spawn: no hacer fork de un proceso con hilos (servidor, batcher, lectores)
+        context = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+        self._queue = context.Queue(maxsize=_CHILD_QUEUE_MAXSIZE)
+        self.stop_event = context.Event()
+        params_dict = params.model_dump() if hasattr(params, "model_dump") else params.dict()
+        # No daemon: el entrenamiento puede crear sus propios subprocesos (VecEnv 'subproc'/'shared_memory')
+        self.process = context.Process(
+            target=run_training_process, name=f"Training-{run_id}",
+            args=(run_id, params_dict, continue_mode, log_dir, metrics_root, cpus, torch_threads, nice,
+                  self._queue, self.stop_event))
+        self._reader: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.process.start()
+        self._reader = threading.Thread(target=self._read_queue, daemon=True, name=f"TrainingReader-{self.run_id}")
+        self._reader.start()
+        logger.info(f"Proceso de entrenamiento {self.run_id} lanzado (pid {self.process.pid}).")
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    @property
+    def exitcode(self) -> Optional[int]:
+        return self.process.exitcode
+
+    def request_stop(self) -> None:
+        self.stop_event.set()
+
+    async def stop(self, grace_seconds: float = STOP_GRACE_SECONDS) -> None:
+        """Parada escalonada sin bloquear el bucle: evento, terminate() tras `grace_seconds` y kill()."""
+        self.request_stop()
+        for action, timeout in ((None, grace_seconds), (self.process.terminate, KILL_GRACE_SECONDS), (self.process.kill, None)):
+            if not self.process.is_alive():
+                return
+            if action is not None:
+                logger.warning(f"Proceso de entrenamiento {self.run_id} sigue vivo tras la parada: {action.__name__}().")
+                action()
+            if timeout is not None:
+                await asyncio.to_thread(self.process.join, timeout)
+
+    def shutdown(self, timeout: float) -> None:
+        """Parada bloqueante al apagar la aplicación: evento, espera hasta `timeout` y terminate()."""
+        if not self.process.is_alive():
+            return
+        self.request_stop()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning(f"Proceso de entrenamiento {self.run_id} no terminó a tiempo; terminando el proceso.")
+            self.process.terminate()
+            self.process.join(KILL_GRACE_SECONDS)
+
+    def _read_queue(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=_READER_POLL_SECONDS)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                break # El proceso murió sin enviar el fin
+            except (EOFError, OSError):
+                break
+            if item is None:
+                break
+            self.forward(item)
+        self.process.join(STOP_GRACE_SECONDS)
+        self.forward(PROCESS_EXITED)
@@ -0,0 +1,157 @@
+# backend/core/watch_arena.py
+import asyncio
+import contextlib
+import itertools
+import logging
+from typing import Any, Dict, Optional, Set, Tuple
+
+from core.watch_simulator import WatchSimulator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRAME_DELAY = 0.08 # Segundos entre frames (ritmo de visualización)
+DEFAULT_EPISODE_PAUSE = 1.0 # Pausa entre episodios
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 8 # Frames pendientes por cliente antes de descartar los más antiguos
+
+# Elemento publicado: (número de secuencia, frame). frame None = fin de episodio; una excepción = error.
+ArenaItem = Tuple[int, Any]
+
+
+class ArenaSubscription:
+    """
+    Cola de envío acotada de un cliente. Si el cliente es lento y la cola se llena, se descarta
+    el frame más antiguo (el cliente salta hacia el presente en lugar de acumular retraso).
+    Los números de secuencia permiten al cliente detectar los huecos (ej. forzar un keyframe).
+    """
+
+    def __init__(self, arena: "WatchArena", maxsize: int):
+        self.arena = arena
+        self._queue: "asyncio.Queue[ArenaItem]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, item: ArenaItem) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    async def get(self) -> ArenaItem:
+        return await self._queue.get()
+
+
+class WatchArena:
+    """
+    Una simulación (modelo + tablero) cuyos frames se reparten a todos los suscriptores.
+
+    La tarea productora juega episodios con el WatchSimulator (fuera del bucle de eventos) y
+    publica cada frame en cuanto llega, al ritmo de visualización: la simulación va solo unos
+    frames por delante (`max_ahead` del simulador). Publicar solo encola en las colas de los
+    suscriptores, así el coste de simulación e inferencia no depende del número de espectadores.
+    La tarea vive mientras haya suscriptores.
+    """
+
+    def __init__(self, simulator: WatchSimulator, model_path: str, board_size: int,
+                 frame_delay: float = DEFAULT_FRAME_DELAY, episode_pause: float = DEFAULT_EPISODE_PAUSE):
+        self.simulator = simulator
+        self.model_path = model_path
+        self.board_size = board_size
+        self.frame_delay = frame_delay
+        self.episode_pause = episode_pause
+        self.subscribers: Set[ArenaSubscription] = set()
+        self.frames_published = 0
+        self.episodes = 0
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, queue_size: int) -> ArenaSubscription:
+        subscription = ArenaSubscription(self, queue_size)
+        self.subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription: ArenaSubscription) -> bool:
+        """Quita al suscriptor; si era el último detiene la simulación. Devuelve True si quedó vacía."""
+        self.subscribers.discard(subscription)
+        if self.subscribers:
+            return False
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        return True
+
+    def _publish(self, item: Any) -> None:
+        entry = (next(self._seq), item)
+        for subscription in self.subscribers:
+            subscription.offer(entry)
+
+    async def _run(self) -> None:
+        try:
+            while self.subscribers:
+                # Cada episodio usa la última versión del modelo (el registro recarga si el fichero cambió)
+                score = 0
+                async with contextlib.aclosing(self.simulator.stream_episode(self.model_path, self.board_size)) as frames:
+                    async for frame in frames:
+                        self._publish(frame)
+                        self.frames_published += 1
+                        score = frame["score"]
+                        await asyncio.sleep(self.frame_delay)
+                self.episodes += 1
+                logger.info(f"WatchArena {self.model_path}: episodio emitido a {len(self.subscribers)} "
+                            f"espectador(es). Score: {score}")
+                self._publish(None) # Fin de episodio
+                await asyncio.sleep(self.episode_pause)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"WatchArena {self.model_path}: error en la simulación: {e}", exc_info=True)
+            self._publish(e) # Los suscriptores reciben el error y lo notifican a su cliente
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model_path": self.model_path, "board_size": self.board_size, "subscribers": len(self.subscribers),
+                "episodes": self.episodes, "frames_published": self.frames_published,
+                "frames_dropped": sum(s.dropped for s in self.subscribers)}
+
+
+class WatchArenaHub:
+    """
+    Reparte las sesiones de /ws/watch entre arenas. En modo compartido (`shared=True`) hay una
+    arena por (modelo, tablero) y todos los espectadores ven la misma partida; en modo privado
+    cada suscripción tiene su propia arena (una simulación por cliente, como antes).
+    Se usa solo desde el bucle de eventos.
+    """
+
+    def __init__(self, simulator: WatchSimulator, shared: bool = True,
+                 subscriber_queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE,
+                 frame_delay: float = DEFAULT_FRAME_DELAY, episode_pause: float = DEFAULT_EPISODE_PAUSE):
+        self.simulator = simulator
+        self.shared = shared
+        self.subscriber_queue_size = subscriber_queue_size
+        self.frame_delay = frame_delay
+        self.episode_pause = episode_pause
+        self._arenas: Dict[Tuple[str, int], WatchArena] = {}
+        logger.info(f"WatchArenaHub configurado: modo {'compartido' if shared else 'privado'}, "
+                    f"cola por cliente={subscriber_queue_size}")
+
+    def subscribe(self, model_path: str, board_size: int) -> ArenaSubscription:
+        if not self.shared:
+            arena = WatchArena(self.simulator, model_path, board_size, self.frame_delay, self.episode_pause)
+            return arena.subscribe(self.subscriber_queue_size)
+        key = (model_path, board_size)
+        arena = self._arenas.get(key)
+        if arena is None:
+            arena = self._arenas[key] = WatchArena(self.simulator, model_path, board_size,
+                                                   self.frame_delay, self.episode_pause)
+            logger.info(f"WatchArenaHub: nueva arena compartida para {model_path}.")
+        return arena.subscribe(self.subscriber_queue_size)
+
+    def unsubscribe(self, subscription: ArenaSubscription) -> None:
+        arena = subscription.arena
+        if arena.unsubscribe(subscription):
+            key = (arena.model_path, arena.board_size)
+            if self._arenas.get(key) is arena:
+                del self._arenas[key]
+                logger.info(f"WatchArenaHub: arena de {arena.model_path} cerrada (sin espectadores).")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"shared": self.shared, "arenas": [arena.stats() for arena in self._arenas.values()]}
@@ -0,0 +1,119 @@
+# backend/core/watch_protocol.py
+"""
+Protocolo binario con deltas para /ws/watch (alternativa al JSON de 'game_state_update').
+
+Se negocia al conectar con el subprotocolo WebSocket `SUBPROTOCOL`; si el cliente no lo
+ofrece se sigue enviando JSON. Cada frame es un mensaje binario little-endian:
+
+    cabecera (6 bytes): tipo u8 | flags u8 | score u16 | comida_y u8 | comida_x u8
+    keyframe (tipo 1):  longitud u16 | longitud x (y u8, x u8), de la cabeza a la cola
+    delta    (tipo 2):  n_cabezas u8 | n_colas u8 | n_cabezas x (y u8, x u8), la más nueva primero
+
+Un delta añade `n_cabezas` segmentos por delante y quita `n_colas` segmentos de la cola.
+Sin comida, comida_y = comida_x = 255. flags: bit 0 = gameOver.
+Se envía un keyframe al empezar cada episodio, cada `keyframe_interval` frames y siempre que
+el cambio no encaje en un delta simple. Todas las operaciones son O(1) salvo los keyframes.
+"""
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+SUBPROTOCOL = "snake-delta.v1"
+
+FRAME_KEYFRAME = 1
+FRAME_DELTA = 2
+FLAG_GAME_OVER = 0x01
+NO_FOOD = 255
+DEFAULT_KEYFRAME_INTERVAL = 100
+
+_HEADER = struct.Struct("<BBHBB")
+_KEYFRAME_LEN = struct.Struct("<H")
+_DELTA_COUNTS = struct.Struct("<BB")
+
+Frame = Dict[str, Any]
+Point = Tuple[int, int]
+
+
+def negotiate(offered: Sequence[str]) -> Optional[str]:
+    """Subprotocolo a aceptar de entre los ofrecidos por el cliente (None = JSON)."""
+    return SUBPROTOCOL if SUBPROTOCOL in offered else None
+
+
+def _header(frame_type: int, frame: Frame) -> bytes:
+    food = frame["food"]
+    food_y, food_x = (food[0], food[1]) if food is not None else (NO_FOOD, NO_FOOD)
+    flags = FLAG_GAME_OVER if frame["gameOver"] else 0
+    return _HEADER.pack(frame_type, flags, min(frame["score"], 0xFFFF), food_y, food_x)
+
+
+def _points(points: Sequence[Point]) -> bytes:
+    return bytes(coord for point in points for coord in point)
+
+
+class DeltaFrameEncoder:
+    """
+    Codifica frames consecutivos de una misma simulación (ver watch_simulator.build_frame).
+    Un codificador por conexión: recuerda la cabeza, la cola y la longitud enviadas.
+    """
+
+    def __init__(self, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        assert keyframe_interval >= 1
+        self.keyframe_interval = keyframe_interval
+        self.reset()
+
+    def reset(self) -> None:
+        """Fuerza un keyframe en el próximo frame (ej. al empezar un episodio)."""
+        self._prev: Optional[List[Point]] = None
+        self._since_keyframe = 0
+
+    def _delta_heads(self, snake: List[Point]) -> Optional[Tuple[int, int]]:
+        """(n_cabezas, n_colas) si `snake` se obtiene del frame anterior con un paso normal."""
+        prev = self._prev
+        n_prev, n_new = len(prev), len(snake)
+        if n_new == 0 or n_prev == 0:
+            return None
+        if n_new == n_prev and snake[0] == prev[0] and snake[-1] == prev[-1]:
+            return 0, 0 # Sin movimiento (frame de muerte)
+        if n_new == n_prev + 1 and (n_new == 1 or snake[1] == prev[0]) and snake[-1] == prev[-1]:
+            return 1, 0 # Comió: nueva cabeza, la cola se queda
+        if n_new == n_prev and (n_new == 1 or (snake[1] == prev[0] and snake[-1] == prev[-2])):
+            return 1, 1 # Paso normal: nueva cabeza, se va la cola
+        return None
+
+    def encode(self, frame: Frame) -> bytes:
+        snake = frame["snake"]
+        counts = None
+        if self._prev is not None and self._since_keyframe < self.keyframe_interval:
+            counts = self._delta_heads(snake)
+        self._prev = snake
+        if counts is None:
+            self._since_keyframe = 0
+            return _header(FRAME_KEYFRAME, frame) + _KEYFRAME_LEN.pack(len(snake)) + _points(snake)
+        self._since_keyframe += 1
+        n_heads, n_tails = counts
+        return _header(FRAME_DELTA, frame) + _DELTA_COUNTS.pack(n_heads, n_tails) + _points(snake[:n_heads])
+
+
+class DeltaFrameDecoder:
+    """Reconstruye los frames completos (mismo formato que build_frame); espejo de watch_ai.js."""
+
+    def __init__(self):
+        self.snake: List[Point] = []
+
+    def decode(self, data: bytes) -> Frame:
+        frame_type, flags, score, food_y, food_x = _HEADER.unpack_from(data, 0)
+        offset = _HEADER.size
+        if frame_type == FRAME_KEYFRAME:
+            (length,) = _KEYFRAME_LEN.unpack_from(data, offset)
+            offset += _KEYFRAME_LEN.size
+            self.snake = [(data[offset + 2 * i], data[offset + 2 * i + 1]) for i in range(length)]
+        elif frame_type == FRAME_DELTA:
+            n_heads, n_tails = _DELTA_COUNTS.unpack_from(data, offset)
+            offset += _DELTA_COUNTS.size
+            heads = [(data[offset + 2 * i], data[offset + 2 * i + 1]) for i in range(n_heads)]
+            if n_tails:
+                del self.snake[-n_tails:]
+            self.snake[:0] = heads
+        else:
+            raise ValueError(f"Tipo de frame desconocido: {frame_type}")
+        food = None if food_y == NO_FOOD else (food_y, food_x)
+        return {"snake": list(self.snake), "food": food, "score": score, "gameOver": bool(flags & FLAG_GAME_OVER)}
@@ -0,0 +1,218 @@
+# backend/core/watch_simulator.py
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core.inference_batcher import InferenceBatcher
+from core.model_registry import ModelRegistry
+from core.snake_env import SnakeEnv
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process")
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_AHEAD = 4 # Frames que la simulación puede adelantarse al consumidor antes de esperar
+STOP_POLL_SECONDS = 0.1 # Modo "process": cada cuánto se comprueba la parada al esperar en la cola
+
+Frame = Dict[str, Any]
+
+# Registro propio de cada proceso del pool (modo "process"): el modelo se carga una vez por proceso
+_process_registry: Optional[ModelRegistry] = None
+
+
+def build_frame(env: SnakeEnv, done: bool) -> Frame:
+    """Estado del tablero para /ws/watch (datos del mensaje 'game_state_update'), con tipos Python."""
+    snake = [(int(y), int(x)) for y, x in env.snake] if env.snake else []
+    food = (int(env.food_pos[0]), int(env.food_pos[1])) if env.food_pos else None
+    return {"snake": snake, "food": food, "score": max(len(snake) - 1, 0), "gameOver": bool(done)}
+
+
+def iter_episode_frames(predict: Callable[[Any], int], board_size: int, seed: Optional[int] = None) -> Iterator[Frame]:
+    """
+    Juega un episodio y produce sus frames según avanza (el inicial y uno por paso; el último
+    con gameOver=True). `predict(obs) -> acción` decide cada paso; cada `next` es un paso.
+    """
+    env = SnakeEnv(board_size=board_size, info_mode="none") # Los frames se leen del estado, no de info
+    try:
+        obs, _ = env.reset(seed=seed)
+        yield build_frame(env, False)
+        terminated = truncated = False
+        while not (terminated or truncated):
+            obs, _, terminated, truncated, _ = env.step(predict(obs))
+            yield build_frame(env, terminated or truncated)
+    finally:
+        env.close()
+
+
+def _put_until_stopped(frames: Any, item: Any, stop: Any) -> bool:
+    """Encola `item` en la cola acotada `frames` esperando hueco; False si se pidió parar antes."""
+    while not stop.is_set():
+        try:
+            frames.put(item, timeout=STOP_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _stream_episode_in_process(model_path: str, board_size: int, seed: Optional[int],
+                               loader: Callable[[str], Any], frames: Any, stop: Any) -> None:
+    """
+    Tarea del ProcessPoolExecutor: modelo desde el registro del proceso e inferencia local. Cada
+    frame se envía por `frames` (cola acotada del Manager; None = fin de episodio) en cuanto se
+    produce; con la cola llena la simulación espera. Los errores salen por el futuro de la tarea.
+    """
+    global _process_registry
+    if _process_registry is None:
+        _process_registry = ModelRegistry(max_models=1, loader=loader)
+    model = _process_registry.get(model_path)
+    episode = iter_episode_frames(lambda obs: int(model.predict(obs, deterministic=True)[0]), board_size, seed)
+    try:
+        for frame in episode:
+            if not _put_until_stopped(frames, frame, stop):
+                return
+    finally:
+        episode.close()
+    _put_until_stopped(frames, None, stop)
+
+
+class WatchSimulator:
+    """
+    Ejecuta la simulación e inferencia de las sesiones de /ws/watch fuera del bucle de eventos.
+
+    `stream_episode` juega un episodio en un executor y entrega cada frame en cuanto se produce;
+    el bucle de eventos solo los reparte al ritmo de visualización. La simulación puede ir como
+    mucho `max_ahead` frames por delante del consumidor (después espera), así el primer frame
+    llega tras un paso y no tras el episodio completo, y nunca se acumula un episodio en memoria.
+      - "thread": ThreadPoolExecutor; la inferencia pasa por el InferenceBatcher compartido
+        (lotes entre sesiones) y el modelo sale del ModelRegistry del proceso principal. Cada
+        tramo de `max_ahead // 2` pasos es una tarea del executor: entre tramos el hilo vuelve al
+        pool, así que cualquier número de sesiones avanza con `max_workers` hilos.
+      - "process": ProcessPoolExecutor; cada proceso carga el modelo desde la ruta (con su propio
+        registro, con el mismo loader, y recarga por mtime) e infiere localmente. Los frames
+        viajan por una cola acotada de un multiprocessing.Manager (creado al primer uso). Aísla
+        también el GIL, a cambio de no agrupar la inferencia entre sesiones; el estado del
+        episodio vive en el proceso, que queda ocupado hasta el final (`max_workers` episodios a la vez).
+    """
+
+    def __init__(self, model_registry: ModelRegistry, inference_batcher: InferenceBatcher,
+                 kind: str = "thread", max_workers: int = DEFAULT_MAX_WORKERS, max_ahead: int = DEFAULT_MAX_AHEAD):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Executor de visualización no válido: {kind}. Opciones: {EXECUTOR_KINDS}")
+        assert max_ahead >= 1
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_ahead = max_ahead
+        self.model_registry = model_registry
+        self.inference_batcher = inference_batcher
+        self._executor: Optional[Executor] = None
+        self._manager: Optional[Any] = None # multiprocessing.Manager (modo "process")
+        logger.info(f"WatchSimulator configurado: kind={kind}, max_workers={max_workers}")
+
+    def _mp_context(self):
+        # forkserver/spawn: no hacer fork de un proceso con hilos (servidor, batcher)
+        return mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None: # Creación perezosa (no arrancar procesos si nadie mira)
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._mp_context())
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="WatchSim")
+        return self._executor
+
+    def _get_manager(self) -> Any:
+        if self._manager is None:
+            self._manager = self._mp_context().Manager()
+        return self._manager
+
+    def _advance_episode(self, episode: Iterator[Frame], steps: int, stop: threading.Event) -> Tuple[List[Frame], bool]:
+        """Tarea del modo "thread": hasta `steps` frames de `episode`. Devuelve (frames, episodio terminado)."""
+        frames: List[Frame] = []
+        with self.inference_batcher.session(): # Productor activo solo mientras calcula pasos
+            while len(frames) < steps and not stop.is_set():
+                frame = next(episode, None)
+                if frame is None:
+                    return frames, True
+                frames.append(frame)
+                if frame["gameOver"]:
+                    return frames, True
+        return frames, False
+
+    async def _stream_from_thread(self, model_path: str, board_size: int, seed: Optional[int]) -> AsyncIterator[Frame]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        model = await loop.run_in_executor(executor, self.model_registry.get, model_path)
+        episode = iter_episode_frames(lambda obs: self.inference_batcher.submit(model, obs).result(), board_size, seed)
+        stop = threading.Event()
+        # Un tramo en curso mientras se entrega el anterior: como mucho `max_ahead` frames por delante
+        chunk_steps = max(1, self.max_ahead // 2)
+
+        def advance() -> "asyncio.Future":
+            return loop.run_in_executor(executor, self._advance_episode, episode, chunk_steps, stop)
+
+        def close_episode(future: Optional["asyncio.Future"] = None) -> None:
+            if future is not None and not future.cancelled():
+                future.exception() # Recuperada: el consumidor ya no la necesita
+            episode.close()
+
+        chunk: Optional["asyncio.Future"] = advance()
+        try:
+            while chunk is not None:
+                # shield: cancelar al consumidor no marca el tramo como terminado mientras el hilo aún lo ejecuta
+                frames, done = await asyncio.shield(chunk)
+                chunk = None if done else advance() # El siguiente tramo se simula mientras se muestran estos
+                for frame in frames:
+                    yield frame
+        finally:
+            stop.set()
+            if chunk is None or chunk.done():
+                close_episode(chunk)
+            else:
+                chunk.add_done_callback(close_episode) # No cerrar el generador mientras otro hilo lo avanza
+
+    async def _stream_from_process(self, model_path: str, board_size: int, seed: Optional[int]) -> AsyncIterator[Frame]:
+        loop = asyncio.get_running_loop()
+        manager = self._get_manager()
+        frames, stop = manager.Queue(self.max_ahead), manager.Event()
+        job = loop.run_in_executor(self._get_executor(), _stream_episode_in_process, model_path, board_size, seed,
+                                   self.model_registry.loader, frames, stop)
+        try:
+            while True:
+                try:
+                    item = await loop.run_in_executor(None, frames.get, True, STOP_POLL_SECONDS)
+                except queue.Empty:
+                    if job.done():
+                        job.result() # Propaga el error de la tarea
+                        raise RuntimeError("La simulación terminó sin cerrar el episodio.")
+                    continue
+                if item is None:
+                    return
+                yield item
+        finally:
+            stop.set()
+
+    def stream_episode(self, model_path: str, board_size: int, seed: Optional[int] = None) -> AsyncIterator[Frame]:
+        """
+        Generador asíncrono que juega un episodio con el modelo de `model_path` en el executor y
+        entrega sus frames según se producen. Cerrarlo (`contextlib.aclosing`, o cancelar la tarea
+        que lo consume) detiene la simulación.
+        """
+        stream = self._stream_from_process if self.kind == "process" else self._stream_from_thread
+        return stream(model_path, board_size, seed)
+
+    async def simulate_episode(self, model_path: str, board_size: int, seed: Optional[int] = None) -> List[Frame]:
+        """Episodio completo como lista (para quien necesita todos los frames; /ws/watch usa `stream_episode`)."""
+        return [frame async for frame in self.stream_episode(model_path, board_size, seed)]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
@@ -1,11 +1,18 @@
 # backend/dependencies.py
 import asyncio
 import logging
+import os
 from typing import TYPE_CHECKING
 
 # Importar las clases de los gestores
 from api.websocket_manager import WebSocketManager
-from core.training_manager import TrainingManager
+from core.training_manager import METRICS_DIR, TrainingManager
+from core.metrics_store import MetricsStore
+from core.run_scheduler import RunScheduler
+from core.model_registry import LOADERS, ModelRegistry
+from core.inference_batcher import InferenceBatcher
+from core.watch_simulator import WatchSimulator
+from core.watch_arena import WatchArenaHub
 
 # Evitar importación circular completa usando TYPE_CHECKING para type hints
 # if TYPE_CHECKING:
@@ -18,14 +25,51 @@ logger = logging.getLogger(__name__)
 # Asegurarse que las clases ya estén definidas al importar este módulo
 try:
     ws_manager_singleton = WebSocketManager()
+    # Histórico persistente de métricas por run (logs/metrics/<run_id>/)
+    metrics_store_singleton = MetricsStore(METRICS_DIR)
     # Pasar la instancia de WS al crear el TM
-    training_manager_singleton = TrainingManager(ws_manager_singleton)
-    logger.info("Instancias singleton de WebSocketManager y TrainingManager creadas.")
+    # Ventana de agregación de métricas de entrenamiento en segundos (0 = un mensaje por rollout)
+    # El entrenamiento corre en un proceso hijo con TRAINING_TORCH_THREADS hilos de torch (por defecto
+    # núcleos físicos - 1) y TRAINING_PROCESS_NICE de nice, para que el servidor siga respondiendo
+    training_process_nice = int(os.environ.get("TRAINING_PROCESS_NICE", "5"))
+    training_manager_singleton = TrainingManager(
+        ws_manager_singleton, metrics_window_seconds=float(os.environ.get("TRAINING_METRICS_WINDOW", "1.0")),
+        metrics_store=metrics_store_singleton,
+        torch_threads=int(os.environ.get("TRAINING_TORCH_THREADS", "0")) or None, nice=training_process_nice)
+    # Runs concurrentes en procesos propios, repartiendo TRAINING_CPU_BUDGET CPUs (por defecto todas)
+    run_scheduler_singleton = RunScheduler(
+        ws_manager_singleton, metrics_store_singleton,
+        metrics_window_seconds=float(os.environ.get("TRAINING_METRICS_WINDOW", "1.0")), nice=training_process_nice)
+    # Caché de modelos compartida por todas las sesiones de /ws/watch. WATCH_RUNTIME=auto (por defecto: onnx
+    # si onnxruntime está instalado, si no numpy), numpy (sin torch, sobre la exportación mapeable), onnx,
+    # onnx-int8 o torch
+    watch_runtime = os.environ.get("WATCH_RUNTIME", "auto")
+    if watch_runtime not in LOADERS:
+        raise ValueError(f"WATCH_RUNTIME no válido: {watch_runtime}. Opciones: {sorted(LOADERS)}")
+    model_registry_singleton = ModelRegistry(loader=LOADERS[watch_runtime])
+    # Inferencia por lotes compartida por todas las sesiones de /ws/watch (hilo propio)
+    inference_batcher_singleton = InferenceBatcher()
+    # Simulación + inferencia de /ws/watch fuera del bucle de eventos (WATCH_EXECUTOR=thread|process)
+    watch_simulator_singleton = WatchSimulator(
+        model_registry_singleton, inference_batcher_singleton,
+        kind=os.environ.get("WATCH_EXECUTOR", "thread"),
+        max_workers=int(os.environ.get("WATCH_EXECUTOR_WORKERS", "8")))
+    # Una partida por modelo repartida a todos los espectadores (WATCH_MODE=shared) o una por cliente (private)
+    watch_arena_hub_singleton = WatchArenaHub(watch_simulator_singleton,
+                                              shared=os.environ.get("WATCH_MODE", "shared") != "private")
+    logger.info("Instancias singleton de WebSocketManager, MetricsStore, TrainingManager, RunScheduler, ModelRegistry, InferenceBatcher, "
+                "WatchSimulator y WatchArenaHub creadas.")
 except Exception as e:
     logger.error(f"Error creando instancias singleton: {e}", exc_info=True)
     # Manejar el error como sea apropiado, quizás salir o usar instancias dummy
     ws_manager_singleton = None
+    metrics_store_singleton = None
     training_manager_singleton = None
+    run_scheduler_singleton = None
+    model_registry_singleton = None
+    inference_batcher_singleton = None
+    watch_simulator_singleton = None
+    watch_arena_hub_singleton = None
 
 # Definir una función para establecer el loop DESPUÉS de que FastAPI arranque
 def set_main_event_loop_in_tm():
@@ -34,6 +78,8 @@ def set_main_event_loop_in_tm():
         if training_manager_singleton:
             training_manager_singleton.set_main_event_loop(loop) # <--- Nuevo método en TM
             logger.info("Bucle de eventos principal inyectado en TrainingManager.")
+        if run_scheduler_singleton:
+            run_scheduler_singleton.start(loop)
     except RuntimeError:
          logger.error("No se pudo obtener/inyectar el bucle de eventos principal.")
 
@@ -49,4 +95,65 @@ async def get_training_manager_instance() -> TrainingManager:
     """Devuelve la instancia singleton del TrainingManager."""
     if training_manager_singleton is None:
          raise RuntimeError("TrainingManager no pudo ser inicializado.")
-    return training_manager_singleton
\ No newline at end of file
+    return training_manager_singleton
+
+async def get_run_scheduler_instance() -> RunScheduler:
+    """Devuelve la instancia singleton del RunScheduler."""
+    if run_scheduler_singleton is None:
+         raise RuntimeError("RunScheduler no pudo ser inicializado.")
+    return run_scheduler_singleton
+
+async def get_metrics_store_instance() -> MetricsStore:
+    """Devuelve la instancia singleton del MetricsStore."""
+    if metrics_store_singleton is None:
+         raise RuntimeError("MetricsStore no pudo ser inicializado.")
+    return metrics_store_singleton
+
+async def get_model_registry_instance() -> ModelRegistry:
+    """Devuelve la instancia singleton del ModelRegistry."""
+    if model_registry_singleton is None:
+         raise RuntimeError("ModelRegistry no pudo ser inicializado.")
+    return model_registry_singleton
+
+async def get_inference_batcher_instance() -> InferenceBatcher:
+    """Devuelve la instancia singleton del InferenceBatcher."""
+    if inference_batcher_singleton is None:
+         raise RuntimeError("InferenceBatcher no pudo ser inicializado.")
+    return inference_batcher_singleton
+
+async def get_watch_simulator_instance() -> WatchSimulator:
+    """Devuelve la instancia singleton del WatchSimulator."""
+    if watch_simulator_singleton is None:
+         raise RuntimeError("WatchSimulator no pudo ser inicializado.")
+    return watch_simulator_singleton
+
+async def get_watch_arena_hub_instance() -> WatchArenaHub:
+    """Devuelve la instancia singleton del WatchArenaHub."""
+    if watch_arena_hub_singleton is None:
+         raise RuntimeError("WatchArenaHub no pudo ser inicializado.")
+    return watch_arena_hub_singleton
+
+def shutdown_training_session():
+    """Detiene el proceso de entrenamiento de la UI (parada ordenada con tiempo límite) al apagar la aplicación."""
+    if training_manager_singleton is not None:
+        training_manager_singleton.shutdown_training_session()
+
+
+def stop_training_broadcaster():
+    """Detiene la coroutine que reparte las actualizaciones de entrenamiento (al apagar la aplicación)."""
+    if training_manager_singleton is not None:
+        training_manager_singleton.stop_message_broadcaster()
+
+
+def shutdown_run_scheduler():
+    """Detiene los runs del planificador (parada ordenada con tiempo límite) al apagar la aplicación."""
+    if run_scheduler_singleton is not None:
+        run_scheduler_singleton.shutdown()
+
+
+def shutdown_watch_services():
+    """Detiene el executor del WatchSimulator y el hilo del InferenceBatcher (al apagar la aplicación)."""
+    if watch_simulator_singleton is not None:
+        watch_simulator_singleton.shutdown()
+    if inference_batcher_singleton is not None:
+        inference_batcher_singleton.close()
\ No newline at end of file
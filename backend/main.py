@@ -11,12 +11,15 @@ from fastapi.middleware.cors import CORSMiddleware # Importar CORS
 from starlette.websockets import WebSocketState
 
 # Importar componentes de RL y entorno
-from stable_baselines3 import PPO # O el algoritmo que uses
-from core.snake_env import SnakeEnv
+from core.model_registry import ModelRegistry
+from core.watch_arena import WatchArenaHub
+from core import watch_protocol
 
 # Importar el router de la API y las *funciones de dependencia* desde dependencies.py
 from api import routes as api_routes
-from dependencies import get_training_manager_instance, get_websocket_manager_instance, set_main_event_loop_in_tm
+from dependencies import (get_training_manager_instance, get_websocket_manager_instance, get_model_registry_instance,
+                          get_watch_arena_hub_instance, set_main_event_loop_in_tm, shutdown_run_scheduler,
+                          shutdown_training_session, shutdown_watch_services, stop_training_broadcaster)
 
 # Importar las clases de los gestores (para type hints si es necesario)
 from api.websocket_manager import WebSocketManager
@@ -58,74 +61,58 @@ async def startup_event():
     # Llamar a la función definida en dependencies.py para establecer el loop
     set_main_event_loop_in_tm()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detiene los hilos y tareas auxiliares al apagar la aplicación."""
+    shutdown_training_session()
+    shutdown_run_scheduler()
+    stop_training_broadcaster()
+    shutdown_watch_services()
+
 # --- Incluir el router de la API REST ---
 # Las rutas usarán Depends(get_..._instance) importado desde dependencies.py
 app.include_router(api_routes.router)
 
 
-# --- Clase AiEvaluator (Modificada para cargar modelo en start) ---
+# --- Clase AiEvaluator (sesión de un cliente; la partida la simula y publica una WatchArena) ---
 class AiEvaluator:
-    def __init__(self, websocket: WebSocket, ws_manager: WebSocketManager):
+    def __init__(self, websocket: WebSocket, ws_manager: WebSocketManager, model_registry: ModelRegistry,
+                 arena_hub: WatchArenaHub, protocol: str | None = None):
         self.websocket = websocket
         self.ws_manager = ws_manager
-        self.env: SnakeEnv | None = None # Inicializar a None, crear en run
+        self.model_registry = model_registry
+        self.arena_hub = arena_hub # Arenas compartidas (o privadas) que simulan y publican los frames
         self.task: asyncio.Task | None = None
         self._stop_event = asyncio.Event()
-        self._loaded_watch_model = None # Guardar modelo cargado para esta instancia
-
-    async def _initialize_env(self):
-        """Crea el entorno si no existe."""
-        if self.env is None:
-            try:
-                self.env = SnakeEnv(board_size=BOARD_SIZE)
-                logger.info(f"Cliente {self.websocket.client}: Entorno SnakeEnv creado.")
-            except Exception as e:
-                 logger.error(f"Cliente {self.websocket.client}: Error creando SnakeEnv: {e}", exc_info=True)
-                 await self.send_error("Error interno al crear el entorno del juego.")
-                 return False
-        return True
-
-    async def _close_env(self):
-        """Cierra el entorno si existe."""
-        if self.env:
-             try: self.env.close()
-             except Exception as e_close: logger.error(f"Error cerrando env de evaluación: {e_close}")
-             self.env = None
-
-
-    async def run_evaluation_loop(self, model_to_use, delay=0.08):
-        """Ejecuta la evaluación y envía estados por WebSocket."""
-        if model_to_use is None:
-            logger.warning(f"Cliente {self.websocket.client}: Modelo no disponible para run_evaluation_loop.")
-            # El error ya se envió en start(), no enviar de nuevo.
-            return
-
-        if not await self._initialize_env():
-            return # Salir si no se pudo crear el entorno
-
+        # Protocolo negociado al conectar: None = JSON completo, watch_protocol.SUBPROTOCOL = binario con deltas
+        self.protocol = protocol
+        self._encoder = watch_protocol.DeltaFrameEncoder() if protocol == watch_protocol.SUBPROTOCOL else None
+
+    async def run_evaluation_loop(self):
+        """
+        Se suscribe a la arena del modelo y envía por WebSocket los frames que publica (la arena
+        marca el ritmo). La cola del cliente está acotada: si el cliente va lento se descartan
+        frames antiguos y el hueco de secuencia fuerza un keyframe en el protocolo binario.
+        """
         logger.info(f"Cliente {self.websocket.client}: Iniciando bucle de evaluación con modelo.")
+        subscription = self.arena_hub.subscribe(BEST_MODEL_PATH_WATCH, BOARD_SIZE)
+        last_seq = None
         try:
             while not self._stop_event.is_set():
-                obs, info = self.env.reset()
-                terminated = False
-                truncated = False
-                score = 0
-                await self.send_state() # Enviar estado inicial
-
-                while not terminated and not truncated and not self._stop_event.is_set():
-                    action, _ = model_to_use.predict(obs, deterministic=True)
-                    obs, reward, terminated, truncated, info = self.env.step(action.item())
-                    score += reward
-                    await self.send_state()
-                    await asyncio.sleep(delay)
-
-                if self._stop_event.is_set():
-                    logger.info(f"Cliente {self.websocket.client}: Bucle de evaluación detenido por señal.")
-                    break
-
-                final_score = info.get('snake_length', 1) - 1
-                logger.info(f"Cliente {self.websocket.client}: Episodio de evaluación terminado. Score: {final_score}")
-                await asyncio.sleep(1.0) # Pausa entre episodios
+                seq, frame = await subscription.get()
+                if isinstance(frame, Exception): # La simulación de la arena falló
+                    raise frame
+                if self._encoder and last_seq is not None and seq != last_seq + 1:
+                    self._encoder.reset() # Frames descartados: el siguiente debe ser un keyframe
+                last_seq = seq
+                if frame is None:
+                    if self._encoder:
+                        self._encoder.reset() # El siguiente episodio empieza con un keyframe
+                    continue
+                await self.send_state(frame)
+
+            if self._stop_event.is_set():
+                logger.info(f"Cliente {self.websocket.client}: Bucle de evaluación detenido por señal.")
 
         except WebSocketDisconnect:
             logger.info(f"Cliente {self.websocket.client}: WebSocket desconectado durante la evaluación.")
@@ -135,83 +122,21 @@ class AiEvaluator:
             await self.send_error(f"Error interno durante la evaluación: {type(e).__name__}")
             self._stop_event.set()
         finally:
-            await self._close_env() # Cerrar entorno al finalizar
+            self.arena_hub.unsubscribe(subscription)
+            if subscription.dropped:
+                logger.info(f"Cliente {self.websocket.client}: {subscription.dropped} frames descartados (cliente lento).")
             logger.info(f"Cliente {self.websocket.client}: Bucle de evaluación finalizado.")
 
 
-    async def send_state(self):
-        """Envía el estado actual del juego al cliente WebSocket."""
+    async def send_state(self, frame: dict):
+        """Envía un frame del juego (ver watch_simulator.build_frame) al cliente WebSocket."""
         if self.websocket.client_state != WebSocketState.CONNECTED:
              return
-
-        is_done = False
-        final_score = 0
-        snake_list_python = [] # Lista para tipos Python
-        food_pos_python = None # Variable para tipos Python
-
         try:
-            if self.env:
-                is_terminated = self.env._is_terminated()
-                is_truncated = self.env._is_truncated()
-                is_done = is_terminated or is_truncated
-
-                # --- CONVERSIÓN A TIPOS PYTHON ---
-                if self.env.snake:
-                    final_score = len(self.env.snake) - 1
-                    # Convertir cada coordenada de cada segmento a int nativo
-                    snake_list_python = [
-                        (int(seg[0]), int(seg[1])) for seg in self.env.snake
-                    ]
-                else:
-                    final_score = 0
-                    snake_list_python = []
-
-                if self.env.food_pos:
-                    # Convertir coordenadas de comida a int nativo
-                    food_pos_python = (int(self.env.food_pos[0]), int(self.env.food_pos[1]))
-                else:
-                    food_pos_python = None
-                # --- FIN CONVERSIÓN ---
-
+            if self._encoder:
+                await self.websocket.send_bytes(self._encoder.encode(frame))
             else:
-                is_done = True
-                final_score = -1 # O 0 si prefieres
-
-        except AttributeError:
-             logger.warning("Métodos _is_terminated o _is_truncated no encontrados en SnakeEnv.")
-             is_done = False
-             if self.env:
-                # --- CONVERSIÓN (También en fallback) ---
-                if self.env.snake:
-                    final_score = len(self.env.snake) - 1
-                    snake_list_python = [(int(seg[0]), int(seg[1])) for seg in self.env.snake]
-                else:
-                     final_score = 0
-                     snake_list_python = []
-                if self.env.food_pos:
-                     food_pos_python = (int(self.env.food_pos[0]), int(self.env.food_pos[1]))
-                else:
-                    food_pos_python = None
-                # --- FIN CONVERSIÓN ---
-             else:
-                 final_score = -1
-
-        except Exception as e:
-             logger.error(f"Error obteniendo estado del entorno: {e}", exc_info=True)
-             is_done = True
-             final_score = -1
-
-        # Usar las variables convertidas a tipos Python
-        state_data = {
-            "type": "game_state_update", "data": {
-                "snake": snake_list_python, # <--- USAR LISTA PYTHON
-                "food": food_pos_python,    # <--- USAR TUPLA PYTHON
-                "score": int(final_score),  # <--- Asegurar que score sea int
-                "gameOver": bool(is_done)   # <--- Asegurar que sea bool
-            }
-        }
-        try:
-            await self.websocket.send_text(json.dumps(state_data))
+                await self.websocket.send_text(json.dumps({"type": "game_state_update", "data": frame}))
         except Exception as e:
             logger.warning(f"Cliente {self.websocket.client}: Error enviando estado (puede estar desconectándose): {e}")
 
@@ -226,41 +151,33 @@ class AiEvaluator:
                 logger.warning(f"Cliente {self.websocket.client}: Error enviando mensaje de error (puede estar desconectándose): {e}")
 
     async def start(self): # Hacer start async para poder usar await send_error
-        """Inicia la tarea del bucle de evaluación, cargando el modelo."""
+        """Comprueba que el modelo está disponible e inicia la tarea del bucle de evaluación."""
         if self.task is None or self.task.done():
-            logger.info(f"Cliente {self.websocket.client}: Iniciando evaluación. Intentando cargar modelo desde {BEST_MODEL_PATH_WATCH}...")
+            logger.info(f"Cliente {self.websocket.client}: Iniciando evaluación. Obteniendo modelo {BEST_MODEL_PATH_WATCH} del registro...")
             self._stop_event.clear()
-            self._loaded_watch_model = None # Resetear
+            if self._encoder:
+                self._encoder.reset()
 
-            # Cargar el modelo BAJO DEMANDA
-            if not os.path.exists(BEST_MODEL_PATH_WATCH):
+            if not os.path.exists(BEST_MODEL_PATH_WATCH) and self.model_registry.peek(BEST_MODEL_PATH_WATCH) is None:
                  logger.warning(f"Cliente {self.websocket.client}: Modelo no encontrado en {BEST_MODEL_PATH_WATCH}.")
                  await self.send_error("Modelo 'best_model.zip' no encontrado. Entrena un modelo primero.")
                  return # No iniciar tarea
-            else:
-                 try:
-                    self._loaded_watch_model = PPO.load(BEST_MODEL_PATH_WATCH, device='cpu')
-                    logger.info(f"Cliente {self.websocket.client}: Modelo cargado exitosamente desde {BEST_MODEL_PATH_WATCH}.")
-                 except Exception as e:
-                     logger.error(f"Cliente {self.websocket.client}: Error al cargar el modelo desde {BEST_MODEL_PATH_WATCH}: {e}", exc_info=True)
-                     self._loaded_watch_model = None
-                     await self.send_error(f"Error al cargar modelo: {type(e).__name__}")
-                     return # No iniciar tarea
-
-            # Si llegamos aquí, el modelo se cargó (o era None y falló)
-            if self._loaded_watch_model:
-                 # Crear tarea solo si el modelo se cargó bien
-                 self.task = asyncio.create_task(self.run_evaluation_loop(self._loaded_watch_model))
-            else:
-                # Este caso no debería ocurrir si las comprobaciones anteriores son correctas
-                logger.error(f"Cliente {self.websocket.client}: No se pudo iniciar la tarea de evaluación (modelo no válido después de intentar cargar).")
-
-
+            if self.arena_hub.simulator.kind == "thread":
+                # Validar (y cachear) el modelo ya aquí para informar del error al cliente antes de arrancar
+                try:
+                    await asyncio.to_thread(self.model_registry.get, BEST_MODEL_PATH_WATCH)
+                    logger.info(f"Cliente {self.websocket.client}: Modelo listo ({BEST_MODEL_PATH_WATCH}).")
+                except Exception as e:
+                    logger.error(f"Cliente {self.websocket.client}: Error al cargar el modelo desde {BEST_MODEL_PATH_WATCH}: {e}", exc_info=True)
+                    await self.send_error(f"Error al cargar modelo: {type(e).__name__}")
+                    return # No iniciar tarea
+
+            self.task = asyncio.create_task(self.run_evaluation_loop())
         else:
              logger.warning(f"Cliente {self.websocket.client}: Intento de iniciar tarea de evaluación ya existente.")
 
     async def stop(self):
-        """Detiene la tarea del bucle de evaluación y cierra el entorno."""
+        """Detiene la tarea del bucle de evaluación."""
         task_stopped = False
         if self.task and not self.task.done():
             if not self._stop_event.is_set():
@@ -283,9 +200,6 @@ class AiEvaluator:
                  logger.info(f"Cliente {self.websocket.client}: Tarea de evaluación detenida o cancelada.")
         # else:
              # logger.info(f"Cliente {self.websocket.client}: No había tarea de evaluación activa para detener.")
-
-        # Siempre intentar cerrar el entorno al detener
-        await self._close_env()
         return task_stopped
 
 
@@ -293,8 +207,12 @@ class AiEvaluator:
 @app.websocket("/ws/watch")
 async def websocket_watch_ai(websocket: WebSocket):
     ws_manager = await get_websocket_manager_instance()
-    await ws_manager.connect(websocket, "watch")
-    evaluator = AiEvaluator(websocket, ws_manager)
+    model_registry = await get_model_registry_instance()
+    arena_hub = await get_watch_arena_hub_instance()
+    # El cliente puede ofrecer el protocolo binario con deltas como subprotocolo WebSocket
+    protocol = watch_protocol.negotiate(websocket.scope.get("subprotocols", []))
+    await ws_manager.connect(websocket, "watch", subprotocol=protocol)
+    evaluator = AiEvaluator(websocket, ws_manager, model_registry, arena_hub, protocol=protocol)
     try:
         while True:
             message = await websocket.receive_text()
@@ -335,8 +253,9 @@ async def websocket_training_updates(websocket: WebSocket):
             "type": "training_status",
             "data": current_status.model_dump() if hasattr(current_status, 'model_dump') else current_status.dict()
         }
-        await websocket.send_text(json.dumps(status_message))
-        logger.info(f"{client_info}: Estado inicial enviado: {current_status.status}")
+        # Por la cola de la conexión, para no enviar en paralelo con su tarea escritora
+        ws_manager.send_to_training_connection(websocket, json.dumps(status_message))
+        logger.info(f"{client_info}: Estado inicial encolado: {current_status.status}")
 
         # Mantener conexión
         while True:
@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+# Los módulos del backend se importan como en el servidor (core.*, api.*): backend/ en sys.path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# backend/tests/test_inference_batcher.py
+"""Cierre del lote del InferenceBatcher: ventana fija frente a productores registrados con session()."""
+import threading
+import time
+
+import numpy as np
+
+from core.inference_batcher import InferenceBatcher
+
+WINDOW = 0.5 # Ventana exagerada: si se pagase, los tiempos la delatarían
+
+
+class _ArgmaxModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, obs, deterministic=True):
+        self.batch_sizes.append(len(obs))
+        return np.argmax(obs, axis=1), None
+
+
+def _timed_submit(batcher, model, obs):
+    start = time.perf_counter()
+    action = batcher.submit(model, obs).result(timeout=5)
+    return action, time.perf_counter() - start
+
+
+def test_without_session_waits_for_window():
+    batcher = InferenceBatcher(window_seconds=WINDOW)
+    try:
+        action, elapsed = _timed_submit(batcher, _ArgmaxModel(), np.eye(4, dtype=np.float32)[2])
+    finally:
+        batcher.close()
+    assert action == 2
+    assert elapsed >= WINDOW * 0.9
+
+
+def test_single_session_flushes_immediately():
+    batcher = InferenceBatcher(window_seconds=WINDOW)
+    model = _ArgmaxModel()
+    try:
+        with batcher.session():
+            results = [_timed_submit(batcher, model, np.eye(4, dtype=np.float32)[i % 4]) for i in range(5)]
+    finally:
+        batcher.close()
+    assert [action for action, _ in results] == [0, 1, 2, 3, 0]
+    assert max(elapsed for _, elapsed in results) < WINDOW / 2
+    assert batcher.stats()["active_producers"] == 0
+
+
+def test_concurrent_sessions_share_a_batch():
+    batcher = InferenceBatcher(window_seconds=WINDOW)
+    model = _ArgmaxModel()
+    producers = 4
+    ready = threading.Barrier(producers)
+    elapsed = []
+
+    def producer(index):
+        with batcher.session():
+            ready.wait() # Todos registrados antes de la primera petición
+            elapsed.append(_timed_submit(batcher, model, np.eye(4, dtype=np.float32)[index])[1])
+
+    threads = [threading.Thread(target=producer, args=(i,)) for i in range(producers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        batcher.close()
+    assert sum(model.batch_sizes) == producers
+    assert max(model.batch_sizes) > 1 # Se agrupan hasta que los cuatro están esperando
+    assert max(elapsed) < WINDOW / 2
@@ -0,0 +1,89 @@
+# backend/tests/test_metrics_store.py
+"""MetricsStore.read (rango por timestep, NaN, reducción) y lttb_indices."""
+import numpy as np
+import pytest
+
+from core.metrics_store import SERIES_COLUMNS, MetricsStore, lttb_indices
+
+ROWS = 500
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics"))
+    writer = store.create_run("run-1", flush_rows=64)
+    for i in range(ROWS):
+        # ep_len_mean ausente en las filas impares; pico en la fila 250 de ep_rew_mean
+        writer.append(timestep=(i + 1) * 100, ep_rew_mean=100.0 if i == 250 else float(np.sin(i / 20)),
+                      ep_len_mean=float(i) if i % 2 == 0 else None, value_loss=1.0 / (i + 1), explained_variance=0.5)
+    writer.close()
+    return store
+
+
+def test_read_full_range(store):
+    result = store.read("run-1", downsample=0)
+    assert result["rows"] == result["points_in_range"] == ROWS
+    assert set(result["series"]) == set(SERIES_COLUMNS)
+    rew = result["series"]["ep_rew_mean"]
+    assert rew["x"] == [(i + 1) * 100 for i in range(ROWS)]
+    assert len(result["series"]["ep_len_mean"]["x"]) == ROWS // 2 # Los NaN no se devuelven
+    assert result["series"]["ep_len_mean"]["x"][:2] == [100, 300]
+
+
+@pytest.mark.parametrize("t_from, t_to, expected", [
+    (1000, 2000, (1000, 2000)), # Extremos incluidos
+    (950, 2050, (1000, 2000)), # Entre timesteps
+    (None, 300, (100, 300)),
+    (49_950, None, (50_000, 50_000)),
+])
+def test_read_timestep_range(store, t_from, t_to, expected):
+    result = store.read("run-1", t_from, t_to, downsample=0)
+    x = result["series"]["ep_rew_mean"]["x"]
+    assert (x[0], x[-1]) == expected
+    assert result["points_in_range"] == len(x)
+
+
+def test_read_empty_range(store):
+    result = store.read("run-1", 60_000, 70_000)
+    assert result["points_in_range"] == 0
+    assert result["series"]["ep_rew_mean"] == {"x": [], "y": []}
+
+
+@pytest.mark.parametrize("downsample", [1, 2, 3, 10, 100, ROWS - 1, ROWS, ROWS + 10])
+def test_downsample_returns_at_most_the_requested_points(store, downsample):
+    result = store.read("run-1", downsample=downsample)
+    for column, series in result["series"].items():
+        available = ROWS // 2 if column == "ep_len_mean" else ROWS
+        assert len(series["x"]) == min(downsample, available)
+        assert series["x"] == sorted(series["x"])
+        assert series["x"][-1] == ((ROWS - 1) * 100 if column == "ep_len_mean" else ROWS * 100) # Siempre el último
+
+
+def test_downsample_keeps_endpoints_and_peak(store):
+    small = store.read("run-1", downsample=2)["series"]["ep_rew_mean"]
+    assert small["x"] == [100, ROWS * 100]
+    assert store.read("run-1", downsample=1)["series"]["ep_rew_mean"]["x"] == [ROWS * 100]
+    reduced = store.read("run-1", downsample=20)["series"]["ep_rew_mean"]
+    assert reduced["x"][0] == 100 and reduced["x"][-1] == ROWS * 100
+    assert 100.0 in reduced["y"] # LTTB conserva el pico
+
+
+def test_unknown_run_and_column(store):
+    with pytest.raises(KeyError):
+        store.read("no-existe")
+    with pytest.raises(KeyError):
+        store.read("../run-1")
+    with pytest.raises(ValueError):
+        store.read("run-1", columns=["timestep"])
+
+
+def test_lttb_indices():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[637] = 5.0
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 637 in indices
+    assert np.array_equal(lttb_indices(x, y, 1000), np.arange(1000)) # Sin reducción si caben todos
@@ -0,0 +1,90 @@
+# backend/tests/test_numpy_policy_parity.py
+"""
+Paridad de NumpyPolicy (sobre la exportación mapeable) con MaskablePPO.predict(deterministic=True),
+con y sin máscaras, en observaciones aleatorias y en las que visita el propio modelo en el entorno.
+Solo se admiten diferencias en empates: logits a menos de TIE_TOLERANCE, que el redondeo float32
+puede decidir en cualquier sentido.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("sb3_contrib")
+
+from core.mmap_model import export_mmap_model
+from core.numpy_policy import NumpyPolicy
+from core.snake_env import SnakeEnv
+
+BOARD_SIZE = 8
+SAMPLES = 2000
+TIE_TOLERANCE = 1e-5
+
+
+@pytest.fixture(scope="module", params=[0, 512], ids=["untrained", "trained"])
+def exported(request, tmp_path_factory):
+    from sb3_contrib import MaskablePPO
+    from core.batched_snake_env import BatchedSnakeEnv
+
+    env = BatchedSnakeEnv(num_envs=2, board_size=BOARD_SIZE, seed=0)
+    model = MaskablePPO("MlpPolicy", env, n_steps=128, batch_size=64, device="cpu", seed=0,
+                        policy_kwargs={"net_arch": dict(pi=[32, 32], vf=[32, 32])})
+    if request.param:
+        model.learn(request.param)
+    model_path = str(tmp_path_factory.mktemp("model") / "best_model.zip")
+    model.save(model_path)
+    env.close()
+    return model, NumpyPolicy.from_sidecar(export_mmap_model(model_path, board_size=BOARD_SIZE))
+
+
+def _env_observations(model, steps: int, seed: int):
+    env = SnakeEnv(board_size=BOARD_SIZE, info_mode="none")
+    obs, _ = env.reset(seed=seed)
+    observations, masks = [], []
+    for _ in range(steps):
+        mask = env.action_masks()
+        observations.append(obs)
+        masks.append(mask)
+        action, _ = model.predict(obs, deterministic=True, action_masks=mask)
+        obs, _, terminated, truncated, _ = env.step(int(action))
+        if terminated or truncated:
+            obs, _ = env.reset()
+    return np.asarray(observations, dtype=np.float32), np.asarray(masks, dtype=bool)
+
+
+def _cases(model, n_actions: int):
+    rng = np.random.default_rng(0)
+    space = model.observation_space
+    random_obs = rng.uniform(space.low, space.high, size=(SAMPLES, space.shape[0])).astype(np.float32)
+    random_masks = rng.random((SAMPLES, n_actions)) > 0.3
+    random_masks[np.arange(SAMPLES), rng.integers(0, n_actions, SAMPLES)] = True # Al menos una válida
+    env_obs, env_masks = _env_observations(model, SAMPLES, seed=0)
+    return {"random": (random_obs, None), "random_masked": (random_obs, random_masks),
+            "env": (env_obs, None), "env_masked": (env_obs, env_masks)}
+
+
+@pytest.mark.parametrize("case", ["random", "random_masked", "env", "env_masked"])
+def test_deterministic_actions_match_maskable_ppo(exported, case):
+    import torch
+
+    model, policy = exported
+    obs, masks = _cases(model, policy.n_actions)[case]
+    expected, _ = model.predict(obs, deterministic=True, action_masks=masks)
+    actions, _ = policy.predict(obs, deterministic=True, action_masks=masks)
+    with torch.no_grad():
+        reference = model.policy.get_distribution(torch.as_tensor(obs), action_masks=masks).distribution.logits.numpy()
+    rows = np.arange(len(obs))
+    differ = expected != actions
+    ties = differ & (reference[rows, expected] - reference[rows, actions] <= TIE_TOLERANCE)
+    assert not (differ & ~ties).any(), f"{int((differ & ~ties).sum())} acciones distintas sin empate"
+    if masks is not None:
+        assert masks[rows, actions].all() # Nunca elige una acción enmascarada
+
+
+def test_single_observation_shape_matches(exported):
+    model, policy = exported
+    space = model.observation_space
+    obs = np.random.default_rng(1).uniform(space.low, space.high).astype(np.float32)
+    mask = np.array([True, False, True, True])
+    action, _ = policy.predict(obs, deterministic=True, action_masks=mask)
+    expected, _ = model.predict(obs, deterministic=True, action_masks=mask)
+    assert np.shape(action) == np.shape(expected)
+    assert int(action) == int(expected)
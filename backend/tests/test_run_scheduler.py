@@ -0,0 +1,57 @@
+# backend/tests/test_run_scheduler.py
+"""El consumidor del RunScheduler sobrevive a mensajes erróneos y a fallos al publicar."""
+import asyncio
+import json
+
+from api.schemas import TrainingParams
+from core.metrics_store import MetricsStore
+from core.run_scheduler import RunRecord, RunScheduler
+from core.training_manager import RunPaths
+
+
+class _FlakyWsManager:
+    """Publica en una lista; la primera publicación por lotes falla."""
+
+    def __init__(self):
+        self.messages = []
+        self.batch_calls = 0
+
+    def publish_to_training(self, message):
+        self.messages.append(message)
+
+    def publish_batch_to_training(self, messages):
+        self.batch_calls += 1
+        if self.batch_calls == 1:
+            raise RuntimeError("conexión rota")
+        self.messages.extend(messages)
+
+
+def _status(run_id, status):
+    return json.dumps({"type": "training_status", "data": {"status": status, "run_id": run_id}})
+
+
+def test_consumer_survives_bad_messages(tmp_path):
+    ws_manager = _FlakyWsManager()
+    scheduler = RunScheduler(ws_manager, MetricsStore(str(tmp_path / "metrics")), cpus=[0], metrics_window_seconds=0)
+    params = TrainingParams(total_timesteps=1000, num_cpu=1, learning_rate=3e-4)
+    record = RunRecord("run-1", params, RunPaths.for_run("run-1"), 0)
+    record.state = "running"
+    scheduler._runs["run-1"] = record
+
+    async def scenario():
+        scheduler.start(asyncio.get_running_loop())
+        channel = scheduler._channel
+        channel.put_nowait(("run-1", _status("run-1", "Entrenando"))) # Su publicación falla
+        await asyncio.sleep(0.05)
+        for item in ("no es json", json.dumps({"type": "training_status", "data": {"current_step": "x"}}),
+                     _status("run-1", "Completado")):
+            channel.put_nowait(("run-1", item))
+        await asyncio.sleep(0.05)
+        alive = not scheduler._consumer_task.done()
+        scheduler.shutdown()
+        return alive
+
+    assert asyncio.run(scenario())
+    statuses = [json.loads(m)["data"]["status"] for m in ws_manager.messages if json.loads(m)["type"] == "run_status"]
+    assert statuses == ["Completado"]
+    assert record.status.status == "Completado"
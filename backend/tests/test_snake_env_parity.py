@@ -0,0 +1,195 @@
+# backend/tests/test_snake_env_parity.py
+"""
+Paridad de SnakeEnv con la implementación original (baseline) del paso y la observación.
+
+`BaselineSnake` es una copia congelada de la lógica original de `step`, `_get_obs`,
+`_is_collision` y `action_masks` (conjunto del cuerpo en cada consulta, arrays NumPy por
+vecino). Solo difiere en dos cosas que cambiaron a propósito después:
+  - la posición de la comida nueva la toma del entorno probado (el índice de celdas libres
+    consume el RNG de otra forma que el muestreo por rechazo original);
+  - tablero lleno = victoria (terminated, recompensa de comida); el original entraba en un
+    bucle infinito buscando una celda libre.
+Todo lo demás (movimiento, antirreversa, colisiones, recompensas con distancia, truncamiento y
+las 18 características) debe coincidir bit a bit.
+
+Ejecutar (desde backend/): python -m pytest -q tests
+"""
+import collections
+
+import numpy as np
+import pytest
+
+from core.snake_env import SnakeEnv
+
+REWARD_FOOD = 40.0
+REWARD_DEATH = -100.0
+REWARD_STEP = -0.05
+REWARD_DIST_FACTOR = 0.1
+ACTION_TO_DIRECTION = {0: np.array([-1, 0]), 1: np.array([0, 1]), 2: np.array([1, 0]), 3: np.array([0, -1])}
+
+
+class BaselineSnake:
+    """Copia congelada de la lógica original (ver el docstring del módulo)."""
+
+    def __init__(self, board_size, snake, direction, food_pos):
+        self.board_size = board_size
+        self.snake = collections.deque(snake)
+        self.direction = direction
+        self.food_pos = food_pos
+        self.max_steps_without_food = board_size * board_size * 2
+        self.steps_since_last_food = 0
+
+    def _is_collision(self, point):
+        y, x = point
+        if not (0 <= y < self.board_size and 0 <= x < self.board_size):
+            return True
+        if self.snake and tuple(point) in set(list(self.snake)):
+            return True
+        return False
+
+    def action_masks(self):
+        head_np = np.array(self.snake[0])
+        valid_actions = [True] * 4
+        for action, move_vec in ACTION_TO_DIRECTION.items():
+            if self._is_collision(tuple(head_np + move_vec)):
+                valid_actions[action] = False
+        return np.array(valid_actions)
+
+    def get_obs(self):
+        head = self.snake[0]; head_y, head_x = head
+        dir_vectors = {0: (-1, 0), 1: (0, 1), 2: (1, 0), 3: (0, -1)}; current_dir_vec = np.array(dir_vectors[self.direction])
+        left_dir_vec = np.array([current_dir_vec[1], -current_dir_vec[0]]); right_dir_vec = np.array([-current_dir_vec[1], current_dir_vec[0]])
+        point_ahead = np.array(head) + current_dir_vec; point_left = np.array(head) + left_dir_vec; point_right = np.array(head) + right_dir_vec
+        danger_ahead = 1.0 if self._is_collision(point_ahead) else 0.0
+        danger_left = 1.0 if self._is_collision(point_left) else 0.0
+        danger_right = 1.0 if self._is_collision(point_right) else 0.0
+        point_N = (head_y - 1, head_x); point_S = (head_y + 1, head_x); point_E = (head_y, head_x + 1); point_W = (head_y, head_x - 1)
+        danger_N = 1.0 if self._is_collision(point_N) else 0.0; danger_S = 1.0 if self._is_collision(point_S) else 0.0
+        danger_E = 1.0 if self._is_collision(point_E) else 0.0; danger_W = 1.0 if self._is_collision(point_W) else 0.0
+        food_y, food_x = self.food_pos if self.food_pos else (head_y, head_x)
+        food_dir_y_norm = np.clip((food_y - head_y) / self.board_size, -1., 1.); food_dir_x_norm = np.clip((food_x - head_x) / self.board_size, -1., 1.)
+        dist_N_norm = head_y / (self.board_size - 1); dist_S_norm = (self.board_size - 1 - head_y) / (self.board_size - 1)
+        dist_W_norm = head_x / (self.board_size - 1); dist_E_norm = (self.board_size - 1 - head_x) / (self.board_size - 1)
+        dir_one_hot = np.zeros(4, dtype=np.float32); dir_one_hot[self.direction] = 1.0
+        len_norm = len(self.snake) / (self.board_size * self.board_size)
+        return np.array([danger_ahead, danger_left, danger_right, danger_N, danger_S, danger_E, danger_W,
+                         food_dir_y_norm, food_dir_x_norm, dist_N_norm, dist_S_norm, dist_W_norm, dist_E_norm,
+                         dir_one_hot[0], dir_one_hot[1], dir_one_hot[2], dir_one_hot[3], len_norm], dtype=np.float32)
+
+    def step(self, action, next_food_pos):
+        """`next_food_pos`: comida que colocó el entorno probado si en este paso se come."""
+        old_head = self.snake[0]; old_food_pos = self.food_pos
+        self.steps_since_last_food += 1
+        terminated = False; truncated = False; reward = 0.0
+        opposite_direction = (self.direction + 2) % 4
+        if len(self.snake) > 1 and action == opposite_direction: action = self.direction
+        self.direction = action
+        move_vec = ACTION_TO_DIRECTION[self.direction]
+        new_head = (old_head[0] + move_vec[0], old_head[1] + move_vec[1])
+        if self._is_collision(new_head):
+            terminated = True
+            reward = REWARD_DEATH
+        ate_food = False
+        if not terminated:
+            if new_head == self.food_pos:
+                ate_food = True
+                reward = REWARD_FOOD
+                self.steps_since_last_food = 0
+            else:
+                reward = REWARD_STEP
+                if old_food_pos:
+                    old_dist = np.linalg.norm(np.array(old_head) - np.array(old_food_pos))
+                    new_dist = np.linalg.norm(np.array(new_head) - np.array(old_food_pos))
+                    reward += (old_dist - new_dist) * REWARD_DIST_FACTOR
+        if not terminated:
+            self.snake.appendleft(new_head)
+            if ate_food:
+                if len(self.snake) == self.board_size * self.board_size:
+                    self.food_pos = None
+                    terminated = True # Victoria (ver el docstring del módulo)
+                else:
+                    assert next_food_pos is not None and next_food_pos not in set(self.snake)
+                    self.food_pos = next_food_pos
+            elif len(self.snake) > 1: self.snake.pop()
+        if not terminated and self.steps_since_last_food > self.max_steps_without_food:
+            truncated = True
+        return self.get_obs(), reward, terminated, truncated
+
+
+def _reset_pair(board_size, seed):
+    env = SnakeEnv(board_size=board_size, info_mode="none")
+    obs, _ = env.reset(seed=seed)
+    reference = BaselineSnake(board_size, list(env.snake), int(env.direction), env.food_pos)
+    assert np.array_equal(obs, reference.get_obs())
+    return env, reference
+
+
+def _step_pair(env, reference, action):
+    obs, reward, terminated, truncated, _ = env.step(action)
+    food = tuple(int(v) for v in env.food_pos) if env.food_pos is not None else None
+    expected = reference.step(action, food)
+    assert np.array_equal(obs, expected[0])
+    assert reward == expected[1]
+    assert (terminated, truncated) == (expected[2], expected[3])
+    assert list(env.snake) == list(reference.snake)
+    if not (terminated or truncated):
+        assert np.array_equal(env.action_masks(), reference.action_masks())
+    return terminated, truncated
+
+
+def _rollout(board_size, seed, steps, masked):
+    """Acciones aleatorias (o aleatorias entre las válidas): devuelve el recuento de sucesos."""
+    rng = np.random.default_rng(seed)
+    env, reference = _reset_pair(board_size, seed)
+    events = collections.Counter()
+    for _ in range(steps):
+        valid = np.flatnonzero(env.action_masks())
+        action = int(rng.choice(valid)) if masked and len(valid) else int(rng.integers(0, 4))
+        length = len(env.snake)
+        terminated, truncated = _step_pair(env, reference, action)
+        events["food"] += len(env.snake) > length
+        events["death"] += terminated
+        events["truncated"] += truncated
+        if terminated or truncated:
+            env, reference = _reset_pair(board_size, int(rng.integers(0, 2**31)))
+    return events
+
+
+@pytest.mark.parametrize("board_size", [5, 8, 20])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_actions_match_baseline(board_size, seed):
+    events = _rollout(board_size, seed, steps=3000, masked=False)
+    assert events["death"] > 0 # Paredes, reversa con cuerpo y choques consigo misma
+
+
+@pytest.mark.parametrize("board_size", [5, 8, 20])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_masked_actions_match_baseline(board_size, seed):
+    events = _rollout(board_size, seed, steps=3000, masked=True)
+    assert events["food"] > 0
+
+
+def _hamiltonian_cycle(board_size):
+    """Ciclo que recorre todas las celdas (board_size par): fila 0, zigzag en columnas 1.., columna 0."""
+    path = [(0, x) for x in range(board_size)]
+    for y in range(1, board_size):
+        columns = range(board_size - 1, 0, -1) if y % 2 else range(1, board_size)
+        path += [(y, x) for x in columns]
+    path += [(y, 0) for y in range(board_size - 1, 0, -1)]
+    assert len(set(path)) == board_size * board_size
+    return {cell: path[(i + 1) % len(path)] for i, cell in enumerate(path)}
+
+
+def test_full_board_win_matches_baseline():
+    board_size = 6
+    following = _hamiltonian_cycle(board_size)
+    deltas = {tuple(vec): action for action, vec in ACTION_TO_DIRECTION.items()}
+    env, reference = _reset_pair(board_size, seed=3)
+    terminated = truncated = False
+    while not (terminated or truncated):
+        head = env.snake[0]
+        target = following[head]
+        terminated, truncated = _step_pair(env, reference, deltas[(target[0] - head[0], target[1] - head[1])])
+    assert terminated and not truncated
+    assert len(env.snake) == board_size * board_size
+    assert env._won and env.food_pos is None
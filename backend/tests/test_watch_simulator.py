@@ -0,0 +1,121 @@
+# backend/tests/test_watch_simulator.py
+"""WatchSimulator en modo "thread": frames incrementales, contrapresión, cierre y errores."""
+import asyncio
+import contextlib
+
+import numpy as np
+import pytest
+
+from core.inference_batcher import InferenceBatcher
+from core.model_registry import ModelRegistry
+from core.watch_simulator import WatchSimulator
+
+BOARD_SIZE = 8
+CIRCLE = [1, 2, 3, 0] # Derecha, abajo, izquierda, arriba: da vueltas en un cuadrado 2x2
+
+
+class _CirclingModel:
+    """Política de prueba: gira en círculo (el episodio dura hasta el truncamiento) y cuenta las decisiones."""
+
+    def __init__(self):
+        self.decisions = 0
+
+    def predict(self, obs, deterministic=True):
+        actions = []
+        for _ in range(len(obs)):
+            actions.append(CIRCLE[self.decisions % len(CIRCLE)])
+            self.decisions += 1
+        return np.array(actions), None
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "best_model.zip"
+    path.write_bytes(b"")
+    return str(path)
+
+
+def _simulator(loader, max_workers=2, max_ahead=3):
+    return WatchSimulator(ModelRegistry(loader=loader), InferenceBatcher(), kind="thread",
+                          max_workers=max_workers, max_ahead=max_ahead)
+
+
+def test_frames_stream_with_backpressure(model_file):
+    model = _CirclingModel()
+    simulator = _simulator(lambda path: model)
+
+    async def scenario():
+        async with contextlib.aclosing(simulator.stream_episode(model_file, BOARD_SIZE, seed=0)) as frames:
+            first = await asyncio.wait_for(frames.__anext__(), timeout=5)
+            await asyncio.sleep(0.3) # El consumidor no lee: la simulación debe detenerse
+            decisions_while_idle = model.decisions
+            rest = [frame async for frame in frames]
+        return first, decisions_while_idle, rest
+
+    try:
+        first, decisions_while_idle, rest = asyncio.run(scenario())
+    finally:
+        simulator.shutdown()
+        simulator.inference_batcher.close()
+    assert first["gameOver"] is False and len(first["snake"]) == 1
+    assert decisions_while_idle <= simulator.max_ahead
+    assert len(rest) == model.decisions > simulator.max_ahead # Un frame por paso, más el inicial ya leído
+    assert rest[-1]["gameOver"] is True
+
+
+def test_closing_the_stream_stops_the_producer(model_file):
+    model = _CirclingModel()
+    simulator = _simulator(lambda path: model, max_workers=1)
+
+    async def scenario():
+        async with contextlib.aclosing(simulator.stream_episode(model_file, BOARD_SIZE, seed=0)) as frames:
+            async for _ in frames:
+                break
+        # Con un solo hilo en el executor, el siguiente episodio solo corre si el anterior se detuvo
+        return await asyncio.wait_for(simulator.simulate_episode(model_file, BOARD_SIZE, seed=1), timeout=10)
+
+    try:
+        episode = asyncio.run(scenario())
+    finally:
+        simulator.shutdown()
+        simulator.inference_batcher.close()
+    assert episode[-1]["gameOver"] is True
+
+
+def test_streams_share_a_single_worker(model_file):
+    simulator = _simulator(lambda path: _CirclingModel(), max_workers=1)
+
+    async def scenario():
+        async with contextlib.aclosing(simulator.stream_episode(model_file, BOARD_SIZE, seed=0)) as first, \
+                contextlib.aclosing(simulator.stream_episode(model_file, BOARD_SIZE, seed=1)) as second:
+            received = {"first": 0, "second": 0}
+            for _ in range(10): # Ambos abiertos a la vez y consumidos al ritmo de un visor
+                for name, frames in (("first", first), ("second", second)):
+                    await asyncio.wait_for(frames.__anext__(), timeout=2)
+                    received[name] += 1
+                await asyncio.sleep(0.01)
+        return received
+
+    try:
+        received = asyncio.run(scenario())
+    finally:
+        simulator.shutdown()
+        simulator.inference_batcher.close()
+    assert received == {"first": 10, "second": 10}
+
+
+def test_errors_reach_the_consumer(model_file):
+    def failing_loader(path):
+        raise ValueError("modelo corrupto")
+
+    simulator = _simulator(failing_loader)
+
+    async def scenario():
+        return [frame async for frame in simulator.stream_episode(model_file, BOARD_SIZE)]
+
+    try:
+        with pytest.raises(ValueError, match="modelo corrupto"):
+            asyncio.run(scenario())
+    finally:
+        simulator.shutdown()
+        simulator.inference_batcher.close()
@@ -100,4 +100,20 @@ export async function getHardwareInfo() {
     return handleResponse(response);
 }
 
+/**
+ * Histórico de métricas de un run, cada serie reducida a como mucho `downsample` puntos.
+ * @param {string} runId - Id del run (campo run_id del estado).
+ * @param {object} [options] - { from, to, downsample } (timesteps incluidos; downsample 0 = todos).
+ */
+export async function getRunMetrics(runId, options = {}) {
+    const query = new URLSearchParams();
+    for (const key of ['from', 'to', 'downsample']) {
+        if (options[key] !== undefined && options[key] !== null) query.set(key, options[key]);
+    }
+    const response = await fetch(`/api/runs/${encodeURIComponent(runId)}/metrics?${query}`, {
+         headers: { 'Accept': 'application/json' }
+    });
+    return handleResponse(response);
+}
+
 console.log("api.js cargado."); // Log para confirmar carga
\ No newline at end of file
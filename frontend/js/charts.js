@@ -1,11 +1,16 @@
 // frontend/js/charts.js
 // Chart global (asumiendo <script src...>)
+import { getRunMetrics } from './api.js';
+
+const HISTORY_POINTS = 1000; // Puntos por gráfico al recuperar el histórico de un run
 
 // --- Variables ---
 let rewardChartInstance = null;
 let lengthChartInstance = null;
 let valueLossChartInstance = null;
 let explainedVarianceChartInstance = null;
+let currentRunId = null; // Run cuyos datos muestran los gráficos
+let pendingPoints = null; // Métricas en vivo recibidas mientras se carga el histórico
 
 // --- !! COMENTAR O ELIMINAR ESTA CONSTANTE !! ---
 // Ya no limitaremos los puntos de datos de esta manera
@@ -119,11 +124,19 @@ export function initCharts() {
      console.log("Inicialización de gráficos completada.");
 }
 
+function formatTimestep(timestep) {
+    return timestep > 1000000 ? `${(timestep / 1000000).toFixed(1)}M` :
+           timestep > 1000 ? `${(timestep / 1000).toFixed(0)}k` : timestep;
+}
+
 export function updateCharts(metricsData) {
     const timestep = metricsData.timestep;
     if (timestep === undefined) return;
-    const label = timestep > 1000000 ? `${(timestep / 1000000).toFixed(1)}M` :
-                  timestep > 1000 ? `${(timestep / 1000).toFixed(0)}k` : timestep;
+    if (pendingPoints) { // Se aplican cuando llegue el histórico
+        pendingPoints.push(metricsData);
+        return;
+    }
+    const label = formatTimestep(timestep);
 
     if (metricsData.ep_rew_mean !== undefined && rewardChartInstance) {
         addDataPoint(rewardChartInstance, label, metricsData.ep_rew_mean);
@@ -154,4 +167,41 @@ export function clearCharts() {
     });
 }
 
+/**
+ * Carga en los gráficos el histórico del run (ej. al reconectar) si no es el que ya muestran.
+ * Las métricas en vivo que lleguen mientras tanto se añaden después, sin duplicar timesteps.
+ * @param {string} runId - Id del run (campo run_id del estado).
+ */
+export async function loadRunHistory(runId) {
+    if (!runId || runId === currentRunId) return;
+    currentRunId = runId;
+    pendingPoints = [];
+    let lastTimestep = -Infinity;
+    try {
+        const history = await getRunMetrics(runId, { downsample: HISTORY_POINTS });
+        if (runId !== currentRunId) return; // Empezó otro run mientras tanto
+        const chartSeries = [
+            [rewardChartInstance, 'ep_rew_mean'], [lengthChartInstance, 'ep_len_mean'],
+            [valueLossChartInstance, 'value_loss'], [explainedVarianceChartInstance, 'explained_variance'],
+        ];
+        chartSeries.forEach(([instance, key]) => {
+            const series = history.series[key] || { x: [], y: [] };
+            if (series.x.length) lastTimestep = Math.max(lastTimestep, series.x[series.x.length - 1]);
+            if (!instance) return;
+            instance.data.labels = series.x.map(formatTimestep);
+            instance.data.datasets[0].data = series.y.slice();
+            instance.update('none');
+        });
+        console.log(`Histórico del run ${runId} cargado (${history.points_in_range} puntos guardados).`);
+    } catch (error) {
+        console.warn(`No se pudo cargar el histórico del run ${runId}:`, error);
+    } finally {
+        if (runId === currentRunId) {
+            const buffered = pendingPoints || [];
+            pendingPoints = null;
+            buffered.filter(point => point.timestep > lastTimestep).forEach(updateCharts);
+        }
+    }
+}
+
 console.log("charts.js cargado.");
\ No newline at end of file
@@ -44,7 +44,9 @@ export class SnakeVisualizer {
         this.renderer = null;
         this.controls = null;
         this.snakeGroup = new THREE.Group(); // Inicializar siempre aquí
+        this.segmentMeshes = []; // Meshes de la serpiente en orden (cabeza primero), para applyDelta
         this.foodMesh = null;
+        this._shared = null; // Geometrías y materiales reutilizados entre frames (ver _getShared)
         this._boundOnWindowResize = this._onWindowResize.bind(this); // Guardar referencia bind
 
         this._init(); // Llamar a la inicialización
@@ -121,31 +123,77 @@ export class SnakeVisualizer {
         this.scene.add(plane);
     }
 
+    /**
+     * Geometrías y materiales compartidos por todos los segmentos y la comida. Se crean una vez
+     * y solo se liberan en dispose(), así los frames no crean ni destruyen recursos de GPU.
+     */
+    _getShared() {
+        if (!this._shared) {
+            const segmentSize = this.cellSize * 0.9;
+            this._shared = {
+                segmentGeometry: new THREE.BoxGeometry(segmentSize, segmentSize, segmentSize),
+                headMaterial: new THREE.MeshStandardMaterial({ color: this.colors.snakeHead }),
+                bodyMaterial: new THREE.MeshStandardMaterial({ color: this.colors.snakeBody }),
+                foodGeometry: new THREE.SphereGeometry(this.cellSize * 0.4, 16, 16),
+                foodMaterial: new THREE.MeshStandardMaterial({ color: this.colors.food, roughness: 0.5 }),
+            };
+        }
+        return this._shared;
+    }
+
+    /** Libera las geometrías y materiales compartidos. */
+    _disposeShared() {
+        if (this._shared) {
+            Object.values(this._shared).forEach(resource => resource.dispose());
+            this._shared = null;
+        }
+    }
+
     /** Limpia los objetos 3D de la serpiente y la comida de la escena. */
     _clearObjects() {
-        // Limpiar serpiente
+        // Limpiar serpiente (los recursos compartidos no se liberan aquí)
         if (this.snakeGroup) {
             while (this.snakeGroup.children.length > 0) {
-                const child = this.snakeGroup.children[0];
-                this.snakeGroup.remove(child);
-                if (child.geometry) child.geometry.dispose();
-                if (child.material) {
-                    if (Array.isArray(child.material)) child.material.forEach(material => material.dispose());
-                    else child.material.dispose();
-                }
+                this.snakeGroup.remove(this.snakeGroup.children[0]);
             }
         } else {
             console.warn("_clearObjects: Intento de limpiar, pero this.snakeGroup no existe.");
         }
+        this.segmentMeshes = [];
 
         // Limpiar comida
-        if (this.foodMesh) {
-            if (this.scene) this.scene.remove(this.foodMesh);
-            else console.warn("_clearObjects: No se puede quitar foodMesh porque this.scene no existe.");
-            if (this.foodMesh.geometry) this.foodMesh.geometry.dispose();
-            if (this.foodMesh.material) this.foodMesh.material.dispose();
-            this.foodMesh = null;
+        this._setFood(null);
+    }
+
+    /** Crea un mesh de segmento en la celda indicada. */
+    _createSegment(segmentCoords, isHead) {
+        const shared = this._getShared();
+        const segmentMesh = new THREE.Mesh(shared.segmentGeometry, isHead ? shared.headMaterial : shared.bodyMaterial);
+        segmentMesh.position.copy(this._boardToWorldCoords(segmentCoords));
+        return segmentMesh;
+    }
+
+    /**
+     * Coloca la comida en `foodPos` (reutilizando el mesh si ya existe) o la quita si es null.
+     * @param {Array<number> | null} foodPos - Coordenadas [fila, columna] de la comida, o null.
+     */
+    _setFood(foodPos) {
+        if (!foodPos) {
+            if (this.foodMesh) {
+                if (this.scene) this.scene.remove(this.foodMesh);
+                this.foodMesh = null;
+            }
+            return;
+        }
+        if (!this.scene) return;
+        if (!this.foodMesh) {
+            const shared = this._getShared();
+            this.foodMesh = new THREE.Mesh(shared.foodGeometry, shared.foodMaterial);
+            this.scene.add(this.foodMesh);
         }
+        this.foodMesh.position.copy(this._boardToWorldCoords(foodPos));
+        // Centrar la esfera verticalmente en su celda (su origen es el centro)
+        this.foodMesh.position.y = this.cellSize / 2;
     }
 
     /**
@@ -175,32 +223,41 @@ export class SnakeVisualizer {
             else { console.error("No se puede añadir snakeGroup recreado, la escena no existe"); return; }
         }
 
-        // 3. Crear y posicionar nuevos objetos
-        const segmentSize = this.cellSize * 0.9;
-        const snakeGeometry = new THREE.BoxGeometry(segmentSize, segmentSize, segmentSize);
-        const headMaterial = new THREE.MeshStandardMaterial({ color: this.colors.snakeHead });
-        const bodyMaterial = new THREE.MeshStandardMaterial({ color: this.colors.snakeBody });
-
+        // 3. Crear y posicionar nuevos objetos (geometría y materiales compartidos)
         snakeBody.forEach((segmentCoords, index) => {
-            const material = (index === 0) ? headMaterial : bodyMaterial;
-            const segmentMesh = new THREE.Mesh(snakeGeometry, material);
-            segmentMesh.position.copy(this._boardToWorldCoords(segmentCoords));
+            const segmentMesh = this._createSegment(segmentCoords, index === 0);
             this.snakeGroup.add(segmentMesh); // Añadir al grupo (ya verificado)
+            this.segmentMeshes.push(segmentMesh);
         });
 
         // Crear y posicionar comida (si existe y hay escena)
-        if (foodPos && this.scene) {
-             const foodSize = this.cellSize * 0.4;
-            const foodGeometry = new THREE.SphereGeometry(foodSize, 16, 16);
-            const foodMaterial = new THREE.MeshStandardMaterial({ color: this.colors.food, roughness: 0.5 });
-            this.foodMesh = new THREE.Mesh(foodGeometry, foodMaterial);
-            this.foodMesh.position.copy(this._boardToWorldCoords(foodPos));
-            // Centrar la esfera verticalmente en su celda (su origen es el centro)
-            this.foodMesh.position.y = this.cellSize / 2;
-            this.scene.add(this.foodMesh);
-        }
+        this._setFood(foodPos);
+    }
 
-        // No disponer geometría/materiales aquí si se reutilizan (como es el caso)
+    /**
+     * Aplica un delta sobre la serpiente actual sin redibujarla entera: quita `tailCount`
+     * segmentos de la cola y añade `newHeads` por delante (el primero es la nueva cabeza).
+     * @param {Array<Array<number>>} newHeads - Coordenadas [fila, columna] de las nuevas cabezas.
+     * @param {number} tailCount - Segmentos a quitar de la cola.
+     * @param {Array<number> | null} foodPos - Coordenadas [fila, columna] de la comida, o null.
+     */
+    applyDelta(newHeads, tailCount, foodPos) {
+        if (!this.snakeGroup) return;
+        const shared = this._getShared();
+
+        for (let i = 0; i < tailCount && this.segmentMeshes.length > 0; i++) {
+            this.snakeGroup.remove(this.segmentMeshes.pop());
+        }
+        if (newHeads.length > 0) {
+            if (this.segmentMeshes.length > 0) this.segmentMeshes[0].material = shared.bodyMaterial;
+            // Insertar de la más antigua a la más nueva para que la nueva cabeza quede delante
+            for (let i = newHeads.length - 1; i >= 0; i--) {
+                const segmentMesh = this._createSegment(newHeads[i], i === 0);
+                this.snakeGroup.add(segmentMesh);
+                this.segmentMeshes.unshift(segmentMesh);
+            }
+        }
+        this._setFood(foodPos);
     }
 
     /** Bucle de animación/renderizado. */
@@ -257,6 +314,7 @@ export class SnakeVisualizer {
         window.removeEventListener('resize', this._boundOnWindowResize, false);
 
         this._clearObjects(); // Limpiar serpiente y comida
+        this._disposeShared(); // Liberar geometrías y materiales compartidos
 
         // Limpiar escena completamente
         if (this.scene) {
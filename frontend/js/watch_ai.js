@@ -9,6 +9,60 @@ import { connectWebSocket, sendMessage, closeWebSocket, WSType } from './websock
 let visualizerInstance = null;
 let isWatching = false; // Flag para saber si estamos activamente en este modo
 
+// --- Protocolo binario con deltas (ver backend/core/watch_protocol.py) ---
+// Se ofrece como subprotocolo al conectar; si el servidor no lo acepta llegan mensajes JSON.
+const WATCH_SUBPROTOCOL = 'snake-delta.v1';
+const FRAME_KEYFRAME = 1;
+const FRAME_DELTA = 2;
+const FLAG_GAME_OVER = 0x01;
+const NO_FOOD = 255;
+const HEADER_SIZE = 8; // Cabecera (6 bytes) + longitud u16 (keyframe) o n_cabezas/n_colas u8 (delta)
+
+/** Lee `count` puntos [fila, columna] (u8, u8) a partir de `offset`. */
+function readPoints(view, offset, count) {
+    const points = new Array(count);
+    for (let i = 0; i < count; i++) {
+        points[i] = [view.getUint8(offset + 2 * i), view.getUint8(offset + 2 * i + 1)];
+    }
+    return points;
+}
+
+/** Actualiza puntuación, aviso de fin de partida e instrucciones tras un frame. */
+function showFrameStatus(score, gameOver) {
+    updateScore(score);
+    showGameOver(gameOver);
+    if (gameOver) {
+        setInstructions("IA: ¡Episodio terminado! Reiniciando...");
+    }
+}
+
+/**
+ * Aplica un frame binario: un keyframe redibuja la serpiente completa y un delta solo añade
+ * cabezas y quita segmentos de la cola.
+ * @param {ArrayBuffer} buffer - Mensaje binario recibido.
+ */
+function applyBinaryFrame(buffer) {
+    const view = new DataView(buffer);
+    const frameType = view.getUint8(0);
+    const flags = view.getUint8(1);
+    const score = view.getUint16(2, true);
+    const foodY = view.getUint8(4);
+    const food = foodY === NO_FOOD ? null : [foodY, view.getUint8(5)];
+
+    if (frameType === FRAME_KEYFRAME) {
+        const length = view.getUint16(6, true);
+        visualizerInstance.update(readPoints(view, HEADER_SIZE, length), food);
+    } else if (frameType === FRAME_DELTA) {
+        const headCount = view.getUint8(6);
+        const tailCount = view.getUint8(7);
+        visualizerInstance.applyDelta(readPoints(view, HEADER_SIZE, headCount), tailCount, food);
+    } else {
+        console.warn("Watch AI - Tipo de frame binario desconocido:", frameType);
+        return;
+    }
+    showFrameStatus(score, (flags & FLAG_GAME_OVER) !== 0);
+}
+
 /**
  * Maneja los mensajes recibidos del WebSocket de /ws/watch.
  * @param {object} event - El objeto del evento del mensaje WebSocket.
@@ -17,6 +71,10 @@ function handleWebSocketMessage(event) {
     if (!isWatching) return; // Ignorar si no estamos en modo Watch AI
 
     try {
+        if (event.data instanceof ArrayBuffer) { // Protocolo binario negociado
+            if (visualizerInstance) applyBinaryFrame(event.data);
+            return;
+        }
         const message = JSON.parse(event.data);
         // console.log("Watch AI - Mensaje WS recibido:", message); // Para depuración
 
@@ -24,12 +82,7 @@ function handleWebSocketMessage(event) {
             case 'game_state_update':
                 if (visualizerInstance && message.data) {
                     visualizerInstance.update(message.data.snake, message.data.food);
-                    updateScore(message.data.score);
-                    showGameOver(message.data.gameOver);
-                    if(message.data.gameOver) {
-                         setInstructions("IA: ¡Episodio terminado! Reiniciando...");
-                         // Podrías añadir una pausa visual aquí antes de que el backend reinicie
-                    }
+                    showFrameStatus(message.data.score, message.data.gameOver);
                 }
                 break;
             case 'error':
@@ -101,7 +154,8 @@ export function startWatchAI(visualizer) {
 
     // Conectar al WebSocket (usando la función de websocket.js)
     // Pasamos los manejadores específicos para este modo
-    connectWebSocket(WSType.WATCH, handleWebSocketMessage, handleWebSocketOpen, handleWebSocketClose);
+    // Ofrecer el protocolo binario con deltas (el servidor puede responder sin él y usar JSON)
+    connectWebSocket(WSType.WATCH, handleWebSocketMessage, handleWebSocketOpen, handleWebSocketClose, [WATCH_SUBPROTOCOL]);
 }
 
 /** Detiene el modo "Ver IA". */
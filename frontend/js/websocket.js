@@ -2,7 +2,7 @@
 
 // --- AJUSTAR IMPORTACIÓN ---
 import { updateTrainingStatus, showError, updateTrainingProgress } from './ui.js'; // Quitar updateTrainingLog
-import { updateCharts } from './charts.js';
+import { updateCharts, loadRunHistory } from './charts.js';
 
 // --- Constantes y Tipos ---
 export const WSType = {
@@ -18,18 +18,19 @@ const WS_URLS = {
 const webSockets = {};
 
 // --- Funciones Internas ---
-function ensureWebSocketState(type, onMessage, onOpen, onClose) {
+function ensureWebSocketState(type, onMessage, onOpen, onClose, protocols) {
     if (!webSockets[type]) {
         webSockets[type] = {
             instance: null, status: 'disconnected', reconnectAttempts: 0,
             messageHandler: onMessage, openHandler: onOpen, closeHandler: onClose,
-            url: WS_URLS[type]
+            url: WS_URLS[type], protocols: protocols
         };
         // console.log(`WebSocket [${type}]: Estado inicializado.`); // Log opcional
     } else {
         webSockets[type].messageHandler = onMessage;
         webSockets[type].openHandler = onOpen;
         webSockets[type].closeHandler = onClose;
+        webSockets[type].protocols = protocols;
     }
 }
 
@@ -50,7 +51,9 @@ function _connect(type) {
     wsState.status = 'connecting';
     try {
         if (wsState.instance) { wsState.instance.close(); wsState.instance = null; }
-        wsState.instance = new WebSocket(wsState.url);
+        // Subprotocolos opcionales (ej. protocolo binario de /ws/watch); el servidor elige uno o ninguno
+        wsState.instance = wsState.protocols ? new WebSocket(wsState.url, wsState.protocols) : new WebSocket(wsState.url);
+        wsState.instance.binaryType = 'arraybuffer'; // Mensajes binarios como ArrayBuffer
     } catch (error) {
         console.error(`WebSocket [${type}]: Error al crear instancia:`, error);
         wsState.status = 'error';
@@ -91,25 +94,9 @@ function _handleDefaultMessage(type, event) {
     if (type === WSType.TRAINING) {
         try {
             const message = JSON.parse(event.data);
-            switch (message.type) {
-                case 'training_status':
-                    updateTrainingStatus(message.data);
-                    break;
-                case 'training_metric':
-                    updateCharts(message.data);
-                    if (message.data.timestep !== undefined) {
-                        updateTrainingProgress(message.data.timestep);
-                    } else {
-                        console.warn("WS: Mensaje training_metric recibido SIN timestep:", message.data);
-                    }
-                    break;
-                case 'training_log':
-                     // Ya no llamamos a updateTrainingLog
-                     console.log("WS: Mensaje training_log recibido (ignorado en UI):", message.data);
-                    break;
-                default:
-                    console.log(`WebSocket [${type}]: Mensaje tipo desconocido (default handler):`, message.type);
-            }
+            // El servidor agrupa en un frame 'batch' los mensajes que salen juntos
+            const messages = message.type === 'batch' ? message.data : [message];
+            messages.forEach(_handleTrainingMessage);
         } catch (error) {
             console.error(`WebSocket [${type}]: Error procesando mensaje JSON (default handler):`, error);
             showError(`Error procesando datos del servidor [${type}]`);
@@ -119,10 +106,42 @@ function _handleDefaultMessage(type, event) {
     }
 }
 
+function _handleTrainingMessage(message) {
+    switch (message.type) {
+        case 'training_status':
+            updateTrainingStatus(message.data);
+            loadRunHistory(message.data.run_id); // Recupera los gráficos al (re)conectar o al cambiar de run
+            break;
+        case 'training_metric':
+            updateCharts(message.data);
+            if (message.data.timestep !== undefined) {
+                updateTrainingProgress(message.data.timestep);
+            } else {
+                console.warn("WS: Mensaje training_metric recibido SIN timestep:", message.data);
+            }
+            break;
+        case 'training_log':
+             // Ya no llamamos a updateTrainingLog
+             console.log("WS: Mensaje training_log recibido (ignorado en UI):", message.data);
+            break;
+        case 'training_eval':
+            console.log("WS: Evaluación:", message.data);
+            break;
+        case 'run_status':
+        case 'run_metric':
+        case 'run_log':
+        case 'run_eval':
+            // Runs del planificador (/api/runs): no afectan a la sesión de la UI
+            break;
+        default:
+            console.log(`WebSocket [${WSType.TRAINING}]: Mensaje tipo desconocido (default handler):`, message.type);
+    }
+}
+
 // --- Funciones Exportadas ---
-export function connectWebSocket(type, onMessage, onOpen, onClose) {
+export function connectWebSocket(type, onMessage, onOpen, onClose, protocols = undefined) {
     if (!WS_URLS[type]) { console.error(`Tipo de WebSocket desconocido: ${type}`); return; }
-    ensureWebSocketState(type, onMessage, onOpen, onClose);
+    ensureWebSocketState(type, onMessage, onOpen, onClose, protocols);
     _connect(type);
 }
 export function sendMessage(type, message) {